@@ -1,10 +1,16 @@
 # auth/login.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-import hashlib
+import queue
+import sqlite3
+import threading
 
 class LoginDialog:
-    def __init__(self, parent):
+    # 認証結果のポーリング間隔（ミリ秒）
+    POLL_INTERVAL_MS = 50
+    
+    def __init__(self, parent, db_manager):
+        self.db_manager = db_manager
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("ログイン")
         self.dialog.geometry("400x250")
@@ -12,15 +18,31 @@ class LoginDialog:
         self.dialog.grab_set()
         
         self.user_info = None
+        self.results = queue.Queue()
+        self.authenticating = False
         
         self.setup_ui()
         
+        # アカウント一覧を先読みしてキャッシュ
+        threading.Thread(target=self.preload_users, daemon=True).start()
+        
         # ウィンドウを中央に配置
         self.dialog.update_idletasks()
         x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
         y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f"+{x}+{y}")
     
+    def preload_users(self):
+        """アカウント一覧の先読み（ワーカースレッドで実行）
+        
+        共有DBに接続できない・ロックされている場合は何もしない。
+        ログイン時に authenticate_user がそのアカウントだけを直接読み込む。
+        """
+        try:
+            self.db_manager.load_user_directory()
+        except (sqlite3.Error, OSError):
+            pass
+    
     def setup_ui(self):
         """ログインUI設定"""
         main_frame = ttk.Frame(self.dialog, padding="20")
@@ -44,14 +66,23 @@ class LoginDialog:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=2, pady=20)
         
-        ttk.Button(button_frame, text="ログイン", command=self.login).grid(row=0, column=0, padx=5)
+        self.login_button = ttk.Button(button_frame, text="ログイン", command=self.login)
+        self.login_button.grid(row=0, column=0, padx=5)
         ttk.Button(button_frame, text="キャンセル", command=self.cancel).grid(row=0, column=1, padx=5)
         
+        # 認証中の表示
+        self.status_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.status_var,
+                 foreground='gray').grid(row=4, column=0, columnspan=2)
+        
         # Enterキーでログイン
         self.dialog.bind('<Return>', lambda e: self.login())
     
     def login(self):
-        """ログイン処理"""
+        """ログイン処理（パスワード照合はワーカースレッドで実行）"""
+        if self.authenticating:
+            return
+        
         username = self.username_var.get()
         password = self.password_var.get()
         
@@ -59,37 +90,51 @@ class LoginDialog:
             messagebox.showerror("エラー", "ユーザー名とパスワードを入力してください")
             return
         
-        # 簡易的な認証（実際の運用では適切な認証システムを使用）
-        # ここではデモ用のハードコードされた認証
-        users = {
-            'admin': {
-                'password_hash': hashlib.sha256('admin123'.encode()).hexdigest(),
-                'name': '管理者',
-                'id': 'ADM001',
-                'is_admin': True
-            },
-            'user1': {
-                'password_hash': hashlib.sha256('user123'.encode()).hexdigest(),
-                'name': '田中太郎',
-                'id': 'USR001',
-                'is_admin': False
-            }
-        }
-        
-        if username in users:
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            if users[username]['password_hash'] == password_hash:
-                self.user_info = {
-                    'username': username,
-                    'name': users[username]['name'],
-                    'id': users[username]['id'],
-                    'is_admin': users[username]['is_admin']
-                }
-                self.dialog.destroy()
-            else:
-                messagebox.showerror("ログインエラー", "パスワードが正しくありません")
+        self.authenticating = True
+        self.login_button.config(state=tk.DISABLED)
+        self.status_var.set("認証中...")
+        
+        def authenticate():
+            try:
+                result = self.db_manager.authenticate_user(username, password)
+            except Exception as e:
+                result = {'success': False, 'reason': 'error', 'error': str(e)}
+            self.results.put(result)
+        
+        threading.Thread(target=authenticate, daemon=True).start()
+        self.dialog.after(self.POLL_INTERVAL_MS, self.check_result)
+    
+    def check_result(self):
+        """認証結果を受け取りUIに反映"""
+        try:
+            result = self.results.get_nowait()
+        except queue.Empty:
+            self.dialog.after(self.POLL_INTERVAL_MS, self.check_result)
+            return
+        
+        self.authenticating = False
+        self.login_button.config(state=tk.NORMAL)
+        self.status_var.set("")
+        
+        if result['success']:
+            self.user_info = result['user']
+            self.dialog.destroy()
+            return
+        
+        reason = result['reason']
+        if reason == 'unknown_user':
+            messagebox.showerror("ログインエラー",
+                                 "ユーザー名が見つかりません\n"
+                                 "（アカウントの登録は管理者が cli.py users add で行います）")
+        elif reason == 'locked':
+            messagebox.showerror("ログインエラー",
+                                 "ログイン失敗が続いたためアカウントがロックされています。\n"
+                                 "しばらくしてから再度お試しください")
+        elif reason == 'bad_password':
+            messagebox.showerror("ログインエラー",
+                                 f"パスワードが正しくありません（残り{result['remaining_attempts']}回）")
         else:
-            messagebox.showerror("ログインエラー", "ユーザー名が見つかりません")
+            messagebox.showerror("ログインエラー", f"認証に失敗しました: {result.get('error', '')}")
     
     def cancel(self):
         """キャンセル"""
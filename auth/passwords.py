@@ -0,0 +1,49 @@
+# auth/passwords.py
+import hashlib
+import hmac
+import os
+
+# scrypt: N=2^14, r=8, p=1（約16MBのメモリを使用、一般的なPCで数十ミリ秒）
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# scryptが使えない環境向けのPBKDF2反復回数
+PBKDF2_ITERATIONS = 240000
+
+SALT_BYTES = 16
+
+
+def hash_password(password):
+    """ソルト付きでパスワードをハッシュ化し、保存用文字列を返す"""
+    salt = os.urandom(SALT_BYTES)
+
+    if hasattr(hashlib, 'scrypt'):
+        digest = hashlib.scrypt(password.encode(), salt=salt,
+                                n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, stored_hash):
+    """保存用文字列と照合（定数時間比較）"""
+    try:
+        algorithm, *params = stored_hash.split('$')
+
+        if algorithm == 'scrypt':
+            n, r, p, salt_hex, digest_hex = params
+            digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt_hex),
+                                    n=int(n), r=int(r), p=int(p))
+        elif algorithm == 'pbkdf2_sha256':
+            iterations, salt_hex, digest_hex = params
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode(),
+                                         bytes.fromhex(salt_hex), int(iterations))
+        else:
+            return False
+
+    except (ValueError, AttributeError):
+        return False
+
+    return hmac.compare_digest(digest, bytes.fromhex(digest_hex))
@@ -0,0 +1,148 @@
+# benchmarks/bench_row_model.py
+"""一覧表示用の行生成コストの比較（旧: sqlite3.Row + 行ごとの整形 / 新: SQL整形 + 行タプルの切り出し）
+
+実行: python benchmarks/bench_row_model.py [行数]
+Tk への挿入は含まず、DB から Treeview に渡す values タプルを作るまでを計測する。
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import enums
+from database.dates import date_to_epoch
+from database.db_manager import STATUS_NAME, TYPE_NAME, DatabaseManager
+from database.rows import HISTORY_VALUES
+
+# 改修前の refresh_history と同じSELECT（LIMITなし、状態・種別はコードから名前に戻す）
+LEGACY_QUERY = f'''
+    SELECT 
+        r.request_id, r.request_date, r.applicant_name,
+        t.student_number, t.student_name, {TYPE_NAME} as correction_type,
+        {STATUS_NAME} as status, r.approver_name, r.reason,
+        CASE WHEN r.correction_type = {enums.ATTENDANCE} THEN a.subject ELSE '' END as subject,
+        CASE WHEN r.correction_type = {enums.ATTENDANCE} THEN a.course_name ELSE g.course_name END as course_name,
+        CASE WHEN r.correction_type = {enums.ATTENDANCE} THEN a.period_number ELSE '' END as period,
+        CASE 
+            WHEN r.correction_type = {enums.ATTENDANCE} THEN a.before_status || '→' || a.after_status
+            ELSE CASE 
+                WHEN g.before_evaluation IS NOT NULL THEN '評価:' || g.before_evaluation || '→' || g.after_evaluation
+                ELSE '観点:' || g.before_observation || '→' || g.after_observation
+            END
+        END as change_detail
+    FROM correction_requests r
+    LEFT JOIN correction_targets t ON r.request_id = t.request_id
+    LEFT JOIN attendance_corrections a ON t.target_id = a.target_id
+    LEFT JOIN grade_corrections g ON t.target_id = g.target_id
+    ORDER BY r.request_date DESC
+'''
+
+
+def populate(db_manager, rows):
+    """ベンチマーク用の申請データを一括投入"""
+    connection = sqlite3.connect(db_manager.db_path)
+    with connection:
+        for i in range(rows):
+            cursor = connection.execute('''
+                INSERT INTO correction_requests (request_epoch, applicant_name, reason, correction_type, status)
+                VALUES (CAST(strftime('%s', '2024-04-01', ?) AS INTEGER), '記入者', ?, ?, ?)
+            ''', (f'+{i} minutes', '理由' * (5 + i % 30),
+                  enums.ATTENDANCE if i % 2 == 0 else enums.GRADE,
+                  (enums.PENDING, enums.APPROVED, enums.REJECTED)[i % 3]))
+            target = connection.execute('''
+                INSERT INTO correction_targets (request_id, student_number, student_name)
+                VALUES (?, ?, '生徒')
+            ''', (cursor.lastrowid, f'F{i % 9999:04d}')).lastrowid
+            if i % 2 == 0:
+                connection.execute('''
+                    INSERT INTO attendance_corrections (target_id, attendance_epoch, period_number,
+                        subject, course_name, before_status, after_status)
+                    VALUES (?, ?, '1,2', '数学', '数学A', '欠席', '出席')
+                ''', (target, date_to_epoch('2024-05-01')))
+            else:
+                connection.execute('''
+                    INSERT INTO grade_corrections (target_id, course_name, correction_item,
+                        before_evaluation, after_evaluation)
+                    VALUES (?, '英語B', ?, 3, 4)
+                ''', (target, enums.CORRECTION_ITEM_BITS['evaluation']))
+    connection.close()
+
+
+def fetch_only(db_path):
+    """参考：整形なしでタプルを取得するだけのコスト"""
+    connection = sqlite3.connect(db_path)
+    values = connection.execute(LEGACY_QUERY).fetchall()
+    connection.close()
+    return values
+
+
+def legacy(db_path):
+    """改修前：sqlite3.Row、行ごとに辞書を作成し Python 側で分割・切り詰め"""
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    values = []
+    for row in connection.execute(LEGACY_QUERY).fetchall():
+        status_map = {'pending': '処理中', 'approved': '承認済', 'rejected': '差戻し'}
+        type_map = {'attendance': '出欠', 'grade': '成績'}
+        if row['request_date']:
+            date_parts = row['request_date'].split(' ')
+            date_str = date_parts[0] if len(date_parts) > 0 else ''
+            time_str = date_parts[1][:5] if len(date_parts) > 1 else ''
+        else:
+            date_str = ''
+            time_str = ''
+        reason_short = row['reason'][:30] + '...' if len(row['reason'] or '') > 30 else row['reason']
+        values.append((
+            date_str, time_str, row['applicant_name'] or '', row['student_number'] or '',
+            row['student_name'] or '', type_map.get(row['correction_type'], ''),
+            row['subject'] or '', row['course_name'] or '',
+            row['period'] + '限' if row['period'] else '',
+            row['change_detail'] or '', reason_short or '',
+            status_map.get(row['status'], ''), row['approver_name'] or ''
+        ))
+    connection.close()
+    return values
+
+
+def compact(db_manager, rows):
+    """改修後：表示名を含めて SQL 側で整形し、行タプルの末尾を values として切り出す"""
+    return [row[HISTORY_VALUES] for row in db_manager.fetch_history_rows(limit=rows)]
+
+
+def measure(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_manager = DatabaseManager(os.path.join(work_dir, 'bench.db'))
+        db_manager.initialize_database()
+        populate(db_manager, rows)
+
+        fetch_seconds, _ = measure(lambda: fetch_only(db_manager.db_path))
+        legacy_seconds, legacy_values = measure(lambda: legacy(db_manager.db_path))
+        compact_seconds, compact_values = measure(lambda: compact(db_manager, rows))
+
+        assert legacy_values == compact_values, '整形結果が一致しません'
+
+        print(f"{rows} 行")
+        print(f"  参考（SQL実行とタプル取得のみ） : {fetch_seconds * 1000:8.1f} ms"
+              f"  {fetch_seconds / rows * 1e6:6.2f} µs/行")
+        print(f"  旧（sqlite3.Row + 行ごとの整形）: {legacy_seconds * 1000:8.1f} ms"
+              f"  {legacy_seconds / rows * 1e6:6.2f} µs/行")
+        print(f"  新（SQL整形 + 末尾の切り出し） : {compact_seconds * 1000:8.1f} ms"
+              f"  {compact_seconds / rows * 1e6:6.2f} µs/行")
+
+
+if __name__ == '__main__':
+    main()
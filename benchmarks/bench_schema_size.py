@@ -0,0 +1,212 @@
+# benchmarks/bench_schema_size.py
+"""スキーマ移行前後のファイル・テーブル・インデックスのサイズ比較
+
+実行: python benchmarks/bench_schema_size.py [年数] [1年あたりの申請数]
+旧形式（状態・種別・訂正項目を文字列で保存）のDBに複数年度分の申請を作り、
+VACUUM 後のサイズを測ってから DatabaseManager.initialize_database で移行し、
+再度 VACUUM して比較する。テーブル・インデックスごとのサイズは dbstat で求める。
+"""
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+
+# 移行前（バージョン0）の申請テーブルとインデックス
+LEGACY_SCHEMA = '''
+    CREATE TABLE correction_requests (
+        request_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        applicant_name VARCHAR(100) NOT NULL,
+        applicant_id VARCHAR(50),
+        reason TEXT NOT NULL,
+        correction_type VARCHAR(20) NOT NULL,
+        status VARCHAR(20) DEFAULT 'pending',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        created_by_ip VARCHAR(45),
+        created_by_hostname VARCHAR(255),
+        created_by_user_agent TEXT,
+        created_by_os VARCHAR(100),
+        approved_date DATETIME,
+        approver_name VARCHAR(100),
+        approver_id VARCHAR(50),
+        approved_by_ip VARCHAR(45),
+        approved_by_hostname VARCHAR(255),
+        approved_by_user_agent TEXT,
+        approved_by_os VARCHAR(100),
+        rejection_reason TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        client_request_key VARCHAR(64),
+        version INTEGER NOT NULL DEFAULT 0,
+        due_at DATETIME,
+        claimed_by VARCHAR(100),
+        claimed_until DATETIME
+    );
+    CREATE TABLE correction_targets (
+        target_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id INTEGER NOT NULL,
+        student_number VARCHAR(4) NOT NULL,
+        student_name VARCHAR(100) NOT NULL
+    );
+    CREATE TABLE attendance_corrections (
+        correction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target_id INTEGER NOT NULL,
+        attendance_date DATE NOT NULL,
+        period_number INTEGER NOT NULL,
+        subject VARCHAR(50) NOT NULL,
+        course_name VARCHAR(100) NOT NULL,
+        before_status VARCHAR(20) NOT NULL,
+        after_status VARCHAR(20) NOT NULL,
+        link_to_grade BOOLEAN DEFAULT 1,
+        link_to_observation BOOLEAN DEFAULT 1,
+        link_to_total BOOLEAN DEFAULT 1
+    );
+    CREATE TABLE grade_corrections (
+        correction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target_id INTEGER NOT NULL,
+        course_name VARCHAR(100) NOT NULL,
+        correction_item VARCHAR(20) NOT NULL,
+        before_evaluation INTEGER,
+        after_evaluation INTEGER,
+        before_observation VARCHAR(3),
+        after_observation VARCHAR(3)
+    );
+    CREATE TABLE correction_periods (
+        period_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target_id INTEGER NOT NULL,
+        period_name VARCHAR(30) NOT NULL
+    );
+    CREATE UNIQUE INDEX idx_request_client_key ON correction_requests(client_request_key);
+    CREATE INDEX idx_request_status ON correction_requests(status);
+    CREATE INDEX idx_request_date ON correction_requests(request_date);
+    CREATE INDEX idx_request_queue ON correction_requests(due_at, request_id) WHERE status = 'pending';
+    CREATE INDEX idx_student_number ON correction_targets(student_number);
+    CREATE INDEX idx_target_request ON correction_targets(request_id);
+    CREATE INDEX idx_attendance_target ON attendance_corrections(target_id);
+    CREATE INDEX idx_grade_target ON grade_corrections(target_id);
+    CREATE INDEX idx_attendance_date_course ON attendance_corrections(attendance_date, course_name);
+'''
+
+CORE_OBJECTS = ('correction_requests', 'correction_targets', 'attendance_corrections',
+                'grade_corrections', 'correction_periods')
+
+COURSES = ('数学IA', '英語コミュニケーションI', '物理基礎', '現代の国語', '歴史総合', '情報I')
+GRADE_ITEMS = ('evaluation', 'observation', 'evaluation,observation', 'evaluation,total',
+               'evaluation,observation,total')
+
+
+def populate_legacy(path, years, per_year):
+    """旧形式のDBに years 年度分の申請（承認済みが大半、直近のみ承認待ちを含む）を作成"""
+    random.seed(47)
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    total = years * per_year
+    with connection:
+        for i in range(total):
+            year = 2025 - years + 1 + i // per_year
+            day = (i % per_year) * 365 // per_year
+            is_attendance = i % 3 != 0
+            status = 'pending' if i > total - 50 else random.choice(('approved',) * 9 + ('rejected',))
+            request_id = connection.execute('''
+                INSERT INTO correction_requests (
+                    request_date, applicant_name, applicant_id, reason, correction_type, status,
+                    created_at, created_by_ip, created_by_hostname, created_by_os,
+                    approved_date, approver_name, updated_at, client_request_key, version
+                ) VALUES (datetime(?, ?), ?, ?, ?, ?, ?, datetime(?, ?), '192.168.1.20', 'PC-SHOKUIN-01',
+                          'Windows 11', CASE WHEN ? = 'approved' THEN datetime(?, ?, '+1 day') END,
+                          '教務主任', datetime(?, ?, '+1 day'), lower(hex(randomblob(16))),
+                          CASE WHEN ? = 'pending' THEN 0 ELSE 1 END)
+            ''', (f'{year}-04-01', f'+{day} days', f'教員{i % 40}', f'T{i % 40:03d}',
+                  '入力誤りのため訂正します' + '。' * (i % 20),
+                  'attendance' if is_attendance else 'grade', status,
+                  f'{year}-04-01', f'+{day} days', status, f'{year}-04-01', f'+{day} days',
+                  f'{year}-04-01', f'+{day} days', status)).lastrowid
+
+            for position in range(1 + i % 2):
+                target_id = connection.execute('''
+                    INSERT INTO correction_targets (request_id, student_number, student_name)
+                    VALUES (?, ?, ?)
+                ''', (request_id, f'{1 + (i + position) % 3}{(i + position) % 8 + 1}{(i + position) % 40 + 1:02d}',
+                      f'生徒{(i + position) % 960}')).lastrowid
+                connection.execute('''
+                    INSERT INTO correction_periods (target_id, period_name) VALUES (?, ?)
+                ''', (target_id, ('1学期', '2学期', '3学期', '学年')[i % 4]))
+
+                if is_attendance:
+                    connection.execute('''
+                        INSERT INTO attendance_corrections (
+                            target_id, attendance_date, period_number, subject, course_name,
+                            before_status, after_status
+                        ) VALUES (?, date(?, ?), ?, ?, ?, ?, ?)
+                    ''', (target_id, f'{year}-04-01', f'+{day} days', ('1', '2', '3,4', '5,6')[i % 4],
+                          '数学', random.choice(COURSES), '欠席', ('出席', '遅刻', '早退')[i % 3]))
+                else:
+                    connection.execute('''
+                        INSERT INTO grade_corrections (
+                            target_id, course_name, correction_item, before_evaluation, after_evaluation,
+                            before_observation, after_observation
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (target_id, random.choice(COURSES), GRADE_ITEMS[i % len(GRADE_ITEMS)],
+                          random.randint(1, 4), random.randint(2, 5), 'BBC', 'ABB'))
+    connection.execute('VACUUM')
+    connection.close()
+
+
+def measure(path):
+    """ファイルサイズと、申請テーブル・そのインデックスごとのサイズ（バイト）"""
+    connection = sqlite3.connect(path)
+    placeholders = ','.join('?' * len(CORE_OBJECTS))
+    objects = connection.execute(f'''
+        SELECT s.name, s.type, SUM(d.pgsize)
+        FROM sqlite_master s
+        JOIN dbstat d ON d.name = s.name
+        WHERE s.tbl_name IN ({placeholders}) AND s.type IN ('table', 'index')
+        GROUP BY s.name
+    ''', CORE_OBJECTS).fetchall()
+    connection.close()
+    return os.path.getsize(path), {name: (object_type, size) for name, object_type, size in objects}
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_year = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        legacy_path = os.path.join(work_dir, 'legacy.db')
+        migrated_path = os.path.join(work_dir, 'migrated.db')
+        populate_legacy(legacy_path, years, per_year)
+        shutil.copy(legacy_path, migrated_path)
+
+        DatabaseManager(migrated_path).initialize_database()
+        connection = sqlite3.connect(migrated_path)
+        connection.execute('VACUUM')
+        connection.close()
+
+        before_size, before = measure(legacy_path)
+        after_size, after = measure(migrated_path)
+
+    def ratio(old, new):
+        return f'{(new - old) / old * 100:+.1f}%' if old else ''
+
+    print(f'{years} 年度 × {per_year} 件（申請 {years * per_year} 件）')
+    print(f"  {'':36s}{'移行前':>12s}{'移行後':>12s}{'増減':>9s}")
+    for name in sorted(set(before) | set(after), key=lambda name: (before.get(name, after.get(name))[0] == 'index', name)):
+        old = before.get(name, ('', 0))[1]
+        new = after.get(name, ('', 0))[1]
+        print(f'  {name:36s}{old / 1024:10.0f}KB{new / 1024:10.0f}KB{ratio(old, new):>9s}')
+    old_total = sum(size for _, size in before.values())
+    new_total = sum(size for _, size in after.values())
+    print(f"  {'申請テーブル・インデックス計':22s}{old_total / 1024:10.0f}KB{new_total / 1024:10.0f}KB"
+          f'{ratio(old_total, new_total):>9s}')
+    # 移行後のファイルには initialize_database が作る利用者・集計などのテーブルも含む
+    print(f"  {'ファイル全体':30s}{before_size / 1024:10.0f}KB{after_size / 1024:10.0f}KB"
+          f'{ratio(before_size, after_size):>9s}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# benchmarks/load_test.py
+"""共有DBの同時アクセス負荷試験（複数プロセスで教員・管理者の操作を模擬）
+
+実行: python benchmarks/load_test.py [--clients 1,4,8,16] [--journal-modes delete,wal]
+                                    [--timeouts 0.1,5] [--duration 5] [--rows 2000] [--think-ms 0]
+申請を投入した一時DBを作り、条件（ジャーナルモード × 待ち時間 × 同時端末数）ごとに
+そのコピーに対して clients 個のプロセスを同時に動かす。各プロセスは OPERATION_MIX の比率で
+申請・承認待ち一覧の更新・履歴一覧の更新・承認を繰り返し、処理件数・遅延（p50/p95/p99）・
+ロックエラー（database is locked）の割合を集計する。
+ファイルサーバー上の共有DBでは WAL を使えないため、wal の結果はサービスモード
+（サーバー1台でDBを開く構成）の参考値として扱う。
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_row_model import populate
+from database.db_manager import DatabaseManager
+
+# 操作と比率（教員の申請・一覧の更新が大半で、管理者が一覧を見て承認する）
+OPERATION_MIX = (
+    ('save', 30),
+    ('pending', 30),
+    ('history', 30),
+    ('approve', 10),
+)
+
+SYSTEM_INFO = {'ip_address': '127.0.0.1', 'hostname': 'load-test', 'os_info': 'load-test'}
+
+
+def is_lock_error(message):
+    return 'locked' in message or 'busy' in message
+
+
+def result_outcome(result):
+    """DatabaseManager の戻り値を ok / conflict / locked / error に分類"""
+    if result['success']:
+        return 'ok'
+    if result.get('conflict'):
+        return 'conflict'
+    return 'locked' if is_lock_error(result.get('error') or '') else 'error'
+
+
+def save(db_manager, rng, client_id, sequence):
+    """出欠訂正を1件申請"""
+    form_data = {
+        'applicant_name': f'教員{client_id}',
+        'applicant_id': f'T{client_id:03d}',
+        'reason': '入力誤りのため訂正します',
+        'correction_type': 'attendance',
+        'students': [{'number': f'F{rng.randrange(10000):04d}', 'name': '生徒'}],
+        'periods': ['前期'],
+        'client_request_key': f'load-{client_id}-{sequence}',
+        'attendance': {
+            'date': f'2024-05-{rng.randint(1, 31):02d}',
+            'period': str(rng.randint(1, 6)),
+            'subject': '数学',
+            'course_name': '数学A',
+            'before_status': '欠席',
+            'after_status': '出席',
+        },
+    }
+    return result_outcome(db_manager.save_correction_request(form_data, SYSTEM_INFO))
+
+
+def refresh_pending(db_manager, rng, client_id, sequence):
+    db_manager.fetch_pending_rows(limit=200)
+    return 'ok'
+
+
+def refresh_history(db_manager, rng, client_id, sequence):
+    db_manager.fetch_history_rows(limit=200)
+    return 'ok'
+
+
+def approve(db_manager, rng, client_id, sequence):
+    """承認待ちの先頭から1件選んで承認（一覧の取得を含む）"""
+    rows = db_manager.fetch_pending_rows(limit=20)
+    if not rows:
+        return 'ok'
+    row = rng.choice(rows)
+    return result_outcome(db_manager.approve_request(row.request_id, '管理者',
+                                                     expected_version=row.version))
+
+
+OPERATIONS = {
+    'save': save,
+    'pending': refresh_pending,
+    'history': refresh_history,
+    'approve': approve,
+}
+
+
+def run_client(db_path, journal_mode, timeout, client_id, start_at, duration, think_seconds):
+    """1端末分の操作を start_at から duration 秒繰り返し、(操作, 結果, 秒) の一覧を返す"""
+    db_manager = DatabaseManager(db_path, timeout=timeout, journal_mode=journal_mode)
+    rng = random.Random(client_id)
+    operations, weights = zip(*OPERATION_MIX)
+    samples = []
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + duration
+    sequence = 0
+    while time.time() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            outcome = OPERATIONS[operation](db_manager, rng, client_id, sequence)
+        except sqlite3.Error as e:
+            db_manager.close()
+            outcome = 'locked' if is_lock_error(str(e)) else 'error'
+        samples.append((operation, outcome, time.perf_counter() - started))
+        sequence += 1
+        if think_seconds:
+            time.sleep(rng.uniform(0, 2 * think_seconds))
+    return samples
+
+
+def percentiles(latencies):
+    """p50 / p95 / p99（ミリ秒）"""
+    if not latencies:
+        return (0.0, 0.0, 0.0)
+    if len(latencies) == 1:
+        return (latencies[0] * 1000,) * 3
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return tuple(cuts[p - 1] * 1000 for p in (50, 95, 99))
+
+
+def summarize(samples, duration):
+    """処理件数/秒・遅延・結果の割合"""
+    total = len(samples)
+    counts = {}
+    for _, outcome, _ in samples:
+        counts[outcome] = counts.get(outcome, 0) + 1
+    p50, p95, p99 = percentiles([seconds for _, _, seconds in samples])
+    return {
+        'operations': total,
+        'throughput': counts.get('ok', 0) / duration,
+        'p50': p50,
+        'p95': p95,
+        'p99': p99,
+        'locked_rate': counts.get('locked', 0) / total if total else 0.0,
+        'conflict_rate': counts.get('conflict', 0) / total if total else 0.0,
+        'errors': counts.get('error', 0),
+    }
+
+
+def run_case(template_path, work_dir, journal_mode, timeout, clients, duration, think_seconds):
+    """テンプレートのコピーに対して1条件を実行し、全端末の測定値を返す"""
+    db_path = os.path.join(work_dir, f'load-{journal_mode}-{timeout}-{clients}.db')
+    shutil.copy(template_path, db_path)
+
+    # WAL への切り替えは端末の起動前に済ませる
+    db_manager = DatabaseManager(db_path, journal_mode=journal_mode)
+    db_manager.connect()
+    db_manager.close()
+
+    start_at = time.time() + 1.0 + clients * 0.1
+    arguments = [(db_path, journal_mode, timeout, client_id, start_at, duration, think_seconds)
+                 for client_id in range(clients)]
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(run_client, arguments)
+    return [sample for samples in results for sample in samples]
+
+
+def parse_list(text, cast):
+    return [cast(part) for part in text.split(',') if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共有DBの同時アクセス負荷試験')
+    parser.add_argument('--clients', default='1,4,8,16', help='同時に操作する端末数（カンマ区切り）')
+    parser.add_argument('--journal-modes', default='delete,wal',
+                        help=f"ジャーナルモード（{', '.join(DatabaseManager.JOURNAL_MODES)}）")
+    parser.add_argument('--timeouts', default='0.1,5', help='ロック待ちの上限（秒、カンマ区切り）')
+    parser.add_argument('--duration', type=float, default=5.0, help='1条件あたりの実行時間（秒）')
+    parser.add_argument('--rows', type=int, default=2000, help='事前に投入する申請数')
+    parser.add_argument('--think-ms', type=float, default=0.0,
+                        help='操作の間隔の平均（ミリ秒、0 なら間隔なし）')
+    parser.add_argument('--by-operation', action='store_true', help='操作ごとの内訳も表示')
+    args = parser.parse_args()
+
+    clients_list = parse_list(args.clients, int)
+    journal_modes = parse_list(args.journal_modes, str.lower)
+    timeouts = parse_list(args.timeouts, float)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 申請データを投入したテンプレート（集計・期限は2回目の初期化で作成）
+        template_path = os.path.join(work_dir, 'template.db')
+        template = DatabaseManager(template_path)
+        template.initialize_database()
+        populate(template, args.rows)
+        template.initialize_database()
+
+        print(f"申請 {args.rows} 件、1条件 {args.duration:g} 秒、操作の比率 "
+              + ' / '.join(f'{name} {weight}' for name, weight in OPERATION_MIX))
+        print(f"{'モード':8s}{'待ち(秒)':>8s}{'端末':>6s}{'件/秒':>9s}"
+              f"{'p50(ms)':>10s}{'p95(ms)':>10s}{'p99(ms)':>10s}{'ロック':>9s}{'競合':>8s}{'他':>5s}")
+
+        for journal_mode in journal_modes:
+            for timeout in timeouts:
+                for clients in clients_list:
+                    samples = run_case(template_path, work_dir, journal_mode, timeout, clients,
+                                       args.duration, args.think_ms / 1000)
+                    groups = [('', samples)]
+                    if args.by_operation:
+                        groups += [(f'  {name}', [s for s in samples if s[0] == name])
+                                   for name, _ in OPERATION_MIX]
+                    for label, group in groups:
+                        summary = summarize(group, args.duration)
+                        head = (f'{journal_mode:10s}{timeout:8g}{clients:6d}' if not label
+                                else f'{label:24s}')
+                        print(f"{head}{summary['throughput']:9.1f}"
+                              f"{summary['p50']:10.1f}{summary['p95']:10.1f}{summary['p99']:10.1f}"
+                              f"{summary['locked_rate']:9.1%}{summary['conflict_rate']:8.1%}"
+                              f"{summary['errors']:5d}")
+
+
+if __name__ == '__main__':
+    main()
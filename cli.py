@@ -0,0 +1,576 @@
+# cli.py
+"""成績訂正申請システム - コマンドライン操作
+
+画面を使わずに共有DBを直接操作する（学期末の一括処理・ファイルサーバー上での実行用）。
+tkinter は読み込まないため、画面のないサーバーにSSHで接続しても実行できる。
+    python cli.py list --status pending --course 数学IA
+    python cli.py approve --user admin --status pending --from 2024-07-01 --to 2024-07-31
+    python cli.py export --output requests.csv
+    python cli.py export --type attendance --attendance-from 2024-10-01 --attendance-to 2025-03-31
+    python cli.py import requests.jsonl
+    python cli.py maintenance
+    python cli.py maintenance --full
+    python cli.py stats --month 2024-07
+    python cli.py backup
+    python cli.py grades load grades.csv
+    python cli.py queue --limit 20
+    python cli.py grades report --course 数学IA --since 2024-07-01
+    python cli.py users add admin --name 管理者 --admin
+    python cli.py users add t.tanaka --name 田中太郎 --staff-id T0123 --user admin
+    python cli.py users password t.tanaka
+"""
+import argparse
+import csv
+import getpass
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+from database.db_manager import DatabaseManager
+from utils.notifier import ChangeNotifier
+from utils.settings import load_settings
+from utils.system_info import SystemInfo
+
+# 承認・却下の操作者のパスワード（未設定なら入力を求める）
+PASSWORD_ENV = 'GRADE_CORRECTION_PASSWORD'
+
+# users add / password で設定するパスワード（未設定なら2回入力を求める）
+NEW_PASSWORD_ENV = 'GRADE_CORRECTION_NEW_PASSWORD'
+
+# 設定できるパスワードの最小文字数
+MIN_PASSWORD_LENGTH = 8
+
+# list の既定の表示列
+LIST_COLUMNS = (
+    'request_id', 'request_date', 'status', 'correction_type', 'student_number',
+    'student_name', 'course_name', 'applicant_name',
+)
+
+# queue の表示列（期限の近い順）
+QUEUE_COLUMNS = (
+    'shard', 'request_id', 'due_at', 'overdue', 'claimed_by', 'request_date', 'correction_type',
+    'student_number', 'student_name', 'applicant_name',
+)
+
+# import で各行に必要な項目
+REQUIRED_FIELDS = ('applicant_name', 'reason', 'correction_type', 'students', 'periods')
+
+# grades load で読み込む校務システムの成績CSVの列（見出し行が必要）
+GRADE_COLUMNS = ('student_number', 'course_name', 'student_name', 'evaluation', 'observation')
+
+
+def write_rows(rows, output, output_format, columns=None):
+    """行を1件ずつ tsv / csv / jsonl で書き出し、件数を返す"""
+    writer = None
+    count = 0
+    for row in rows:
+        record = row._asdict()
+        if columns:
+            record = {column: record[column] for column in columns}
+
+        if output_format == 'jsonl':
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            if writer is None:
+                writer = csv.writer(output, delimiter='\t' if output_format == 'tsv' else ',',
+                                    lineterminator='\n')
+                writer.writerow(record.keys())
+            writer.writerow(['' if value is None else value for value in record.values()])
+        count += 1
+    return count
+
+
+def target_managers(db_manager, args):
+    """--shard / --all-shards から対象のDBを決める"""
+    if args.all_shards:
+        return [db_manager, *db_manager.shards.values()]
+    if args.shard:
+        if args.shard != db_manager.shard_name and args.shard not in db_manager.shards:
+            raise SystemExit(f"校舎 {args.shard} は settings.json の shards に登録されていません")
+        return [db_manager.for_shard(args.shard)]
+    return [db_manager]
+
+
+def request_filters(args):
+    return {
+        'status': None if args.status == 'all' else args.status,
+        'correction_type': args.type,
+        'student_number': args.student,
+        'course_name': args.course,
+        'applicant_name': args.applicant,
+        'date_from': args.date_from,
+        'date_to': args.date_to,
+        'attendance_from': args.attendance_from,
+        'attendance_to': args.attendance_to,
+        'request_ids': [int(i) for i in args.ids.split(',')] if args.ids else None,
+    }
+
+
+def iter_selected(db_manager, args, **overrides):
+    """対象の全DBから条件に合う行を順に返す"""
+    filters = request_filters(args)
+    filters.update(overrides)
+    for manager in target_managers(db_manager, args):
+        yield from manager.iter_requests(**filters)
+
+
+def iter_pending_requests(db_manager, args):
+    """条件に合う承認待ちの申請を (校舎, 申請ID, version) で1件ずつ返す
+
+    対象者が複数の申請は複数行になるが、行は申請ごとに連続するため直前の行とだけ比較する。
+    """
+    previous = None
+    for row in iter_selected(db_manager, args, status='pending'):
+        key = (row.shard, row.request_id)
+        if key != previous:
+            previous = key
+            yield row.shard, row.request_id, row.version
+
+
+def authenticate_admin(db_manager, username):
+    """承認・却下を行う管理者アカウントを確認"""
+    password = os.environ.get(PASSWORD_ENV) or getpass.getpass(f"{username} のパスワード: ")
+    result = db_manager.authenticate_user(username, password)
+    if not result['success']:
+        raise SystemExit(f"ログインできません: {result['reason']}")
+    if not result['user']['is_admin']:
+        raise SystemExit("管理者権限が必要です")
+    return result['user']
+
+
+def read_new_password(username):
+    """設定するパスワード（端末では確認のため2回入力）"""
+    password = os.environ.get(NEW_PASSWORD_ENV)
+    if not password:
+        password = getpass.getpass(f"{username} の新しいパスワード: ")
+        if password != getpass.getpass("確認のためもう一度入力: "):
+            raise SystemExit("パスワードが一致しません")
+    if len(password) < MIN_PASSWORD_LENGTH:
+        raise SystemExit(f"パスワードは {MIN_PASSWORD_LENGTH} 文字以上にしてください")
+    return password
+
+
+def confirm(message, assume_yes):
+    if assume_yes:
+        return True
+    if not sys.stdin.isatty():
+        raise SystemExit("確認できないため中止しました（--yes を指定してください）")
+    return input(f"{message} [y/N]: ").strip().lower() in ('y', 'yes')
+
+
+# --- サブコマンド ---
+
+def command_list(db_manager, args, output):
+    columns = LIST_COLUMNS
+    if args.all_shards or args.shard:
+        columns = ('shard',) + columns
+    write_rows(iter_selected(db_manager, args), output, args.format, None if args.full else columns)
+    return 0
+
+
+def command_export(db_manager, args, output):
+    if args.output and args.output != '-':
+        with open(args.output, 'w', encoding=args.encoding, newline='') as f:
+            count = write_rows(iter_selected(db_manager, args), f, args.format)
+        print(f"{count} 行を出力しました: {args.output}", file=sys.stderr)
+    else:
+        write_rows(iter_selected(db_manager, args), output, args.format)
+    return 0
+
+
+def command_decide(db_manager, args, output):
+    """approve / reject：条件に合う承認待ちの申請を一括で処理"""
+    targets = list(iter_pending_requests(db_manager, args))
+    action = '承認' if args.command == 'approve' else '却下'
+    if not targets:
+        print(f"{action}する承認待ちの申請はありません", file=sys.stderr)
+        return 0
+
+    if args.dry_run:
+        for shard, request_id, version in targets:
+            output.write(f"{action}予定\t{shard}\t{request_id}\n")
+        print(f"{len(targets)} 件（--dry-run のため変更していません）", file=sys.stderr)
+        return 0
+
+    user = authenticate_admin(db_manager, args.user)
+    if not confirm(f"{len(targets)} 件の申請を{action}しますか？", args.yes):
+        print("中止しました", file=sys.stderr)
+        return 1
+
+    failures = 0
+    for shard, request_id, version in targets:
+        # 一覧の取得後に他の管理者が処理した申請は version の不一致で検出する
+        if args.command == 'approve':
+            result = db_manager.approve_request(request_id, user['name'], user.get('id'),
+                                                expected_version=version, shard=shard or None)
+        else:
+            result = db_manager.reject_request(request_id, args.reason,
+                                               expected_version=version, shard=shard or None)
+
+        if result['success']:
+            output.write(f"{action}\t{shard}\t{request_id}\n")
+        else:
+            failures += 1
+            output.write(f"{'競合' if result.get('conflict') else 'エラー'}\t{shard}\t{request_id}"
+                         f"\t{result['error']}\n")
+        output.flush()
+
+    print(f"{action}: {len(targets) - failures} 件 / 失敗: {failures} 件", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def command_import(db_manager, args, output):
+    """1行に1件の申請（画面の申請内容と同じ形式のJSON）を登録
+
+    client_request_key がない行は内容から作成するため、同じファイルを再実行しても二重登録しない。
+    """
+    system_info = SystemInfo().get_info()
+    failures = 0
+
+    source = sys.stdin if args.file == '-' else open(args.file, encoding=args.encoding)
+    try:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                form_data = json.loads(line)
+                if not isinstance(form_data, dict):
+                    raise ValueError("申請はJSONのオブジェクトで指定してください")
+                missing = [field for field in REQUIRED_FIELDS if field not in form_data]
+                if missing:
+                    raise ValueError(f"項目がありません: {', '.join(missing)}")
+                if form_data['correction_type'] not in form_data:
+                    raise ValueError(f"{form_data['correction_type']} の詳細がありません")
+            except ValueError as e:
+                failures += 1
+                output.write(f"エラー\t{line_number}\t\t{e}\n")
+                continue
+
+            if not form_data.get('client_request_key'):
+                digest = hashlib.sha256(json.dumps(form_data, sort_keys=True,
+                                                   ensure_ascii=False).encode('utf-8'))
+                form_data['client_request_key'] = 'import-' + digest.hexdigest()[:40]
+
+            result = db_manager.save_correction_request(form_data, system_info)
+            if result['success']:
+                status = '登録済み' if result.get('duplicate') else '登録'
+                output.write(f"{status}\t{line_number}\t{result['request_id']}\n")
+            else:
+                failures += 1
+                output.write(f"エラー\t{line_number}\t\t{result['error']}\n")
+            output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    return 1 if failures else 0
+
+
+def command_maintenance(db_manager, args, output):
+    for manager in target_managers(db_manager, args):
+        for result in manager.run_maintenance(full=args.full):
+            output.write(f"{manager.shard_name or ''}\t{result['task']}\t"
+                         f"{result['duration_ms']}ms\t{result['result']}\n")
+            output.flush()
+    return 0
+
+
+def command_stats(db_manager, args, output):
+    if not args.month:
+        for month in db_manager.get_statistics_months():
+            output.write(month + '\n')
+        return 0
+
+    summary = db_manager.get_monthly_statistics(args.month)
+    if args.format == 'jsonl':
+        output.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        return 0
+
+    output.write(f"年月\t{summary['month']}\n")
+    output.write(f"申請件数\t{summary['total_requests']}\n")
+    for correction_type, counts in sorted(summary['by_type'].items()):
+        for status, count in sorted(counts.items()):
+            output.write(f"{correction_type}\t{status}\t{count}\n")
+    output.write(f"承認\t{summary['approved_count']}\n")
+    output.write(f"却下\t{summary['rejected_count']}\n")
+    if summary['approval_rate'] is not None:
+        output.write(f"承認率\t{summary['approval_rate']:.1%}\n")
+    if summary['average_turnaround_days'] is not None:
+        output.write(f"平均処理日数\t{summary['average_turnaround_days']:.1f}\n")
+    for course_name, count in summary['top_courses']:
+        output.write(f"講座\t{course_name}\t{count}\n")
+    return 0
+
+
+def command_backup(db_manager, args, output, backup_settings):
+    failures = 0
+    for manager in target_managers(db_manager, args):
+        manager.configure_backup(
+            args.directory or backup_settings['directory'],
+            keep=backup_settings['keep'],
+            pages_per_step=backup_settings['pages_per_step'],
+            step_sleep=backup_settings['step_sleep_seconds']
+        )
+        result = manager.backup_now()
+        if result['success']:
+            output.write(f"{manager.shard_name or ''}\t{result['path']}\t{result['size']} bytes\n")
+        else:
+            failures += 1
+            output.write(f"{manager.shard_name or ''}\tエラー\t{result['error']}\n")
+    return 1 if failures else 0
+
+
+def command_queue(db_manager, args, output):
+    """承認待ちを処理順（期限の近い順）に表示（--recompute で期限を現在の設定で再計算）"""
+    if args.recompute:
+        result = db_manager.recompute_due_dates()
+        if not result['success']:
+            print(f"エラー: {result['error']}", file=sys.stderr)
+            return 1
+        print(f"期限を再計算しました: {result['count']}件", file=sys.stderr)
+
+    write_rows(db_manager.fetch_pending_rows(limit=args.limit), output, args.format, QUEUE_COLUMNS)
+    return 0
+
+
+def command_users(db_manager, args, output):
+    """アカウントの登録・パスワード変更・ロック解除・一覧
+
+    アカウントが1件もないDBでは最初の管理者を認証なしで登録できる。
+    それ以外は --user の管理者の認証が必要（パスワード変更は本人の現在のパスワードでもよい）。
+    """
+    users = db_manager.list_users()
+    if not users:
+        if args.users_command != 'add' or not args.admin:
+            raise SystemExit("アカウントがありません。最初に users add <ユーザー名> --name <表示名> --admin "
+                             "で管理者を登録してください")
+    elif args.users_command == 'password' and args.user in (None, args.username):
+        password = os.environ.get(PASSWORD_ENV) or getpass.getpass(f"{args.username} の現在のパスワード: ")
+        result = db_manager.authenticate_user(args.username, password)
+        if not result['success']:
+            raise SystemExit(f"ログインできません: {result['reason']}")
+    elif args.user:
+        authenticate_admin(db_manager, args.user)
+    else:
+        raise SystemExit("--user で管理者のユーザー名を指定してください")
+
+    if args.users_command == 'list':
+        for user in users:
+            output.write('\t'.join([user['username'], user['display_name'], user['staff_id'] or '',
+                                    '管理者' if user['is_admin'] else '',
+                                    user['locked_until'] or '', user['last_login'] or '']) + '\n')
+        return 0
+
+    if args.users_command == 'unlock':
+        result = db_manager.unlock_user(args.username)
+    elif args.users_command == 'add':
+        result = db_manager.create_user(args.username, read_new_password(args.username),
+                                        args.name, args.staff_id, args.admin)
+    else:
+        result = db_manager.set_password(args.username, read_new_password(args.username))
+
+    if not result['success']:
+        output.write(f"エラー\t{args.username}\t{result.get('error', 'アカウントがありません')}\n")
+        return 1
+    output.write(f"{args.users_command}\t{args.username}\n")
+    return 0
+
+
+def command_grades(db_manager, args, output):
+    if args.grades_command == 'load':
+        return load_grades(db_manager, args, output)
+
+    report = db_manager.get_grade_change_report(args.course, args.since)
+    if args.format == 'jsonl':
+        output.write(json.dumps(report, ensure_ascii=False) + '\n')
+        return 0
+
+    output.write(f"講座\t{report['course_name']}\n")
+    output.write(f"人数\t{report['student_count']}\n")
+    if report['average_evaluation'] is not None:
+        output.write(f"評定平均\t{report['average_evaluation']:.2f}\n")
+    for item, values in sorted(report['distribution'].items()):
+        for value, count in values.items():
+            change = report['distribution_change'].get(item, {}).get(value, 0)
+            output.write(f"分布\t{item}\t{value}\t{count}\t{change:+d}\n")
+    for student in report['students']:
+        output.write('\t'.join(['訂正', student['student_number'], student['student_name'] or '',
+                                f"{student['before_evaluation'] or ''}→{student['after_evaluation'] or ''}",
+                                f"{student['before_observation'] or ''}→{student['after_observation'] or ''}",
+                                str(student['change_count'])]) + '\n')
+    return 0
+
+
+def load_grades(db_manager, args, output):
+    """校務システムから書き出した成績CSVを読み込む（評定・観点別評価の空欄は未入力）"""
+    source = sys.stdin if args.file == '-' else open(args.file, encoding=args.encoding, newline='')
+    try:
+        reader = csv.DictReader(source)
+        missing = [column for column in GRADE_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            output.write(f"エラー\t列がありません: {', '.join(missing)}\n")
+            return 1
+
+        rows = []
+        for line_number, record in enumerate(reader, 2):
+            evaluation = record['evaluation'].strip()
+            if evaluation and not evaluation.isdigit():
+                output.write(f"エラー\t{line_number}\t評定が数値ではありません: {evaluation}\n")
+                return 1
+            rows.append((record['student_number'].strip().upper(), record['course_name'].strip(),
+                         record['student_name'].strip() or None,
+                         int(evaluation) if evaluation else None,
+                         record['observation'].strip() or None))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    result = db_manager.load_grade_snapshots(rows)
+    if not result['success']:
+        output.write(f"エラー\t\t{result['error']}\n")
+        return 1
+    output.write(f"読み込み\t{len(rows)}件\t{len(result['courses'])}講座\n")
+    return 0
+
+
+def build_parser(settings):
+    parser = argparse.ArgumentParser(description='成績訂正申請システム コマンドライン操作')
+    parser.add_argument('--db', default=settings['database_path'])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # 申請の絞り込み（list / export / approve / reject 共通）
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument('--status', choices=('pending', 'approved', 'rejected', 'all'), default='all')
+    filters.add_argument('--type', choices=('attendance', 'grade'))
+    filters.add_argument('--student', help='組番号')
+    filters.add_argument('--course', help='講座名')
+    filters.add_argument('--applicant', help='記入者')
+    filters.add_argument('--from', dest='date_from', help='申請日（開始, YYYY-MM-DD）')
+    filters.add_argument('--to', dest='date_to', help='申請日（終了, YYYY-MM-DD）')
+    filters.add_argument('--attendance-from', help='出欠訂正の出欠日（開始, YYYY-MM-DD）')
+    filters.add_argument('--attendance-to', help='出欠訂正の出欠日（終了, YYYY-MM-DD）')
+    filters.add_argument('--ids', help='申請ID（カンマ区切り）')
+
+    # 対象の校舎（settings.json の shards）
+    shards = argparse.ArgumentParser(add_help=False)
+    group = shards.add_mutually_exclusive_group()
+    group.add_argument('--shard', help='校舎名')
+    group.add_argument('--all-shards', action='store_true', help='全校舎')
+
+    formats = ('tsv', 'csv', 'jsonl')
+
+    list_parser = subparsers.add_parser('list', parents=[filters, shards], help='申請の一覧')
+    list_parser.add_argument('--format', choices=formats, default='tsv')
+    list_parser.add_argument('--full', action='store_true', help='全項目を出力')
+
+    export_parser = subparsers.add_parser('export', parents=[filters, shards], help='申請の全項目を出力')
+    export_parser.add_argument('--format', choices=formats, default='csv')
+    export_parser.add_argument('--output', help='出力ファイル（省略時は標準出力）')
+    export_parser.add_argument('--encoding', default='utf-8', help='Excel 用は utf-8-sig')
+
+    for name, help_text in (('approve', '条件に合う承認待ちの申請を承認'),
+                            ('reject', '条件に合う承認待ちの申請を却下')):
+        decide_parser = subparsers.add_parser(name, parents=[filters, shards], help=help_text)
+        decide_parser.add_argument('--user', required=True, help='管理者のユーザー名')
+        decide_parser.add_argument('--dry-run', action='store_true', help='対象の表示のみ')
+        decide_parser.add_argument('--yes', action='store_true', help='確認を省略')
+        if name == 'reject':
+            decide_parser.add_argument('--reason', required=True, help='却下理由')
+
+    import_parser = subparsers.add_parser('import', help='申請をJSON Lines から登録')
+    import_parser.add_argument('file', help='入力ファイル（- で標準入力）')
+    import_parser.add_argument('--encoding', default='utf-8')
+
+    maintenance_parser = subparsers.add_parser('maintenance', parents=[shards],
+                                               help='統計更新・増分VACUUM（--full で変換・整合性チェックも）')
+    maintenance_parser.add_argument('--full', action='store_true',
+                                    help='auto_vacuum の変換（初回は全体のVACUUMで他端末を待たせる）・'
+                                         'ANALYZE・整合性チェックも実行')
+
+    stats_parser = subparsers.add_parser('stats', help='月次統計（年月の省略時は年月の一覧）')
+    stats_parser.add_argument('--month', help='YYYY-MM')
+    stats_parser.add_argument('--format', choices=('tsv', 'jsonl'), default='tsv')
+
+    backup_parser = subparsers.add_parser('backup', parents=[shards], help='オンラインバックアップ')
+    backup_parser.add_argument('--directory', help='保存先（省略時は settings.json の設定）')
+
+    queue_parser = subparsers.add_parser('queue', help='承認待ちを期限の近い順に表示')
+    queue_parser.add_argument('--limit', type=int, default=50)
+    queue_parser.add_argument('--format', choices=formats, default='tsv')
+    queue_parser.add_argument('--recompute', action='store_true', help='期限を現在の設定で再計算')
+
+    grades_parser = subparsers.add_parser('grades', help='成績（評定・観点別評価）の読み込みと変更の確認')
+    grades_subparsers = grades_parser.add_subparsers(dest='grades_command', required=True)
+    grades_load_parser = grades_subparsers.add_parser('load', help='校務システムの成績CSVを読み込む')
+    grades_load_parser.add_argument('file', help='入力ファイル（- で標準入力）')
+    grades_load_parser.add_argument('--encoding', default='utf-8-sig')
+    grades_report_parser = grades_subparsers.add_parser('report', help='講座の分布と承認済み訂正による変更')
+    grades_report_parser.add_argument('--course', required=True, help='講座名')
+    grades_report_parser.add_argument('--since', help='承認日（開始, YYYY-MM-DD）')
+    grades_report_parser.add_argument('--format', choices=('tsv', 'jsonl'), default='tsv')
+
+    users_parser = subparsers.add_parser('users', help='アカウントの登録・パスワード変更・ロック解除')
+    users_subparsers = users_parser.add_subparsers(dest='users_command', required=True)
+    operator = argparse.ArgumentParser(add_help=False)
+    operator.add_argument('--user', help='操作する管理者のユーザー名（最初の管理者の登録時は不要）')
+    users_add_parser = users_subparsers.add_parser('add', parents=[operator], help='アカウントを登録')
+    users_add_parser.add_argument('username')
+    users_add_parser.add_argument('--name', required=True, help='表示名')
+    users_add_parser.add_argument('--staff-id', help='職員番号')
+    users_add_parser.add_argument('--admin', action='store_true', help='管理者として登録')
+    for name, help_text in (('password', 'パスワードを変更（ロックも解除）'),
+                            ('unlock', 'ログイン失敗によるロックを解除')):
+        users_subparsers.add_parser(name, parents=[operator], help=help_text).add_argument('username')
+    users_subparsers.add_parser('list', parents=[operator], help='アカウントの一覧')
+
+    return parser
+
+
+def main(argv=None):
+    settings = load_settings()
+    args = build_parser(settings).parse_args(argv)
+
+    db_manager = DatabaseManager(args.db, settings['shard_name'] or None)
+    work_queue = settings['work_queue']
+    db_manager.configure_work_queue(work_queue['sla_days'], work_queue['cutoff_dates'],
+                                    work_queue['lease_minutes'])
+    db_manager.initialize_database()
+    for shard in settings['shards']:
+        db_manager.register_shard(shard['name'], shard['path'])
+
+    # 一括承認・登録も起動中の端末の一覧に反映
+    notifications = settings['notifications']
+    if notifications['enabled']:
+        db_manager.notifier = ChangeNotifier(notifications['port'], notifications['channel'],
+                                             notifications['broadcast_address'])
+
+    output = sys.stdout
+    try:
+        if args.command in ('approve', 'reject'):
+            return command_decide(db_manager, args, output)
+        if args.command == 'backup':
+            return command_backup(db_manager, args, output, settings['backup'])
+        commands = {
+            'list': command_list,
+            'export': command_export,
+            'import': command_import,
+            'maintenance': command_maintenance,
+            'stats': command_stats,
+            'grades': command_grades,
+            'queue': command_queue,
+            'users': command_users,
+        }
+        return commands[args.command](db_manager, args, output)
+    except sqlite3.Error as e:
+        print(f"データベースエラー: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # head などで出力を途中で閉じられた場合（終了時の書き出しで再度失敗しないようにする）
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
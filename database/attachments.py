@@ -0,0 +1,118 @@
+# database/attachments.py
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from database.dates import NOW_EPOCH
+
+# 1ファイルあたりの上限（既定値、MB）
+DEFAULT_MAX_FILE_MB = 20
+
+# ハッシュ計算・コピーの読み込み単位
+CHUNK_SIZE = 1024 * 1024
+
+
+class AttachmentStore:
+    """申請の添付ファイル（出席簿の写真・答案のスキャンなど）
+
+    ファイル本体は内容の SHA-256 をファイル名にして保存先フォルダに置き（同じ内容は1つだけ）、
+    DBには申請ID・ハッシュ・元のファイル名などの参照だけを記録する。
+    保存先は共有DBと同じ場所に置き、先頭2文字のサブフォルダに分けて1フォルダのファイル数を抑える。
+    """
+
+    def __init__(self, directory, max_file_mb=DEFAULT_MAX_FILE_MB):
+        self.directory = directory
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+
+    def create_tables(self, cursor):
+        """添付ファイルの参照テーブル作成"""
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS request_attachments (
+                attachment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_id INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                mime_type TEXT,
+                created_epoch INTEGER DEFAULT ({NOW_EPOCH}),
+                UNIQUE (request_id, sha256),
+                FOREIGN KEY (request_id) REFERENCES correction_requests(request_id)
+            )
+        ''')
+
+    def path_for(self, sha256):
+        """ハッシュに対応する保存先のパス"""
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def store(self, source_path):
+        """ファイルを保存先にコピーし、申請に添付する参照（辞書）を返す
+
+        先にハッシュだけを計算し、同じ内容が保存済みならコピーしない。
+        コピーは一時ファイルに書いてから名前を変えるため、途中で失敗しても壊れたファイルは残らない。
+        上限を超えるファイルは ValueError、読み書きの失敗は OSError。
+        """
+        size = os.path.getsize(source_path)
+        if size > self.max_file_bytes:
+            raise ValueError(f"{os.path.basename(source_path)} は上限"
+                             f"（{self.max_file_bytes // (1024 * 1024)}MB）を超えています")
+
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        target_path = self.path_for(sha256)
+        if not os.path.exists(target_path):
+            self._copy_into_place(source_path, target_path)
+
+        file_name = os.path.basename(source_path)
+        return {
+            'sha256': sha256,
+            'file_name': file_name,
+            'size_bytes': size,
+            'mime_type': mimetypes.guess_type(file_name)[0],
+        }
+
+    def _copy_into_place(self, source_path, target_path):
+        target_dir = os.path.dirname(target_path)
+        os.makedirs(target_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(source_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    out.write(chunk)
+            # 他の端末が同じ内容を同時に保存した場合も中身は同じため上書きしてよい
+            os.replace(temp_path, target_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def record(self, cursor, request_id, attachments):
+        """保存済みのファイルを申請に関連付ける（申請の保存と同じトランザクション内で実行）"""
+        rows = []
+        for attachment in attachments:
+            if not os.path.exists(self.path_for(attachment['sha256'])):
+                raise ValueError(f"添付ファイル {attachment['file_name']} が保存先にありません")
+            rows.append((request_id, attachment['sha256'], attachment['file_name'],
+                         attachment['size_bytes'], attachment.get('mime_type')))
+
+        cursor.executemany('''
+            INSERT INTO request_attachments (request_id, sha256, file_name, size_bytes, mime_type)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(request_id, sha256) DO NOTHING
+        ''', rows)
+
+    def fetch(self, cursor, request_id):
+        """申請の添付ファイル（登録順、保存先のパス 'path' 付き）"""
+        cursor.execute('''
+            SELECT attachment_id, sha256, file_name, size_bytes, mime_type
+            FROM request_attachments
+            WHERE request_id = ?
+            ORDER BY attachment_id
+        ''', (request_id,))
+        return [dict(row, path=self.path_for(row['sha256'])) for row in cursor.fetchall()]
@@ -0,0 +1,140 @@
+# database/attendance.py
+from database.dates import date_to_epoch
+from database.enums import APPROVED
+
+# 集計列と、その列に数える出欠の状態（出席停止・忌引は欠席に含めない）
+TALLY_STATUSES = {
+    'absence_periods': ('欠席',),
+    'late_periods': ('遅刻',),
+    'early_leave_periods': ('早退',),
+    'excused_periods': ('出席停止', '忌引'),
+}
+
+
+class AttendanceTallies:
+    """承認済みの出欠訂正による、生徒・講座・学期ごとの時数の増減
+
+    「総合評価に反映」（link_to_total）が指定された訂正のみを集計する。
+    承認と同一トランザクション内でその申請分だけを差分更新し、
+    年度全体の再計算は1回の集約SQLで行う。
+    学期は4〜9月を前期、10〜3月を後期とし、1〜3月は前年度に含める。
+    """
+
+    def create_tables(self, cursor):
+        """集計テーブル作成"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attendance_tallies (
+                student_number VARCHAR(10) NOT NULL,
+                course_name VARCHAR(100) NOT NULL,
+                academic_year INTEGER NOT NULL,
+                term VARCHAR(4) NOT NULL,
+                absence_periods INTEGER NOT NULL DEFAULT 0,
+                late_periods INTEGER NOT NULL DEFAULT 0,
+                early_leave_periods INTEGER NOT NULL DEFAULT 0,
+                excused_periods INTEGER NOT NULL DEFAULT 0,
+                correction_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (student_number, course_name, academic_year, term)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_tallies_course
+            ON attendance_tallies(course_name, academic_year, term)
+        ''')
+
+    def is_empty(self, cursor):
+        cursor.execute('SELECT 1 FROM attendance_tallies LIMIT 1')
+        return cursor.fetchone() is None
+
+    def _tally_select(self, condition, sign=1):
+        """条件に合う出欠訂正を生徒・講座・年度・学期ごとに集約するSELECT
+
+        時限は「1,2,3」のようにカンマ区切りで保存されているため、その個数を時数とする。
+        """
+        deltas = []
+        for statuses in TALLY_STATUSES.values():
+            in_list = ', '.join(f"'{status}'" for status in statuses)
+            deltas.append(f'{sign} * SUM(periods * ((after_status IN ({in_list}))'
+                          f' - (before_status IN ({in_list}))))')
+        deltas = ',\n'.join(deltas)
+        return f'''
+            WITH corrections AS (
+                SELECT
+                    t.student_number,
+                    a.course_name,
+                    CAST(strftime('%Y', a.attendance_epoch, 'unixepoch') AS INTEGER) as year,
+                    CAST(strftime('%m', a.attendance_epoch, 'unixepoch') AS INTEGER) as month,
+                    a.before_status,
+                    a.after_status,
+                    CASE WHEN COALESCE(a.period_number, '') = '' THEN 1
+                         ELSE length(a.period_number) - length(replace(a.period_number, ',', '')) + 1
+                    END as periods
+                FROM correction_requests r
+                JOIN correction_targets t ON t.request_id = r.request_id
+                JOIN attendance_corrections a ON a.target_id = t.target_id
+                WHERE a.link_to_total AND {condition}
+            )
+            SELECT
+                student_number,
+                course_name,
+                year - (month < 4) as academic_year,
+                CASE WHEN month BETWEEN 4 AND 9 THEN '前期' ELSE '後期' END as term,
+                {deltas},
+                {sign} * COUNT(*)
+            FROM corrections
+            GROUP BY 1, 2, 3, 4
+        '''
+
+    def _insert(self, cursor, select_sql, params):
+        columns = ', '.join(TALLY_STATUSES)
+        updates = ',\n'.join(f'{column} = {column} + excluded.{column}'
+                             for column in tuple(TALLY_STATUSES) + ('correction_count',))
+        cursor.execute(f'''
+            INSERT INTO attendance_tallies (
+                student_number, course_name, academic_year, term, {columns}, correction_count
+            )
+            {select_sql}
+            ON CONFLICT(student_number, course_name, academic_year, term) DO UPDATE SET
+                {updates}
+        ''', params)
+
+    def record_status_change(self, cursor, request_id, old_status, new_status):
+        """承認された（承認が取り消された）申請分の時数を差分で反映"""
+        if (old_status == 'approved') == (new_status == 'approved'):
+            return
+        sign = 1 if new_status == 'approved' else -1
+        self._insert(cursor, self._tally_select('r.request_id = ?', sign), (request_id,))
+
+    def rebuild(self, cursor, academic_year=None):
+        """承認済みの全訂正から再計算（academic_year 指定時はその年度のみ）"""
+        if academic_year is None:
+            cursor.execute('DELETE FROM attendance_tallies')
+            self._insert(cursor, self._tally_select(f'r.status = {APPROVED}'), ())
+            return
+
+        # 年度は4月1日〜翌年3月31日（出欠日のインデックスの範囲検索）
+        cursor.execute('DELETE FROM attendance_tallies WHERE academic_year = ?', (academic_year,))
+        self._insert(
+            cursor,
+            self._tally_select(f'r.status = {APPROVED} AND a.attendance_epoch >= ? AND a.attendance_epoch < ?'),
+            (date_to_epoch(f'{academic_year}-04-01'), date_to_epoch(f'{academic_year + 1}-04-01'))
+        )
+
+    def totals(self, cursor, student_number=None, course_name=None, academic_year=None, term=None):
+        """条件に合う集計値（生徒・講座・年度・学期の順）"""
+        conditions = []
+        params = []
+        for column, value in (('student_number', student_number), ('course_name', course_name),
+                              ('academic_year', academic_year), ('term', term)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        cursor.execute(f'''
+            SELECT student_number, course_name, academic_year, term,
+                   {', '.join(TALLY_STATUSES)}, correction_count
+            FROM attendance_tallies
+            {where}
+            ORDER BY student_number, course_name, academic_year, term
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
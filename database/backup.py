@@ -0,0 +1,162 @@
+# database/backup.py
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class _SourceChanged(Exception):
+    """コピー中に他の接続が書き込み、バックアップが最初からやり直しになった"""
+
+
+def copy_database(source, target, pages_per_step, step_sleep, max_attempts=4, step_growth=8):
+    """ページ単位でコピー（各ステップの間は読み取りロックを解放）
+
+    コピー中の書き込みでやり直しが続く場合はステップを大きくして再試行し、
+    最後は一括でコピーする。
+    """
+    pages = pages_per_step
+
+    for attempt in range(max_attempts):
+        if attempt == max_attempts - 1:
+            pages = -1
+
+        previous_remaining = [None]
+
+        def progress(status, remaining, total):
+            # 残りページ数が増えたらコピーが最初からやり直されている
+            if previous_remaining[0] is not None and remaining > previous_remaining[0]:
+                raise _SourceChanged()
+            previous_remaining[0] = remaining
+
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=step_sleep)
+            return
+        except _SourceChanged:
+            pages *= step_growth
+
+
+class BackupManager:
+    """SQLiteバックアップAPIによるオンラインバックアップ
+
+    少数ページずつコピーし、間に待機を挟むことで
+    他端末の書き込みを長時間ブロックしない。
+    """
+
+    SNAPSHOT_PREFIX = 'grade_correction_'
+
+    # やり直しが続く場合はステップを大きくして再試行（最後は一括コピー）
+    MAX_ATTEMPTS = 4
+    STEP_GROWTH = 8
+
+    # 失敗時の再試行までの待機秒数
+    RETRY_SECONDS = 600
+
+    def __init__(self, db_path, backup_dir, keep=14, pages_per_step=64, step_sleep=0.02):
+        self.db_path = db_path
+        self.backup_dir = Path(backup_dir)
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.last_result = None
+
+    def backup_now(self):
+        """スナップショットを1つ作成し、整合性確認とローテーションを行う"""
+        with self._lock:
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            snapshot_path = self.backup_dir / f"{self.SNAPSHOT_PREFIX}{timestamp}.db"
+            temp_path = snapshot_path.with_suffix('.db.tmp')
+            started = time.perf_counter()
+
+            try:
+                source = sqlite3.connect(self.db_path, timeout=30)
+                target = sqlite3.connect(temp_path)
+                try:
+                    self._copy(source, target)
+                    integrity = target.execute('PRAGMA integrity_check').fetchone()[0]
+                finally:
+                    target.close()
+                    source.close()
+
+                if integrity != 'ok':
+                    os.remove(temp_path)
+                    result = {'success': False, 'error': f'整合性チェック失敗: {integrity}'}
+                else:
+                    os.replace(temp_path, snapshot_path)
+                    self._rotate()
+                    result = {
+                        'success': True,
+                        'path': str(snapshot_path),
+                        'size': snapshot_path.stat().st_size,
+                        'seconds': time.perf_counter() - started
+                    }
+
+            except Exception as e:
+                if temp_path.exists():
+                    os.remove(temp_path)
+                result = {'success': False, 'error': str(e)}
+
+            result['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            self.last_result = result
+            return result
+
+    def _copy(self, source, target):
+        copy_database(source, target, self.pages_per_step, self.step_sleep,
+                      self.MAX_ATTEMPTS, self.STEP_GROWTH)
+
+    def list_snapshots(self):
+        """スナップショット一覧（新しい順）"""
+        if not self.backup_dir.exists():
+            return []
+        return sorted(self.backup_dir.glob(f"{self.SNAPSHOT_PREFIX}*.db"), reverse=True)
+
+    def seconds_since_last_snapshot(self):
+        """最新スナップショットからの経過秒数（他端末が作成した分も含む）"""
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            return None
+        return time.time() - snapshots[0].stat().st_mtime
+
+    def start(self, interval_hours=24):
+        """定期バックアップをバックグラウンドスレッドで開始"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        interval = interval_hours * 3600
+        self._stop_event.clear()
+
+        def run():
+            while True:
+                elapsed = self.seconds_since_last_snapshot()
+                wait = 0 if elapsed is None else max(0, interval - elapsed)
+                if self._stop_event.wait(wait):
+                    return
+                # 待機中に他端末がバックアップした場合は作成しない
+                elapsed = self.seconds_since_last_snapshot()
+                if elapsed is None or elapsed >= interval:
+                    result = self.backup_now()
+                    if not result['success'] and self._stop_event.wait(self.RETRY_SECONDS):
+                        return
+
+        self._thread = threading.Thread(target=run, name='backup-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """定期バックアップを停止"""
+        self._stop_event.set()
+
+    def _rotate(self):
+        """保持数を超えた古いスナップショットを削除"""
+        for old_snapshot in self.list_snapshots()[self.keep:]:
+            try:
+                old_snapshot.unlink()
+            except OSError:
+                pass
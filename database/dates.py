@@ -0,0 +1,50 @@
+# database/dates.py
+"""日付・日時と、DBに保存する UNIX 時刻（秒、UTC）の整数との変換
+
+申請・作成・承認の日時は UNIX 時刻、出欠の日付はその日の0時（UTC）の UNIX 時刻で保存し、
+表示用の文字列（request_date など）は生成列として得る。
+期間の条件は整数の範囲になるため、インデックスの範囲検索で処理できる。
+"""
+import re
+from datetime import date, datetime, timezone
+
+# 現在の UNIX 時刻を求めるSQL式（unixepoch() は SQLite 3.38 以降のため使わない）
+NOW_EPOCH = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# 受け付ける日付の書式（2024-05-01、2024/5/1、2024.5.1、2024年5月1日）
+DATE_PATTERN = re.compile(r'\s*(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?\s*')
+
+
+def parse_date(value):
+    """日付の入力を date に変換（書式が違う・存在しない日付は ValueError）"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    match = DATE_PATTERN.fullmatch(str(value or ''))
+    if match:
+        try:
+            return date(*(int(part) for part in match.groups()))
+        except ValueError:
+            pass
+    raise ValueError(f'日付「{value}」を解釈できません（例: 2024-05-01）')
+
+
+def date_to_epoch(value):
+    """日付の0時（UTC）の UNIX 時刻"""
+    day = parse_date(value)
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def date_to_epoch_or_none(value):
+    """date_to_epoch の解釈できない場合に None を返す版（旧形式からの移行でSQL関数として使用）"""
+    try:
+        return date_to_epoch(value)
+    except ValueError:
+        return None
+
+
+def sql_epoch(column):
+    """'YYYY-MM-DD HH:MM:SS'（UTC）の文字列の列を UNIX 時刻に変換するSQL式（移行用）"""
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
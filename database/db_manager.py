@@ -1,111 +1,398 @@
 # database/db_manager.py
 import sqlite3
 from datetime import datetime
+import heapq
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
 
+from auth.passwords import hash_password, verify_password
+from database import dates, enums
+from database.attachments import DEFAULT_MAX_FILE_MB, AttachmentStore
+from database.attendance import AttendanceTallies
+from database.backup import BackupManager
+from database.grades import GradeSnapshots
+from database.maintenance import DatabaseMaintenance
+from database.replica import ReadReplica
+from database.rows import fetch_rows, namedtuple_factory
+from database.statistics import StatisticsCounters
+from database.dates import NOW_EPOCH
+from database.work_queue import WorkQueue
+
+# STRICT テーブル（列の型を強制）は SQLite 3.37 以降
+STRICT = ' STRICT' if sqlite3.sqlite_version_info >= (3, 37, 0) else ''
+
+# 一覧・検索の戻り値は状態・種別をこれまでどおり名前で返す
+STATUS_NAME = enums.sql_name('r.status', enums.STATUS_CODES)
+TYPE_NAME = enums.sql_name('r.correction_type', enums.CORRECTION_TYPE_CODES)
+
+# 履歴一覧に表示する状態・種別の名称
+STATUS_LABEL = enums.sql_label('r.status', enums.STATUS_CODES, enums.STATUS_LABELS)
+TYPE_LABEL = enums.sql_label('r.correction_type', enums.CORRECTION_TYPE_CODES,
+                             enums.CORRECTION_TYPE_LABELS)
+
+# 時間をおけば解消するエラー（ロック中・共有フォルダに接続できない・読み書きの一時的な失敗）
+RETRYABLE_ERROR_CODES = ('SQLITE_BUSY', 'SQLITE_LOCKED', 'SQLITE_CANTOPEN', 'SQLITE_IOERR')
+RETRYABLE_ERROR_MESSAGES = ('database is locked', 'database table is locked', 'busy',
+                            'unable to open database file', 'disk i/o error')
+
+
+def is_retryable_error(error):
+    """共有DBのエラーが再送で解消する可能性があるか
+
+    列・テーブルがない、読み取り専用、DBの破損などは再送しても成功しないため含めない。
+    """
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorname', None)
+    if code:
+        return code.startswith(RETRYABLE_ERROR_CODES)
+    message = str(error).lower()
+    return any(text in message for text in RETRYABLE_ERROR_MESSAGES)
+
 class DatabaseManager:
-    def __init__(self, db_path="grade_correction.db"):
+    # 重複チェック時に1回の照会で渡す生徒番号の最大数
+    CONFLICT_LOOKUP_CHUNK = 500
+    
+    # スキーマのバージョン（PRAGMA user_version）
+    # 1: 申請・対象者・詳細・対象期間を STRICT テーブルにし、状態・種別・訂正項目を整数コードで保存
+    # 2: 申請・作成・承認日時と出欠日を UNIX 時刻の整数で保存し、表示用の文字列は生成列にする
+    # 3: 処理期限と担当の確保期限も UNIX 時刻の整数で保存する
+    SCHEMA_VERSION = 3
+    
+    # 申請を保存するテーブル（バージョンが上がるたびに作り直す）
+    CORE_TABLES = ('correction_requests', 'correction_targets', 'attendance_corrections',
+                   'grade_corrections', 'correction_periods')
+    
+    # 旧バージョンの日時の文字列の列と、移行先の UNIX 時刻の列（移行先のバージョンごと）
+    # 解釈できない値がある場合は移行しない
+    LEGACY_DATETIME_COLUMNS = {
+        2: {'request_epoch': 'request_date', 'created_epoch': 'created_at',
+            'approved_epoch': 'approved_date'},
+        3: {'due_epoch': 'due_at', 'claimed_until_epoch': 'claimed_until'},
+    }
+    
+    # 旧バージョンのテーブルから移行する際の列の変換式（移行先のバージョンごと）
+    LEGACY_CONVERSIONS = {
+        1: {
+            'correction_requests': {
+                'status': enums.sql_code("COALESCE(status, 'pending')", enums.STATUS_CODES),
+                'correction_type': enums.sql_code('correction_type', enums.CORRECTION_TYPE_CODES),
+            },
+            'grade_corrections': {
+                'correction_item': enums.sql_item_mask('correction_item'),
+                'before_evaluation': "NULLIF(before_evaluation, '')",
+                'after_evaluation': "NULLIF(after_evaluation, '')",
+            },
+        },
+        2: {
+            'correction_requests': {
+                target: dates.sql_epoch(source)
+                for target, source in LEGACY_DATETIME_COLUMNS[2].items()
+            },
+            # 出欠日は入力された書式のまま保存されていたため Python 側で解釈する
+            'attendance_corrections': {
+                'attendance_epoch': 'date_to_epoch(attendance_date)',
+            },
+        },
+        3: {
+            'correction_requests': {
+                target: dates.sql_epoch(source)
+                for target, source in LEGACY_DATETIME_COLUMNS[3].items()
+            },
+        },
+    }
+    
+    # 接続時に指定できるジャーナルモード
+    # WAL は共有メモリを使うため、ファイルサーバー上のDBを複数の端末から開く構成では使えない
+    JOURNAL_MODES = ('delete', 'truncate', 'persist', 'wal')
+    
+    # ログイン失敗によるロック設定
+    MAX_FAILED_LOGINS = 5
+    LOCKOUT_MINUTES = 15
+    
+    def __init__(self, db_path="grade_correction.db", shard_name=None, timeout=5.0, journal_mode=None):
+        if journal_mode is not None and journal_mode not in self.JOURNAL_MODES:
+            raise ValueError(f"journal_mode は {', '.join(self.JOURNAL_MODES)} のいずれかを指定してください")
+        
         self.db_path = db_path
-        self.connection = None
+        self.shard_name = shard_name
+        
+        # 他の端末の書き込みを待つ上限（秒）と、接続ごとに設定するジャーナルモード（None なら変更しない）
+        self.timeout = timeout
+        self.journal_mode = journal_mode
+        
+        self._local = threading.local()
+        self.statistics = StatisticsCounters()
+        self.attendance = AttendanceTallies()
+        self.grades = GradeSnapshots()
+        self.work_queue = WorkQueue()
+        
+        # ユーザー名 → アカウント情報のキャッシュ
+        self._user_cache = {}
+        self._user_cache_lock = threading.Lock()
+        
+        self.backup_manager = None
+        self.maintenance = DatabaseMaintenance(db_path)
+        
+        # 添付ファイルの保存先（既定は共有DBと同じフォルダの attachments）
+        self.attachments = AttachmentStore(str(Path(db_path).resolve().parent / 'attachments'))
+        
+        # この端末で実行中の書き込み数（アイドル時メンテナンスの判定用）
+        self._writes_in_flight = 0
+        self._writes_lock = threading.Lock()
+        
+        # 他校舎のDB（シャード名 → DatabaseManager）
+        self.shards = {}
+        self._shard_executor = None
+        self.last_shard_errors = {}
+        
+        # 参照用のローカルコピー（configure_replica で有効化）
+        self.replica = None
+        
+        # 変更を他の起動中の端末へ通知（utils.notifier.ChangeNotifier）
+        self.notifier = None
+    
+    @property
+    def connection(self):
+        """現在のスレッドの接続（ワーカースレッドと接続を共有しない）"""
+        return getattr(self._local, 'connection', None)
+    
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
         
-    def connect(self):
-        """データベース接続"""
-        self.connection = sqlite3.connect(self.db_path)
+    @property
+    def write_in_progress(self):
+        """この端末で書き込みトランザクションが実行中かどうか"""
+        return self._writes_in_flight > 0
+    
+    def _begin_write(self):
+        with self._writes_lock:
+            self._writes_in_flight += 1
+    
+    def _end_write(self):
+        with self._writes_lock:
+            self._writes_in_flight -= 1
+        
+        # 自分の書き込みをローカルコピーに早めに反映
+        if self.replica:
+            self.replica.request_refresh()
+    
+    def register_shard(self, name, db_path):
+        """他校舎のDBをシャードとして登録（一覧・検索・統計を全校舎横断で取得）
+        
+        テーブルの作成は各校舎のアプリが行うため、ここでは接続しない。
+        """
+        self.shards[name] = DatabaseManager(db_path, shard_name=name, timeout=self.timeout,
+                                            journal_mode=self.journal_mode)
+        self.shards[name].work_queue = self.work_queue
+        
+        # ワーカー数をシャード数に合わせて作り直す
+        if self._shard_executor:
+            self._shard_executor.shutdown(wait=False)
+            self._shard_executor = None
+        return self.shards[name]
+    
+    def for_shard(self, shard):
+        """シャード名から書き込み先を取得（未指定・自校舎なら自身）"""
+        if not shard or shard == self.shard_name:
+            return self
+        return self.shards[shard]
+    
+    def _fan_out(self, method_name, *args):
+        """自校舎と全シャードで同じ問い合わせを並列実行し、結果をシャード順に返す
+        
+        接続できないシャードは結果から除き、last_shard_errors に記録する。
+        """
+        managers = [self, *self.shards.values()]
+        if len(managers) == 1:
+            return [getattr(self, method_name)(*args)]
+        
+        if self._shard_executor is None:
+            self._shard_executor = ThreadPoolExecutor(max_workers=len(managers),
+                                                      thread_name_prefix='shard-query')
+        futures = [(manager, self._shard_executor.submit(getattr(manager, method_name), *args))
+                   for manager in managers]
+        
+        results = []
+        errors = {}
+        for manager, future in futures:
+            try:
+                results.append(future.result())
+            except sqlite3.Error as e:
+                errors[manager.shard_name or ''] = str(e)
+        self.last_shard_errors = errors
+        return results
+    
+    def _publish(self, event, request_id, shard=None):
+        """コミット済みの変更を通知（通知の失敗は保存結果に影響させない）"""
+        if self.notifier:
+            self.notifier.publish(event, request_id, shard or self.shard_name)
+    
+    def connect(self, read_only=False):
+        """データベース接続
+        
+        read_only=True の参照は、ローカルコピーが鮮度の上限内ならそちらから読み取る。
+        """
+        if read_only and self.replica and self.replica.is_fresh():
+            self.connection = self.replica.connect()
+        else:
+            self.connection = self._open_connection()
         self.connection.row_factory = sqlite3.Row
         return self.connection.cursor()
     
+    def _open_connection(self):
+        """共有DBへの新しい接続（待ち時間・ジャーナルモードを適用）"""
+        connection = sqlite3.connect(self.db_path, timeout=self.timeout)
+        if self.journal_mode:
+            connection.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        return connection
+    
     def close(self):
         """データベース切断"""
         if self.connection:
             self.connection.close()
+            self.connection = None
     
     def initialize_database(self):
-        """データベース初期化"""
+        """データベース初期化
+        
+        作成・移行は1つの書き込みトランザクションで行う（同時に起動した端末は完了を待つ）。
+        途中で失敗した場合は取り消して接続を閉じ、共有DBをロックしたままにしない。
+        """
         cursor = self.connect()
         
+        try:
+            # 新規作成時は増分VACUUMを有効化（既存DBはメンテナンス時に切り替え）
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
+            self.connection.execute('BEGIN IMMEDIATE')
+            self._create_schema(cursor)
+            self.connection.commit()
+        
+        except BaseException:
+            try:
+                self.connection.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        
+        finally:
+            self.close()
+    
+    def _create_schema(self, cursor):
+        """テーブル・インデックスの作成と旧バージョンからの移行（initialize_database のトランザクション内）"""
+        cursor.execute('PRAGMA user_version')
+        schema_version = cursor.fetchone()[0]
+        
+        # 旧形式のテーブルは退避して作り直し、後でデータを移す
+        legacy_tables = []
+        if schema_version < self.SCHEMA_VERSION:
+            legacy_tables = self._rename_legacy_tables(cursor)
+        
         # 1. 訂正申請マスタテーブル
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS correction_requests (
                 request_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                applicant_name VARCHAR(100) NOT NULL,
-                applicant_id VARCHAR(50),
+                request_epoch INTEGER DEFAULT ({NOW_EPOCH}),
+                request_date TEXT GENERATED ALWAYS AS (datetime(request_epoch, 'unixepoch')) VIRTUAL,
+                applicant_name TEXT NOT NULL,
+                applicant_id TEXT,
                 reason TEXT NOT NULL,
-                correction_type VARCHAR(20) NOT NULL,
-                status VARCHAR(20) DEFAULT 'pending',
+                correction_type INTEGER NOT NULL
+                    CHECK (correction_type IN {enums.sql_in(enums.CORRECTION_TYPE_CODES)}),
+                status INTEGER NOT NULL DEFAULT {enums.PENDING}
+                    CHECK (status IN {enums.sql_in(enums.STATUS_CODES)}),
                 
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                created_by_ip VARCHAR(45),
-                created_by_hostname VARCHAR(255),
+                created_epoch INTEGER DEFAULT ({NOW_EPOCH}),
+                created_at TEXT GENERATED ALWAYS AS (datetime(created_epoch, 'unixepoch')) VIRTUAL,
+                created_by_ip TEXT,
+                created_by_hostname TEXT,
                 created_by_user_agent TEXT,
-                created_by_os VARCHAR(100),
+                created_by_os TEXT,
                 
-                approved_date DATETIME,
-                approver_name VARCHAR(100),
-                approver_id VARCHAR(50),
-                approved_by_ip VARCHAR(45),
-                approved_by_hostname VARCHAR(255),
+                approved_epoch INTEGER,
+                approved_date TEXT GENERATED ALWAYS AS (datetime(approved_epoch, 'unixepoch')) VIRTUAL,
+                approver_name TEXT,
+                approver_id TEXT,
+                approved_by_ip TEXT,
+                approved_by_hostname TEXT,
                 approved_by_user_agent TEXT,
-                approved_by_os VARCHAR(100),
+                approved_by_os TEXT,
                 
                 rejection_reason TEXT,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                
+                client_request_key TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                
+                due_epoch INTEGER,
+                due_at TEXT GENERATED ALWAYS AS (datetime(due_epoch, 'unixepoch')) VIRTUAL,
+                claimed_by TEXT,
+                claimed_by_name TEXT,
+                claimed_until_epoch INTEGER,
+                claimed_until TEXT GENERATED ALWAYS AS (datetime(claimed_until_epoch, 'unixepoch')) VIRTUAL
+            ){STRICT}
         ''')
         
         # 2. 訂正対象者テーブル
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS correction_targets (
                 target_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 request_id INTEGER NOT NULL,
-                student_number VARCHAR(4) NOT NULL,
-                student_name VARCHAR(100) NOT NULL,
+                student_number TEXT NOT NULL,
+                student_name TEXT NOT NULL,
                 FOREIGN KEY (request_id) REFERENCES correction_requests(request_id)
-            )
+            ){STRICT}
         ''')
         
-        # 3. 出欠訂正詳細テーブル
-        cursor.execute('''
+        # 3. 出欠訂正詳細テーブル（時限は「1,2」のようなカンマ区切り、出欠日はその日の0時のUNIX時刻）
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS attendance_corrections (
                 correction_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 target_id INTEGER NOT NULL,
-                attendance_date DATE NOT NULL,
-                period_number INTEGER NOT NULL,
-                subject VARCHAR(50) NOT NULL,
-                course_name VARCHAR(100) NOT NULL,
-                before_status VARCHAR(20) NOT NULL,
-                after_status VARCHAR(20) NOT NULL,
-                link_to_grade BOOLEAN DEFAULT 1,
-                link_to_observation BOOLEAN DEFAULT 1,
-                link_to_total BOOLEAN DEFAULT 1,
+                attendance_epoch INTEGER NOT NULL CHECK (attendance_epoch % 86400 = 0),
+                attendance_date TEXT GENERATED ALWAYS AS (date(attendance_epoch, 'unixepoch')) VIRTUAL,
+                period_number TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                course_name TEXT NOT NULL,
+                before_status TEXT NOT NULL,
+                after_status TEXT NOT NULL,
+                link_to_grade INTEGER DEFAULT 1 CHECK (link_to_grade IN (0, 1)),
+                link_to_observation INTEGER DEFAULT 1 CHECK (link_to_observation IN (0, 1)),
+                link_to_total INTEGER DEFAULT 1 CHECK (link_to_total IN (0, 1)),
                 FOREIGN KEY (target_id) REFERENCES correction_targets(target_id)
-            )
+            ){STRICT}
         ''')
         
-        # 4. 成績訂正詳細テーブル
-        cursor.execute('''
+        # 4. 成績訂正詳細テーブル（訂正項目は enums.CORRECTION_ITEM_BITS のビットの和）
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS grade_corrections (
                 correction_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 target_id INTEGER NOT NULL,
-                course_name VARCHAR(100) NOT NULL,
-                correction_item VARCHAR(20) NOT NULL,
+                course_name TEXT NOT NULL,
+                correction_item INTEGER NOT NULL
+                    CHECK (correction_item BETWEEN 0 AND {sum(enums.CORRECTION_ITEM_BITS.values())}),
                 before_evaluation INTEGER,
                 after_evaluation INTEGER,
-                before_observation VARCHAR(3),
-                after_observation VARCHAR(3),
+                before_observation TEXT,
+                after_observation TEXT,
                 FOREIGN KEY (target_id) REFERENCES correction_targets(target_id)
-            )
+            ){STRICT}
         ''')
         
         # 5. 対象期間テーブル
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS correction_periods (
                 period_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 target_id INTEGER NOT NULL,
-                period_name VARCHAR(30) NOT NULL,
+                period_name TEXT NOT NULL,
                 FOREIGN KEY (target_id) REFERENCES correction_targets(target_id)
-            )
+            ){STRICT}
         ''')
         
         # 6. 操作ログテーブル
@@ -126,39 +413,238 @@ class DatabaseManager:
             )
         ''')
         
+        # 7. 生徒別集計テーブル（申請・承認・却下のたびに差分更新）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_correction_summary (
+                student_number VARCHAR(4) PRIMARY KEY,
+                student_name VARCHAR(100),
+                total_count INTEGER NOT NULL DEFAULT 0,
+                attendance_count INTEGER NOT NULL DEFAULT 0,
+                grade_count INTEGER NOT NULL DEFAULT 0,
+                pending_count INTEGER NOT NULL DEFAULT 0,
+                approved_count INTEGER NOT NULL DEFAULT 0,
+                rejected_count INTEGER NOT NULL DEFAULT 0,
+                last_request_date DATETIME
+            )
+        ''')
+        
+        # 8. 統計カウンタテーブル
+        self.statistics.create_tables(cursor)
+        
+        # 8-2. 出欠時数の集計テーブル
+        self.attendance.create_tables(cursor)
+        
+        # 8-3. 成績（評定・観点別評価）と講座別分布のテーブル
+        self.grades.create_tables(cursor)
+        
+        # 9. ユーザーテーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(50) NOT NULL UNIQUE,
+                display_name VARCHAR(100) NOT NULL,
+                staff_id VARCHAR(50),
+                is_admin BOOLEAN NOT NULL DEFAULT 0,
+                password_hash TEXT NOT NULL,
+                failed_attempts INTEGER NOT NULL DEFAULT 0,
+                locked_until DATETIME,
+                last_login DATETIME,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 10. メンテナンス履歴テーブル
+        self.maintenance.create_tables(cursor)
+        
+        # 11. 添付ファイルの参照テーブル（ファイル本体は保存先フォルダ）
+        self.attachments.create_tables(cursor)
+        
+        # 既存DBへの列追加
+        self._add_column_if_missing(cursor, 'correction_requests', 'client_request_key', 'TEXT')
+        self._add_column_if_missing(cursor, 'correction_requests', 'version', 'INTEGER NOT NULL DEFAULT 0')
+        self._add_column_if_missing(cursor, 'correction_requests', 'due_epoch', 'INTEGER')
+        self._add_column_if_missing(cursor, 'correction_requests', 'claimed_by', 'TEXT')
+        self._add_column_if_missing(cursor, 'correction_requests', 'claimed_by_name', 'TEXT')
+        self._add_column_if_missing(cursor, 'correction_requests', 'claimed_until_epoch', 'INTEGER')
+        
+        if legacy_tables:
+            self._copy_legacy_tables(cursor, legacy_tables, schema_version)
+        
         # インデックス作成
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_request_client_key ON correction_requests(client_request_key)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_status ON correction_requests(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_date ON correction_requests(request_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_date ON correction_requests(request_epoch)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_approved ON correction_requests(status, approved_epoch)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_number ON correction_targets(student_number)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_target_request ON correction_targets(request_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_target ON attendance_corrections(target_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_grade_target ON grade_corrections(target_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_period_target ON correction_periods(target_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date_course ON attendance_corrections(attendance_epoch, course_name)')
+        self.work_queue.create_indexes(cursor)
+        
+        # 既存データがあり集計が空の場合は一度だけ再構築
+        cursor.execute('SELECT COUNT(*) FROM student_correction_summary')
+        if cursor.fetchone()[0] == 0:
+            self._rebuild_student_summary(cursor)
+        if self.statistics.is_empty(cursor):
+            self.statistics.rebuild(cursor)
+        if self.attendance.is_empty(cursor):
+            self.attendance.rebuild(cursor)
+        
+        # 期限の列を追加する前からの承認待ちに期限を設定
+        self.work_queue.update_due_dates(cursor, f"status = {enums.PENDING} AND due_epoch IS NULL")
+        
+        cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+    
+    def _rename_legacy_tables(self, cursor):
+        """バージョン1より前の申請テーブルを *_legacy に退避し、退避したテーブル名を返す
+        
+        他のテーブルの外部キーが退避先を指さないよう、旧来の名前変更の動作で行う。
+        """
+        cursor.execute(f'''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name IN ({','.join('?' * len(self.CORE_TABLES))})
+        ''', self.CORE_TABLES)
+        tables = [row[0] for row in cursor.fetchall()]
+        
+        cursor.execute('PRAGMA legacy_alter_table = ON')
+        for table in tables:
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+        cursor.execute('PRAGMA legacy_alter_table = OFF')
+        return tables
+    
+    def _copy_legacy_tables(self, cursor, tables, schema_version):
+        """退避したテーブルのデータを新しいテーブルに移し、退避先を削除
+        
+        schema_version より後のバージョンの LEGACY_CONVERSIONS で列を変換する。
+        未知の値は NOT NULL・CHECK 制約で失敗させ、移行全体を取り消す。
+        """
+        conversions_by_table = {}
+        for version, version_conversions in sorted(self.LEGACY_CONVERSIONS.items()):
+            if version > schema_version:
+                for table, conversions in version_conversions.items():
+                    conversions_by_table.setdefault(table, {}).update(conversions)
+        
+        if schema_version < 1 and 'correction_requests' in tables:
+            self._check_legacy_codes(cursor)
+        if 'correction_requests' in tables:
+            self._check_legacy_datetimes(cursor, schema_version)
+        
+        self.connection.create_function('date_to_epoch', 1, dates.date_to_epoch_or_none,
+                                        deterministic=True)
+        if schema_version < 2 and 'attendance_corrections' in tables:
+            cursor.execute('''
+                SELECT correction_id, attendance_date FROM attendance_corrections_legacy
+                WHERE date_to_epoch(attendance_date) IS NULL
+                ORDER BY correction_id
+                LIMIT 5
+            ''')
+            invalid = [f"明細ID {row[0]}（{row[1]!r}）" for row in cursor.fetchall()]
+            if invalid:
+                raise ValueError(f"出欠日を日付として解釈できないため移行できません: {', '.join(invalid)}")
         
-        self.connection.commit()
-        self.close()
+        for table in tables:
+            cursor.execute(f'PRAGMA table_info({table}_legacy)')
+            legacy_columns = {row[1] for row in cursor.fetchall()}
+            conversions = conversions_by_table.get(table, {})
+            cursor.execute(f'PRAGMA table_info({table})')
+            columns = [row[1] for row in cursor.fetchall()
+                       if row[1] in legacy_columns or row[1] in conversions]
+            
+            cursor.execute(f'''
+                INSERT INTO {table} ({', '.join(columns)})
+                SELECT {', '.join(conversions.get(column, column) for column in columns)}
+                FROM {table}_legacy
+            ''')
+            cursor.execute(f'DROP TABLE {table}_legacy')
+    
+    def _check_legacy_codes(self, cursor):
+        """状態・種別を整数コードに変換できない申請があれば、申請IDと値を示して ValueError"""
+        conversions = self.LEGACY_CONVERSIONS[1]['correction_requests']
+        cursor.execute(f'''
+            SELECT request_id, status, correction_type FROM correction_requests_legacy
+            WHERE ({conversions['status']}) IS NULL OR ({conversions['correction_type']}) IS NULL
+            ORDER BY request_id
+            LIMIT 5
+        ''')
+        invalid = [f"申請ID {row[0]}（状態 {row[1]!r}、種別 {row[2]!r}）" for row in cursor.fetchall()]
+        if invalid:
+            raise ValueError(f"状態・種別が不明な申請があるため移行できません: {', '.join(invalid)}")
+    
+    def _check_legacy_datetimes(self, cursor, schema_version):
+        """UNIX 時刻に変換できない日時の申請があれば、申請IDと値を示して ValueError
+        
+        期限・担当の列がない旧バージョンのテーブルには空の列を追加してから変換する。
+        """
+        self._add_column_if_missing(cursor, 'correction_requests_legacy', 'due_at', 'TEXT')
+        self._add_column_if_missing(cursor, 'correction_requests_legacy', 'claimed_until', 'TEXT')
+        
+        invalid = []
+        for version, columns in sorted(self.LEGACY_DATETIME_COLUMNS.items()):
+            if version <= schema_version:
+                continue
+            for source in columns.values():
+                cursor.execute(f'''
+                    SELECT request_id, {source} FROM correction_requests_legacy
+                    WHERE {source} IS NOT NULL AND {dates.sql_epoch(source)} IS NULL
+                    ORDER BY request_id
+                    LIMIT 5
+                ''')
+                invalid += [f"申請ID {row[0]}（{source} {row[1]!r}）" for row in cursor.fetchall()]
+        if invalid:
+            raise ValueError(f"日時を解釈できない申請があるため移行できません: {', '.join(invalid[:5])}")
     
     def save_correction_request(self, form_data, system_info):
-        """訂正申請を保存"""
-        cursor = self.connect()
+        """訂正申請を保存
+        
+        共有DBに接続できない・ロックされている場合は 'retryable': True を返す（is_retryable_error）。
+        form_data['client_request_key'] が既に登録済みの場合は何もせず、
+        元の申請IDを 'duplicate': True 付きで返す。
+        """
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.OperationalError as e:
+            self._end_write()
+            return {'success': False, 'error': str(e), 'retryable': is_retryable_error(e)}
         
         try:
             # トランザクション開始
             self.connection.execute('BEGIN')
             
-            # 1. 申請マスタ登録
+            # 1. 申請マスタ登録（同じ申請キーが登録済みなら挿入しない）
+            client_request_key = form_data.get('client_request_key')
             cursor.execute('''
                 INSERT INTO correction_requests (
                     applicant_name, applicant_id, reason, correction_type,
-                    created_by_ip, created_by_hostname, created_by_os
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    created_by_ip, created_by_hostname, created_by_os,
+                    client_request_key
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(client_request_key) DO NOTHING
             ''', (
                 form_data['applicant_name'],
                 form_data.get('applicant_id'),
                 form_data['reason'],
-                form_data['correction_type'],
+                enums.encode(enums.CORRECTION_TYPE_CODES, form_data['correction_type']),
                 system_info['ip_address'],
                 system_info['hostname'],
-                system_info['os_info']
+                system_info['os_info'],
+                client_request_key
             ))
             
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    'SELECT request_id FROM correction_requests WHERE client_request_key = ?',
+                    (client_request_key,)
+                )
+                request_id = cursor.fetchone()[0]
+                self.connection.rollback()
+                return {'success': True, 'request_id': request_id, 'duplicate': True}
+            
             request_id = cursor.lastrowid
+            self.work_queue.update_due_dates(cursor, 'request_id = ?', (request_id,))
             
             # 2. 操作ログ記録
             cursor.execute('''
@@ -192,13 +678,13 @@ class DatabaseManager:
                     attendance = form_data['attendance']
                     cursor.execute('''
                         INSERT INTO attendance_corrections (
-                            target_id, attendance_date, period_number,
+                            target_id, attendance_epoch, period_number,
                             subject, course_name, before_status, after_status,
                             link_to_grade, link_to_observation, link_to_total
                         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ''', (
                         target_id,
-                        attendance['date'],
+                        dates.date_to_epoch(attendance['date']),
                         attendance['period'],
                         attendance['subject'],
                         attendance['course_name'],
@@ -219,7 +705,7 @@ class DatabaseManager:
                     ''', (
                         target_id,
                         grade['course_name'],
-                        grade['correction_item'],
+                        enums.encode_items(grade['correction_item']),
                         grade.get('before_evaluation'),
                         grade.get('after_evaluation'),
                         grade.get('before_observation'),
@@ -233,15 +719,1226 @@ class DatabaseManager:
                             target_id, period_name
                         ) VALUES (?, ?)
                     ''', (target_id, period))
+                
+                # 6. 生徒別集計を更新
+                self._add_to_student_summary(
+                    cursor, student['number'], student['name'],
+                    form_data['correction_type']
+                )
+            
+            # 7. 添付ファイルの参照を登録（ファイルは添付時に保存済み）
+            self.attachments.record(cursor, request_id, form_data.get('attachments', ()))
+            
+            # 8. 統計カウンタを更新
+            detail = form_data.get('attendance') if form_data['correction_type'] == 'attendance' \
+                else form_data.get('grade')
+            self.statistics.record_submission(
+                cursor, form_data['correction_type'], (detail or {}).get('course_name')
+            )
             
             # コミット
             self.connection.commit()
+            self._publish('created', request_id)
             return {'success': True, 'request_id': request_id}
             
         except Exception as e:
             # ロールバック
+            try:
+                self.connection.rollback()
+            except sqlite3.Error:
+                pass
+            return {'success': False, 'error': str(e),
+                    'retryable': is_retryable_error(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def authenticate_user(self, username, password):
+        """ユーザー認証（ハッシュ照合は低速なためワーカースレッドから呼び出す）
+        
+        戻り値の reason: 'unknown_user' / 'locked' / 'bad_password'
+        """
+        user = self._lookup_user(username)
+        if user is None:
+            return {'success': False, 'reason': 'unknown_user'}
+        
+        cursor = self.connect()
+        
+        try:
+            # ロック状態とハッシュは他端末での変更に追従するため毎回読む
+            cursor.execute('''
+                SELECT password_hash, locked_until,
+                       COALESCE(locked_until > CURRENT_TIMESTAMP, 0) as is_locked
+                FROM users WHERE username = ?
+            ''', (username,))
+            state = cursor.fetchone()
+            if state is None:
+                self._forget_user(username)
+                return {'success': False, 'reason': 'unknown_user'}
+            if state['is_locked']:
+                return {'success': False, 'reason': 'locked',
+                        'locked_until': state['locked_until']}
+            
+            # 照合中は接続を保持しない
+            self.close()
+            password_ok = verify_password(password, state['password_hash'])
+            cursor = self.connect()
+            
+            if password_ok:
+                cursor.execute('''
+                    UPDATE users
+                    SET failed_attempts = 0, locked_until = NULL,
+                        last_login = CURRENT_TIMESTAMP
+                    WHERE username = ?
+                ''', (username,))
+                self.connection.commit()
+                return {'success': True, 'user': {
+                    'username': user['username'],
+                    'name': user['display_name'],
+                    'id': user['staff_id'],
+                    'is_admin': bool(user['is_admin'])
+                }}
+            
+            # ロック期間が終わっていれば失敗回数を0に戻してから今回の失敗を数える
+            # （右辺はすべて更新前の値で評価される）
+            attempts = '''CASE WHEN locked_until <= CURRENT_TIMESTAMP THEN 0
+                               ELSE failed_attempts END + 1'''
+            cursor.execute(f'''
+                UPDATE users
+                SET failed_attempts = {attempts},
+                    locked_until = CASE
+                        WHEN {attempts} >= ?
+                        THEN datetime('now', ?)
+                        ELSE NULL
+                    END
+                WHERE username = ?
+            ''', (self.MAX_FAILED_LOGINS, f'+{self.LOCKOUT_MINUTES} minutes', username))
+            self.connection.commit()
+            
+            cursor.execute('SELECT failed_attempts FROM users WHERE username = ?', (username,))
+            failed_attempts = cursor.fetchone()['failed_attempts']
+            if failed_attempts >= self.MAX_FAILED_LOGINS:
+                return {'success': False, 'reason': 'locked'}
+            return {'success': False, 'reason': 'bad_password',
+                    'remaining_attempts': self.MAX_FAILED_LOGINS - failed_attempts}
+        
+        finally:
+            self.close()
+    
+    def load_user_directory(self):
+        """アカウント一覧を読み込みキャッシュする"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                SELECT username, display_name, staff_id, is_admin
+                FROM users
+            ''')
+            directory = {row['username']: dict(row) for row in cursor.fetchall()}
+        
+        finally:
+            self.close()
+        
+        with self._user_cache_lock:
+            self._user_cache = directory
+        return len(directory)
+    
+    def create_user(self, username, password, display_name, staff_id=None, is_admin=False):
+        """アカウントを登録"""
+        password_hash = hash_password(password)
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                INSERT INTO users (username, display_name, staff_id, is_admin, password_hash)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (username, display_name, staff_id, is_admin, password_hash))
+            self.connection.commit()
+            return {'success': True, 'user_id': cursor.lastrowid}
+        
+        except sqlite3.IntegrityError:
+            self.connection.rollback()
+            return {'success': False, 'error': f'ユーザー名 {username} は既に登録されています'}
+        
+        finally:
+            self.close()
+            self._forget_user(username)
+    
+    def set_password(self, username, password):
+        """パスワードを変更し、ロックを解除"""
+        password_hash = hash_password(password)
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                UPDATE users
+                SET password_hash = ?, failed_attempts = 0, locked_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE username = ?
+            ''', (password_hash, username))
+            self.connection.commit()
+            return {'success': cursor.rowcount == 1}
+        
+        finally:
+            self.close()
+            self._forget_user(username)
+    
+    def unlock_user(self, username):
+        """ログイン失敗によるロックを解除"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                UPDATE users SET failed_attempts = 0, locked_until = NULL
+                WHERE username = ?
+            ''', (username,))
+            self.connection.commit()
+            return {'success': cursor.rowcount == 1}
+        
+        finally:
+            self.close()
+    
+    def list_users(self):
+        """アカウント一覧を取得（パスワードハッシュは含まない）"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                SELECT username, display_name, staff_id, is_admin,
+                       failed_attempts, locked_until, last_login
+                FROM users
+                ORDER BY username
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+        
+        finally:
+            self.close()
+    
+    def _lookup_user(self, username):
+        """キャッシュからアカウントを取得（未登録ならDBから1件読み込み）"""
+        with self._user_cache_lock:
+            user = self._user_cache.get(username)
+        if user is not None:
+            return user
+        
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                SELECT username, display_name, staff_id, is_admin
+                FROM users WHERE username = ?
+            ''', (username,))
+            row = cursor.fetchone()
+        
+        finally:
+            self.close()
+        
+        if row is None:
+            return None
+        
+        user = dict(row)
+        with self._user_cache_lock:
+            self._user_cache[username] = user
+        return user
+    
+    def _forget_user(self, username):
+        """キャッシュからアカウントを削除"""
+        with self._user_cache_lock:
+            self._user_cache.pop(username, None)
+    
+    def find_conflicting_requests(self, form_data):
+        """同一生徒・日付・時限・講座の処理中／承認済み出欠訂正を検索
+        
+        複数生徒の一括申請でも生徒番号をまとめて照会する。
+        """
+        if form_data.get('correction_type') != 'attendance':
+            return []
+        
+        attendance = form_data['attendance']
+        periods = {p.strip() for p in str(attendance['period']).split(',') if p.strip()}
+        numbers = list(dict.fromkeys(s['number'] for s in form_data['students'] if s.get('number')))
+        if not numbers:
+            return []
+        attendance_epoch = dates.date_to_epoch(attendance['date'])
+        
+        cursor = self.connect()
+        conflicts = []
+        
+        try:
+            # SQLiteのバインド変数上限を考慮して分割照会
+            for start in range(0, len(numbers), self.CONFLICT_LOOKUP_CHUNK):
+                chunk = numbers[start:start + self.CONFLICT_LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT 
+                        r.request_id,
+                        {STATUS_NAME} as status,
+                        r.applicant_name,
+                        t.student_number,
+                        t.student_name,
+                        a.attendance_date,
+                        a.period_number,
+                        a.course_name,
+                        a.before_status,
+                        a.after_status
+                    FROM attendance_corrections a
+                    JOIN correction_targets t ON t.target_id = a.target_id
+                    JOIN correction_requests r ON r.request_id = t.request_id
+                    WHERE a.attendance_epoch = ?
+                      AND a.course_name = ?
+                      AND t.student_number IN ({placeholders})
+                      AND r.status IN ({enums.PENDING}, {enums.APPROVED})
+                ''', [attendance_epoch, attendance['course_name'], *chunk])
+                
+                for row in cursor.fetchall():
+                    existing = {p.strip() for p in str(row['period_number']).split(',')}
+                    if not periods or periods & existing:
+                        conflicts.append(dict(row))
+            
+            return conflicts
+        
+        finally:
+            self.close()
+    
+    def approve_request(self, request_id, approver_name, approver_id=None, expected_version=None,
+                        shard=None):
+        """申請を承認
+        
+        expected_version を渡すと、一覧取得後に他の管理者が更新していた場合は
+        'conflict': True を返して更新しない。shard を渡すとその校舎のDBを更新する。
+        """
+        result = self.for_shard(shard)._change_request_status(
+            request_id, 'approved',
+            f'''
+                UPDATE correction_requests 
+                SET status = {enums.APPROVED},
+                    approved_epoch = {NOW_EPOCH},
+                    approver_name = ?,
+                    approver_id = ?,
+                    updated_at = CURRENT_TIMESTAMP,
+                    version = version + 1
+                WHERE request_id = ? AND status = {enums.PENDING}
+            ''',
+            (approver_name, approver_id, request_id),
+            expected_version
+        )
+        if result['success']:
+            self._publish('approved', request_id, shard)
+        return result
+    
+    def reject_request(self, request_id, reason, expected_version=None, shard=None):
+        """申請を却下（expected_version・shard の扱いは approve_request と同じ）"""
+        result = self.for_shard(shard)._change_request_status(
+            request_id, 'rejected',
+            f'''
+                UPDATE correction_requests 
+                SET status = {enums.REJECTED},
+                    rejection_reason = ?,
+                    updated_at = CURRENT_TIMESTAMP,
+                    version = version + 1
+                WHERE request_id = ? AND status = {enums.PENDING}
+            ''',
+            (reason, request_id),
+            expected_version
+        )
+        if result['success']:
+            self._publish('rejected', request_id, shard)
+        return result
+    
+    def _change_request_status(self, request_id, new_status, sql, params, expected_version=None):
+        """承認待ちの申請だけを条件付きで更新し、集計の差分も同一トランザクションで反映
+        
+        読み取り→確認→更新の間にロックは保持せず、UPDATE の条件で競合を検出する。
+        """
+        if expected_version is not None:
+            sql += ' AND version = ?'
+            params = params + (expected_version,)
+        
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            cursor.execute(sql, params)
+            
+            if cursor.rowcount == 0:
+                self.connection.rollback()
+                return self._status_conflict(cursor, request_id)
+            
+            self._move_student_summary_status(cursor, request_id, 'pending', new_status)
+            self.statistics.record_status_change(cursor, request_id, 'pending', new_status)
+            self.attendance.record_status_change(cursor, request_id, 'pending', new_status)
+            self.grades.record_status_change(cursor, request_id, 'pending', new_status)
+            
+            self.connection.commit()
+            return {'success': True, 'request_id': request_id}
+            
+        except Exception as e:
             self.connection.rollback()
             return {'success': False, 'error': str(e)}
         
         finally:
-            self.close()
\ No newline at end of file
+            self.close()
+            self._end_write()
+    
+    def _status_conflict(self, cursor, request_id):
+        """条件付き更新が0件だった理由を調べて返す"""
+        cursor.execute('''
+            SELECT status, version, approver_name FROM correction_requests WHERE request_id = ?
+        ''', (request_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return {'success': False, 'error': f'申請ID {request_id} が見つかりません'}
+        
+        status = enums.decode(enums.STATUS_CODES, row['status'])
+        if status == 'approved':
+            detail = f"既に承認されています（承認者: {row['approver_name'] or '不明'}）"
+        elif status == 'rejected':
+            detail = '既に却下されています'
+        else:
+            detail = '他の管理者が先に更新しました'
+        
+        return {
+            'success': False,
+            'conflict': True,
+            'status': status,
+            'version': row['version'],
+            'error': f'申請ID {request_id} は{detail}'
+        }
+    
+    def fetch_pending_rows(self, limit=None, offset=0, request_ids=None, shard=None):
+        """承認待ち一覧の表示用行を取得（シャード登録時は全校舎を期限の近い順に統合）
+        
+        limit を指定した場合は offset 件目から limit 件を返す（処理順のインデックスで先頭のみ読む）。
+        request_ids を指定した場合は shard のDBのその申請のみ（変更通知による差分更新用）。
+        """
+        if request_ids:
+            return self.for_shard(shard)._fetch_pending_rows(None, request_ids)
+        
+        end = None if limit is None else offset + limit
+        merged = heapq.merge(*self._fan_out('_fetch_pending_rows', end),
+                             key=attrgetter('due_at', 'request_id'))
+        return list(islice(merged, offset, end))
+    
+    def _fetch_pending_rows(self, limit=None, request_ids=None):
+        """このDBの承認待ち一覧（日付・理由の整形はSQL側で実施）
+        
+        担当者は確保時間内のもののみ返す。統計の未収集時も先頭だけを読むよう処理順のインデックスを指定する。
+        """
+        id_filter = f"AND r.request_id IN ({','.join('?' * len(request_ids))})" if request_ids else ''
+        index_hint = '' if request_ids else 'INDEXED BY idx_request_queue'
+        cursor = self.connect()
+        cursor.row_factory = None
+        
+        try:
+            cursor.execute(f'''
+                SELECT 
+                    ? as shard,
+                    r.request_id,
+                    r.version,
+                    COALESCE(r.request_date, '') as request_date,
+                    substr(r.request_date, 1, 10) as date_str,
+                    COALESCE(r.due_at, '') as due_at,
+                    COALESCE(strftime('%m/%d %H:%M', r.due_epoch, 'unixepoch', 'localtime'), '') as due_str,
+                    COALESCE(r.due_epoch < {NOW_EPOCH}, 0) as overdue,
+                    CASE WHEN r.claimed_until_epoch > {NOW_EPOCH} THEN r.claimed_by ELSE '' END as claimed_by,
+                    CASE WHEN r.claimed_until_epoch > {NOW_EPOCH}
+                         THEN COALESCE(r.claimed_by_name, r.claimed_by) ELSE '' END as claimed_name,
+                    COALESCE(r.applicant_name, '') as applicant_name,
+                    COALESCE(t.student_number, '') as student_number,
+                    COALESCE(t.student_name, '') as student_name,
+                    {TYPE_NAME} as correction_type,
+                    CASE 
+                        WHEN length(r.reason) > 30 THEN substr(r.reason, 1, 30) || '...'
+                        ELSE COALESCE(r.reason, '')
+                    END as reason_short,
+                    COALESCE(CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} THEN
+                            (SELECT a.before_status || '→' || a.after_status
+                             FROM attendance_corrections a
+                             WHERE a.target_id = t.target_id LIMIT 1)
+                        ELSE
+                            (SELECT 
+                                CASE 
+                                    WHEN g.before_evaluation IS NOT NULL THEN
+                                        '評価:' || g.before_evaluation || '→' || g.after_evaluation
+                                    ELSE
+                                        '観点:' || g.before_observation || '→' || g.after_observation
+                                END
+                             FROM grade_corrections g
+                             WHERE g.target_id = t.target_id LIMIT 1)
+                    END, '') as change_detail
+                FROM correction_requests r {index_hint}
+                LEFT JOIN correction_targets t ON r.request_id = t.request_id
+                WHERE r.status = {enums.PENDING} {id_filter}
+                ORDER BY r.due_epoch, r.request_id
+                LIMIT ?
+            ''', (self.shard_name or '', *(request_ids or ()), -1 if limit is None else limit))
+            return fetch_rows(cursor)
+        
+        finally:
+            self.close()
+    
+    def fetch_history_rows(self, limit=200, offset=0, request_ids=None, shard=None):
+        """履歴一覧の表示用行を取得（シャード登録時は全校舎の新しい順に offset 件目から limit 件）
+        
+        request_ids の扱いは fetch_pending_rows と同じ。
+        """
+        if request_ids:
+            return self.for_shard(shard)._fetch_history_rows(limit, request_ids)
+        
+        merged = heapq.merge(*self._fan_out('_fetch_history_rows', offset + limit),
+                             key=attrgetter('request_epoch'), reverse=True)
+        return list(islice(merged, offset, offset + limit))
+    
+    def _fetch_history_rows(self, limit, request_ids=None):
+        """このDBの履歴一覧（日付・時刻・理由・時限の整形と状態・種別の表示名はSQL側で実施）
+        
+        行の末尾は一覧にそのまま渡す表示用の列（rows.HISTORY_DISPLAY_FIELDS と同じ順）。
+        request_ids 指定時は直前の変更を読むためローカルコピーを使わない。
+        """
+        id_filter = f"WHERE r.request_id IN ({','.join('?' * len(request_ids))})" if request_ids else ''
+        cursor = self.connect(read_only=not request_ids)
+        cursor.row_factory = None
+        
+        try:
+            cursor.execute(f'''
+                SELECT 
+                    ? as shard,
+                    r.request_id,
+                    r.request_epoch,
+                    COALESCE(date(r.request_epoch, 'unixepoch'), '') as date_str,
+                    COALESCE(strftime('%H:%M', r.request_epoch, 'unixepoch'), '') as time_str,
+                    COALESCE(r.applicant_name, '') as applicant_name,
+                    COALESCE(t.student_number, '') as student_number,
+                    COALESCE(t.student_name, '') as student_name,
+                    {TYPE_LABEL} as type_label,
+                    CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} THEN COALESCE(a.subject, '')
+                        ELSE ''
+                    END as subject,
+                    COALESCE(CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} THEN a.course_name
+                        ELSE g.course_name
+                    END, '') as course_name,
+                    CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} AND a.period_number != '' THEN
+                            a.period_number || '限'
+                        ELSE ''
+                    END as period,
+                    COALESCE(CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} THEN
+                            a.before_status || '→' || a.after_status
+                        ELSE
+                            CASE 
+                                WHEN g.before_evaluation IS NOT NULL THEN
+                                    '評価:' || g.before_evaluation || '→' || g.after_evaluation
+                                ELSE
+                                    '観点:' || g.before_observation || '→' || g.after_observation
+                            END
+                    END, '') as change_detail,
+                    CASE 
+                        WHEN length(r.reason) > 30 THEN substr(r.reason, 1, 30) || '...'
+                        ELSE COALESCE(r.reason, '')
+                    END as reason_short,
+                    {STATUS_LABEL} as status_label,
+                    COALESCE(r.approver_name, '') as approver_name
+                FROM correction_requests r
+                LEFT JOIN correction_targets t ON r.request_id = t.request_id
+                LEFT JOIN attendance_corrections a ON t.target_id = a.target_id
+                LEFT JOIN grade_corrections g ON t.target_id = g.target_id
+                {id_filter}
+                ORDER BY r.request_epoch DESC
+                LIMIT ?
+            ''', (self.shard_name or '', *(request_ids or ()), limit))
+            return fetch_rows(cursor)
+        
+        finally:
+            self.close()
+    
+    def get_request_detail(self, request_id, shard=None):
+        """申請マスタの1件を取得（見つからなければ None）"""
+        db_manager = self.for_shard(shard)
+        cursor = db_manager.connect()
+        
+        try:
+            cursor.execute('SELECT * FROM correction_requests WHERE request_id = ?', (request_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            
+            request = dict(row)
+            request['status'] = enums.decode(enums.STATUS_CODES, request['status'])
+            request['correction_type'] = enums.decode(enums.CORRECTION_TYPE_CODES,
+                                                      request['correction_type'])
+            return request
+        
+        finally:
+            db_manager.close()
+
+    def get_attachments(self, request_id, shard=None):
+        """申請の添付ファイルの一覧（各要素の 'path' はその校舎の保存先のパス）"""
+        db_manager = self.for_shard(shard)
+        cursor = db_manager.connect()
+        
+        try:
+            return db_manager.attachments.fetch(cursor, request_id)
+        finally:
+            db_manager.close()
+    
+    def iter_requests(self, status=None, correction_type=None, student_number=None,
+                      course_name=None, date_from=None, date_to=None, applicant_name=None,
+                      request_ids=None, attendance_from=None, attendance_to=None, batch_size=500):
+        """条件に合う申請を対象者単位で申請日の古い順に返す（コマンドラインの一覧・出力用）
+
+        結果は batch_size 件ずつ読み込み、全件をメモリに保持しない。
+        専用の接続で読み取るため、取得の途中で承認などを呼び出してもよい。
+        date_from / date_to は申請日、attendance_from / attendance_to は出欠訂正の出欠日
+        （YYYY-MM-DD、両端を含む）で、いずれもインデックスの範囲検索になる。
+        """
+        conditions = []
+        params = []
+        if status:
+            status = enums.encode(enums.STATUS_CODES, status)
+        if correction_type:
+            correction_type = enums.encode(enums.CORRECTION_TYPE_CODES, correction_type)
+        for column, value in (('r.status', status), ('r.correction_type', correction_type),
+                              ('t.student_number', student_number),
+                              ('COALESCE(a.course_name, g.course_name)', course_name),
+                              ('r.applicant_name', applicant_name)):
+            if value is not None and value != '':
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        for column, date_from_value, date_to_value in (
+                ('r.request_epoch', date_from, date_to),
+                ('a.attendance_epoch', attendance_from, attendance_to)):
+            if date_from_value:
+                conditions.append(f'{column} >= ?')
+                params.append(dates.date_to_epoch(date_from_value))
+            if date_to_value:
+                conditions.append(f'{column} < ?')
+                params.append(dates.date_to_epoch(date_to_value) + 86400)
+        if request_ids:
+            conditions.append(f"r.request_id IN ({','.join('?' * len(request_ids))})")
+            params.extend(request_ids)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        # 出欠日で絞り込む場合は出欠訂正から読み始める（内部結合にしないと申請を全件走査する）
+        attendance_join = 'JOIN' if attendance_from or attendance_to else 'LEFT JOIN'
+
+        connection = self._open_connection()
+        connection.row_factory = namedtuple_factory
+
+        try:
+            cursor = connection.execute(f'''
+                SELECT
+                    ? as shard,
+                    r.request_id,
+                    r.version,
+                    r.request_date,
+                    {STATUS_NAME} as status,
+                    {TYPE_NAME} as correction_type,
+                    r.applicant_name,
+                    r.reason,
+                    r.approved_date,
+                    r.approver_name,
+                    r.rejection_reason,
+                    t.student_number,
+                    t.student_name,
+                    a.subject,
+                    COALESCE(a.course_name, g.course_name) as course_name,
+                    a.attendance_date,
+                    a.period_number,
+                    a.before_status,
+                    a.after_status,
+                    {enums.sql_item_names('g.correction_item')} as correction_item,
+                    g.before_evaluation,
+                    g.after_evaluation,
+                    g.before_observation,
+                    g.after_observation,
+                    (SELECT group_concat(p.period_name, '・')
+                     FROM correction_periods p
+                     WHERE p.target_id = t.target_id) as periods
+                FROM correction_requests r
+                LEFT JOIN correction_targets t ON t.request_id = r.request_id
+                {attendance_join} attendance_corrections a ON a.target_id = t.target_id
+                LEFT JOIN grade_corrections g ON g.target_id = t.target_id
+                {where}
+                ORDER BY r.request_epoch, r.request_id, t.target_id
+            ''', [self.shard_name or ''] + params)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+        finally:
+            connection.close()
+
+    def get_student_summary(self, student_number):
+        """生徒別の訂正件数集計を取得（シャード登録時は全校舎の合計）"""
+        summaries = [summary for summary in self._fan_out('_get_student_summary', student_number)
+                     if summary]
+        if len(summaries) <= 1:
+            return summaries[0] if summaries else None
+        
+        combined = dict(summaries[0])
+        for summary in summaries[1:]:
+            for key in ('total_count', 'attendance_count', 'grade_count',
+                        'pending_count', 'approved_count', 'rejected_count'):
+                combined[key] += summary[key]
+            combined['last_request_date'] = max(combined['last_request_date'] or '',
+                                                summary['last_request_date'] or '')
+        return combined
+    
+    def _get_student_summary(self, student_number):
+        cursor = self.connect(read_only=True)
+        
+        try:
+            cursor.execute('''
+                SELECT * FROM student_correction_summary WHERE student_number = ?
+            ''', (student_number,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        
+        finally:
+            self.close()
+    
+    def get_student_corrections(self, student_number):
+        """生徒の全訂正内容を申請横断で取得（新しい順、シャード登録時は全校舎）"""
+        return list(heapq.merge(*self._fan_out('_get_student_corrections', student_number),
+                                key=lambda row: row['request_date'] or '', reverse=True))
+    
+    def _get_student_corrections(self, student_number):
+        cursor = self.connect(read_only=True)
+        
+        try:
+            cursor.execute(f'''
+                SELECT 
+                    ? as shard,
+                    r.request_id,
+                    r.request_date,
+                    r.applicant_name,
+                    {TYPE_NAME} as correction_type,
+                    {STATUS_NAME} as status,
+                    r.approver_name,
+                    r.reason,
+                    t.student_name,
+                    COALESCE(a.course_name, g.course_name) as course_name,
+                    a.attendance_date,
+                    a.period_number,
+                    CASE 
+                        WHEN r.correction_type = {enums.ATTENDANCE} THEN
+                            a.before_status || '→' || a.after_status
+                        WHEN g.before_evaluation IS NOT NULL THEN
+                            '評価:' || g.before_evaluation || '→' || g.after_evaluation
+                        ELSE
+                            '観点:' || g.before_observation || '→' || g.after_observation
+                    END as change_detail
+                FROM correction_targets t
+                JOIN correction_requests r ON r.request_id = t.request_id
+                LEFT JOIN attendance_corrections a ON a.target_id = t.target_id
+                LEFT JOIN grade_corrections g ON g.target_id = t.target_id
+                WHERE t.student_number = ?
+                ORDER BY r.request_epoch DESC, r.request_id DESC
+            ''', (self.shard_name or '', student_number))
+            return [dict(row) for row in cursor.fetchall()]
+        
+        finally:
+            self.close()
+    
+    def configure_replica(self, replica_path, max_staleness_seconds=300, refresh_seconds=60):
+        """参照用のローカルコピーを設定し、バックグラウンド更新を開始"""
+        self.replica = ReadReplica(self.db_path, replica_path,
+                                   max_staleness_seconds=max_staleness_seconds,
+                                   refresh_seconds=refresh_seconds)
+        self.replica.start()
+    
+    def stop_replica(self):
+        """ローカルコピーの更新を停止"""
+        if self.replica:
+            self.replica.stop()
+    
+    def data_age_seconds(self):
+        """参照データの古さ（ローカルコピーを使っていない場合は None）"""
+        if self.replica and self.replica.is_fresh():
+            return self.replica.age_seconds()
+        return None
+    
+    def configure_work_queue(self, sla_days=None, cutoff_dates=(), lease_minutes=30):
+        """承認待ちの処理期限（種別ごとの日数・締切日 YYYY-MM-DD）と担当の確保時間（分）"""
+        self.work_queue = WorkQueue(sla_days, cutoff_dates, lease_minutes)
+        for shard in self.shards.values():
+            shard.work_queue = self.work_queue
+        return self.work_queue
+    
+    def configure_attachments(self, directory=None, max_file_mb=DEFAULT_MAX_FILE_MB):
+        """添付ファイルの保存先（未指定なら共有DBと同じフォルダの attachments）と1ファイルの上限（MB）"""
+        self.attachments = AttachmentStore(directory or self.attachments.directory, max_file_mb)
+        return self.attachments
+    
+    def recompute_due_dates(self):
+        """承認待ち申請の期限を現在の設定で計算し直す（締切日を変更した場合など）"""
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            count = self.work_queue.update_due_dates(cursor, f'status = {enums.PENDING}')
+            self.connection.commit()
+            return {'success': True, 'count': count}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def claim_next_requests(self, claimant, count, claimant_name=None):
+        """担当者のいない承認待ちを期限の近い順に count 件担当する
+        
+        担当者は一意なユーザー名 claimant で記録・照合し、表示名 claimant_name は一覧の表示にのみ使う。
+        自分が担当中の申請は件数に含めず、確保時間を延長する。
+        シャード登録時は全校舎の処理順で先頭 count 件に入る件数を校舎ごとに割り当て、
+        各校舎のDBで確保する。新たに確保した (校舎名, 申請ID) を 'claimed' で返す。
+        """
+        if self.shards:
+            candidates = heapq.merge(*self._fan_out('_fetch_claimable_keys', count))
+            counts = {}
+            for due, request_id, shard in islice(candidates, count):
+                counts[shard] = counts.get(shard, 0) + 1
+        else:
+            counts = {self.shard_name or '': count}
+        
+        claimed = []
+        errors = []
+        for shard, shard_count in counts.items():
+            result = self.for_shard(shard)._claim_requests(claimant, shard_count, claimant_name)
+            if not result['success']:
+                errors.append(result['error'])
+                continue
+            for request_id in result['request_ids']:
+                claimed.append((shard, request_id))
+                self._publish('claimed', request_id, shard)
+        
+        if errors and not claimed:
+            return {'success': False, 'error': '\n'.join(errors)}
+        return {'success': True, 'claimed': claimed}
+    
+    def _fetch_claimable_keys(self, limit):
+        """このDBで担当者のいない承認待ちの (期限, 申請ID, 校舎名) を処理順に limit 件"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute(f'''
+                SELECT COALESCE(due_epoch, 0), request_id, ?
+                FROM correction_requests INDEXED BY idx_request_queue
+                WHERE status = {enums.PENDING}
+                  AND (claimed_until_epoch IS NULL OR claimed_until_epoch <= {NOW_EPOCH})
+                ORDER BY due_epoch, request_id
+                LIMIT ?
+            ''', (self.shard_name or '', limit))
+            return [tuple(row) for row in cursor.fetchall()]
+        
+        finally:
+            self.close()
+    
+    def _claim_requests(self, claimant, count, claimant_name):
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            request_ids = self.work_queue.claim(cursor, claimant, count, claimant_name)
+            self.connection.commit()
+            return {'success': True, 'request_ids': request_ids}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def release_claims(self, claimant, request_ids=None, shard=None):
+        """自分（ユーザー名 claimant）の担当を解除（request_ids 省略時はその校舎の全件）"""
+        result = self.for_shard(shard)._release_claims(claimant, request_ids)
+        if result['success']:
+            for request_id in result['released']:
+                self._publish('claimed', request_id, shard)
+        return result
+    
+    def _release_claims(self, claimant, request_ids):
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            released = self.work_queue.release(cursor, claimant, request_ids)
+            self.connection.commit()
+            return {'success': True, 'released': released}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def configure_backup(self, backup_dir, keep=14, pages_per_step=64, step_sleep=0.02):
+        """バックアップ設定（保存先・保持数・1ステップのページ数・待機秒）"""
+        self.backup_manager = BackupManager(
+            self.db_path, backup_dir, keep=keep,
+            pages_per_step=pages_per_step, step_sleep=step_sleep
+        )
+        return self.backup_manager
+    
+    def backup_now(self):
+        """オンラインバックアップを今すぐ実行"""
+        if self.backup_manager is None:
+            self.configure_backup(Path(self.db_path).resolve().parent / 'backups')
+        return self.backup_manager.backup_now()
+    
+    def start_backup_scheduler(self, interval_hours=24):
+        """定期バックアップを開始"""
+        if self.backup_manager is None:
+            self.configure_backup(Path(self.db_path).resolve().parent / 'backups')
+        self.backup_manager.start(interval_hours)
+    
+    def stop_backup_scheduler(self):
+        """定期バックアップを停止"""
+        if self.backup_manager:
+            self.backup_manager.stop()
+    
+    def run_maintenance(self, full=False):
+        """統計更新・増分VACUUMを実行（full=True なら auto_vacuum の変換・ANALYZE・整合性チェックも）"""
+        self._begin_write()
+        try:
+            return self.maintenance.run(full)
+        finally:
+            self._end_write()
+    
+    def seconds_since_last_maintenance(self):
+        """前回メンテナンスからの経過秒数（未実行なら None）"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                SELECT CAST(strftime('%s', 'now') AS INTEGER)
+                       - CAST(strftime('%s', MAX(started_at)) AS INTEGER)
+                FROM maintenance_log
+            ''')
+            return cursor.fetchone()[0]
+        
+        finally:
+            self.close()
+    
+    def get_maintenance_history(self, limit=20):
+        """メンテナンス実行履歴（新しい順）"""
+        cursor = self.connect()
+        
+        try:
+            cursor.execute('''
+                SELECT task, started_at, duration_ms, result
+                FROM maintenance_log
+                ORDER BY log_id DESC
+                LIMIT ?
+            ''', (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+        
+        finally:
+            self.close()
+    
+    def get_approved_slips(self, date_from=None, date_to=None, request_ids=None, shard=None):
+        """訂正票出力用に承認済み訂正を対象者単位で取得
+        
+        date_from / date_to は承認日（YYYY-MM-DD、両端を含む）で絞り込む。
+        request_ids は shard のDBの申請ID。日付範囲のみの場合は全校舎を承認日順に統合する。
+        """
+        if request_ids:
+            return self.for_shard(shard)._get_approved_slips(date_from, date_to, request_ids)
+        return list(heapq.merge(*self._fan_out('_get_approved_slips', date_from, date_to, None),
+                                key=lambda row: row['approved_date'] or ''))
+    
+    def _get_approved_slips(self, date_from, date_to, request_ids):
+        conditions = [f'r.status = {enums.APPROVED}']
+        params = []
+        
+        if date_from:
+            conditions.append('r.approved_epoch >= ?')
+            params.append(dates.date_to_epoch(date_from))
+        if date_to:
+            conditions.append('r.approved_epoch < ?')
+            params.append(dates.date_to_epoch(date_to) + 86400)
+        if request_ids:
+            conditions.append(f"r.request_id IN ({','.join('?' * len(request_ids))})")
+            params.extend(request_ids)
+        
+        cursor = self.connect(read_only=True)
+        
+        try:
+            cursor.execute(f'''
+                SELECT 
+                    ? as shard,
+                    r.request_id,
+                    r.request_date,
+                    r.approved_date,
+                    r.applicant_name,
+                    r.approver_name,
+                    r.reason,
+                    {TYPE_NAME} as correction_type,
+                    t.student_number,
+                    t.student_name,
+                    a.subject,
+                    COALESCE(a.course_name, g.course_name) as course_name,
+                    a.attendance_date,
+                    a.period_number,
+                    a.before_status,
+                    a.after_status,
+                    g.before_evaluation,
+                    g.after_evaluation,
+                    g.before_observation,
+                    g.after_observation,
+                    (SELECT group_concat(p.period_name, '・')
+                     FROM correction_periods p
+                     WHERE p.target_id = t.target_id) as periods
+                FROM correction_requests r
+                JOIN correction_targets t ON t.request_id = r.request_id
+                LEFT JOIN attendance_corrections a ON a.target_id = t.target_id
+                LEFT JOIN grade_corrections g ON g.target_id = t.target_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY r.approved_epoch, r.request_id, t.target_id
+            ''', [self.shard_name or ''] + params)
+            return [dict(row) for row in cursor.fetchall()]
+        
+        finally:
+            self.close()
+    
+    def get_statistics_months(self):
+        """統計が存在する年月の一覧を取得（シャード登録時は全校舎分）"""
+        return sorted(set().union(*self._fan_out('_get_statistics_months')), reverse=True)
+    
+    def _get_statistics_months(self):
+        cursor = self.connect(read_only=True)
+        
+        try:
+            return self.statistics.list_months(cursor)
+        
+        finally:
+            self.close()
+    
+    def get_monthly_statistics(self, month):
+        """月次統計を取得（集計カウンタのみ参照、シャード登録時は全校舎の合算）"""
+        if not self.shards:
+            return self._get_monthly_statistics(month)
+        return self.statistics.combine(
+            self._fan_out('_get_monthly_statistics', month, None), month)
+    
+    def _get_monthly_statistics(self, month, top_courses=10):
+        cursor = self.connect(read_only=True)
+        
+        try:
+            return self.statistics.monthly_summary(cursor, month, top_courses)
+        
+        finally:
+            self.close()
+    
+    def get_attendance_tallies(self, student_number=None, course_name=None, academic_year=None,
+                               term=None):
+        """承認済みの出欠訂正による時数の増減（生徒・講座・年度・学期ごと、シャード登録時は全校舎）"""
+        return [row for rows in self._fan_out('_get_attendance_tallies', student_number, course_name,
+                                              academic_year, term)
+                for row in rows]
+    
+    def _get_attendance_tallies(self, student_number, course_name, academic_year, term):
+        cursor = self.connect(read_only=True)
+        
+        try:
+            return [dict(row, shard=self.shard_name or '')
+                    for row in self.attendance.totals(cursor, student_number, course_name,
+                                                      academic_year, term)]
+        
+        finally:
+            self.close()
+    
+    def rebuild_attendance_tallies(self, academic_year=None):
+        """出欠時数の集計を承認済みの訂正から再計算（年度指定時はその年度のみ）"""
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            self.attendance.rebuild(cursor, academic_year)
+            self.connection.commit()
+            return {'success': True}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def load_grade_snapshots(self, rows):
+        """校務システムの成績を読み込み、読み込んだ講座の分布を集計し直す
+
+        rows は (組番号, 講座名, 氏名, 評定, 観点別評価) の並び。
+        """
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            courses = self.grades.load(cursor, rows)
+            self.connection.commit()
+            return {'success': True, 'courses': sorted(courses)}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def refresh_grade_distribution(self, courses=None):
+        """講座別の分布を成績から集計し直す（courses 省略時は全講座）"""
+        self._begin_write()
+        try:
+            cursor = self.connect()
+        except sqlite3.Error as e:
+            self._end_write()
+            return {'success': False, 'error': str(e)}
+        
+        try:
+            self.connection.execute('BEGIN')
+            self.grades.refresh_distribution(cursor, courses)
+            self.connection.commit()
+            return {'success': True}
+        
+        except Exception as e:
+            self.connection.rollback()
+            return {'success': False, 'error': str(e)}
+        
+        finally:
+            self.close()
+            self._end_write()
+    
+    def get_course_grade_summary(self, course_name):
+        """講座の人数・評定平均と評定・観点ごとの分布"""
+        cursor = self.connect(read_only=True)
+        
+        try:
+            return self.grades.course_summary(cursor, course_name)
+        
+        finally:
+            self.close()
+    
+    def get_grade_change_report(self, course_name, since=None):
+        """講座で承認された成績訂正による変更（生徒ごとの訂正前・現在の値と分布の増減）"""
+        cursor = self.connect(read_only=True)
+        
+        try:
+            return self.grades.change_report(cursor, course_name, since)
+        
+        finally:
+            self.close()
+    
+    def _add_column_if_missing(self, cursor, table, column, definition):
+        """既存テーブルに列がなければ追加"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
+    def _add_to_student_summary(self, cursor, student_number, student_name, correction_type):
+        """新規申請分を生徒別集計に加算"""
+        is_attendance = 1 if correction_type == 'attendance' else 0
+        cursor.execute('''
+            INSERT INTO student_correction_summary (
+                student_number, student_name, total_count,
+                attendance_count, grade_count, pending_count, last_request_date
+            ) VALUES (?, ?, 1, ?, ?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(student_number) DO UPDATE SET
+                student_name = excluded.student_name,
+                total_count = total_count + 1,
+                attendance_count = attendance_count + excluded.attendance_count,
+                grade_count = grade_count + excluded.grade_count,
+                pending_count = pending_count + 1,
+                last_request_date = excluded.last_request_date
+        ''', (student_number, student_name, is_attendance, 1 - is_attendance))
+    
+    def _move_student_summary_status(self, cursor, request_id, old_status, new_status):
+        """ステータス変更分を生徒別集計に反映"""
+        if old_status == new_status:
+            return
+        
+        columns = {'pending': 'pending_count', 'approved': 'approved_count',
+                   'rejected': 'rejected_count'}
+        old_column = columns.get(old_status)
+        new_column = columns.get(new_status)
+        if not old_column or not new_column:
+            return
+        
+        cursor.execute('SELECT student_number FROM correction_targets WHERE request_id = ?',
+                       (request_id,))
+        for row in cursor.fetchall():
+            cursor.execute(f'''
+                UPDATE student_correction_summary
+                SET {old_column} = {old_column} - 1,
+                    {new_column} = {new_column} + 1
+                WHERE student_number = ?
+            ''', (row['student_number'],))
+    
+    def _rebuild_student_summary(self, cursor):
+        """生徒別集計を全件から再構築"""
+        cursor.execute('DELETE FROM student_correction_summary')
+        cursor.execute(f'''
+            INSERT INTO student_correction_summary (
+                student_number, student_name, total_count, attendance_count,
+                grade_count, pending_count, approved_count, rejected_count,
+                last_request_date
+            )
+            SELECT 
+                t.student_number,
+                MAX(t.student_name),
+                COUNT(*),
+                SUM(r.correction_type = {enums.ATTENDANCE}),
+                SUM(r.correction_type != {enums.ATTENDANCE}),
+                SUM(r.status = {enums.PENDING}),
+                SUM(r.status = {enums.APPROVED}),
+                SUM(r.status = {enums.REJECTED}),
+                MAX(r.request_date)
+            FROM correction_targets t
+            JOIN correction_requests r ON r.request_id = t.request_id
+            GROUP BY t.student_number
+        ''')
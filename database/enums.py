@@ -0,0 +1,101 @@
+# database/enums.py
+"""申請の状態・種別・訂正項目の名前と、DBに保存する整数コードの対応
+
+DatabaseManager の呼び出し側・戻り値はこれまでどおり名前（'pending' など）を使い、
+DBには小さな整数（訂正項目は選択した項目のビットの和）で保存する。
+SQL内の比較は部分インデックスが使えるよう、パラメータではなく下の定数を埋め込む。
+"""
+
+STATUS_CODES = {
+    'pending': 0,
+    'approved': 1,
+    'rejected': 2,
+}
+
+CORRECTION_TYPE_CODES = {
+    'attendance': 1,
+    'grade': 2,
+}
+
+# 成績訂正の訂正項目（複数選択のためビットの和で保存）
+CORRECTION_ITEM_BITS = {
+    'evaluation': 1,
+    'observation': 2,
+    'total': 4,
+}
+
+# 一覧に表示する状態・種別の名称
+STATUS_LABELS = {'pending': '処理中', 'approved': '承認済', 'rejected': '差戻し'}
+CORRECTION_TYPE_LABELS = {'attendance': '出欠', 'grade': '成績'}
+
+PENDING = STATUS_CODES['pending']
+APPROVED = STATUS_CODES['approved']
+REJECTED = STATUS_CODES['rejected']
+ATTENDANCE = CORRECTION_TYPE_CODES['attendance']
+GRADE = CORRECTION_TYPE_CODES['grade']
+
+
+def encode(codes, name):
+    """名前をコードに変換（未知の名前は ValueError）"""
+    try:
+        return codes[name]
+    except KeyError:
+        raise ValueError(f"{name!r} は {', '.join(codes)} のいずれかを指定してください") from None
+
+
+def decode(codes, code):
+    """コードを名前に変換（未知のコードはそのまま返す）"""
+    for name, value in codes.items():
+        if value == code:
+            return name
+    return code
+
+
+def encode_items(items):
+    """'evaluation,total' のようなカンマ区切りの訂正項目をビットの和に変換"""
+    mask = 0
+    for item in str(items or '').split(','):
+        if item.strip():
+            mask |= encode(CORRECTION_ITEM_BITS, item.strip())
+    return mask
+
+
+def decode_items(mask):
+    """ビットの和をカンマ区切りの訂正項目に変換"""
+    return ','.join(name for name, bit in CORRECTION_ITEM_BITS.items() if mask and mask & bit)
+
+
+def sql_in(codes):
+    """CHECK 制約・IN 条件用の '(0, 1, 2)'"""
+    return f"({', '.join(str(value) for value in codes.values())})"
+
+
+def sql_name(column, codes):
+    """列のコードを名前に戻すSQL式（SELECT の戻り値をこれまでどおり名前にする）"""
+    cases = ' '.join(f"WHEN {value} THEN '{name}'" for name, value in codes.items())
+    return f'CASE {column} {cases} END'
+
+
+def sql_label(column, codes, labels):
+    """列のコードを一覧の表示名にするSQL式（未知のコードは空文字）"""
+    cases = ' '.join(f"WHEN {codes[name]} THEN '{label}'" for name, label in labels.items())
+    return f"CASE {column} {cases} ELSE '' END"
+
+
+def sql_code(column, codes):
+    """名前の列をコードに変換するSQL式（旧形式のテーブルからの移行用）"""
+    cases = ' '.join(f"WHEN '{name}' THEN {value}" for name, value in codes.items())
+    return f'CASE {column} {cases} END'
+
+
+def sql_item_names(column):
+    """訂正項目のビットの和をカンマ区切りの名前に戻すSQL式"""
+    parts = ' || '.join(f"CASE WHEN {column} & {bit} THEN '{name},' ELSE '' END"
+                        for name, bit in CORRECTION_ITEM_BITS.items())
+    return f"rtrim({parts}, ',')"
+
+
+def sql_item_mask(column):
+    """カンマ区切りの訂正項目の列をビットの和に変換するSQL式（移行用）"""
+    return ' + '.join(f"(instr(',' || COALESCE({column}, '') || ',', ',{name},') > 0) * {bit}"
+                      for name, bit in CORRECTION_ITEM_BITS.items())
@@ -0,0 +1,234 @@
+# database/grades.py
+from database.dates import date_to_epoch
+from database.enums import APPROVED
+
+# 観点別評価の3文字の位置（1文字目から順に）と集計上の項目名
+OBSERVATION_ITEMS = ('観点1', '観点2', '観点3')
+EVALUATION_ITEM = '評定'
+
+
+class GradeSnapshots:
+    """生徒・講座ごとの成績（評定と観点別評価）と講座別の分布
+
+    校務システムから読み込んだ成績に、承認された成績訂正を同一トランザクション内で反映し、
+    影響のあった講座の分布をまとめて集計し直す。集計は講座単位の集約SQLで行う。
+    """
+
+    def create_tables(self, cursor):
+        """成績・分布テーブル作成"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS grade_snapshots (
+                student_number VARCHAR(10) NOT NULL,
+                course_name VARCHAR(100) NOT NULL,
+                student_name VARCHAR(100),
+                evaluation INTEGER,
+                observation VARCHAR(3),
+                last_request_id INTEGER,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (course_name, student_number)
+            )
+        ''')
+
+        # 講座ごとの評定・観点別評価（各観点）の人数分布
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS grade_distribution (
+                course_name VARCHAR(100) NOT NULL,
+                item VARCHAR(10) NOT NULL,
+                value VARCHAR(2) NOT NULL,
+                student_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (course_name, item, value)
+            )
+        ''')
+
+    def load(self, cursor, rows):
+        """校務システムの成績を読み込む（組番号・講座名が同じ行は上書き）
+
+        rows は (student_number, course_name, student_name, evaluation, observation)。
+        読み込んだ講座の講座名の集合を返す。
+        """
+        rows = list(rows)
+        cursor.executemany('''
+            INSERT INTO grade_snapshots (
+                student_number, course_name, student_name, evaluation, observation
+            ) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(course_name, student_number) DO UPDATE SET
+                student_name = COALESCE(excluded.student_name, student_name),
+                evaluation = excluded.evaluation,
+                observation = excluded.observation,
+                last_request_id = NULL,
+                updated_at = CURRENT_TIMESTAMP
+        ''', rows)
+
+        courses = {row[1] for row in rows}
+        self.refresh_distribution(cursor, courses)
+        return courses
+
+    def record_status_change(self, cursor, request_id, old_status, new_status):
+        """承認された成績訂正の訂正後の値を反映し、その講座の分布を集計し直す
+
+        訂正しなかった項目（訂正後の値が空）は現在の値のまま残す。
+        """
+        if new_status != 'approved' or old_status == 'approved':
+            return
+
+        cursor.execute('''
+            INSERT INTO grade_snapshots (
+                student_number, course_name, student_name, evaluation, observation,
+                last_request_id
+            )
+            SELECT t.student_number, g.course_name, t.student_name,
+                   g.after_evaluation, NULLIF(g.after_observation, ''), t.request_id
+            FROM correction_targets t
+            JOIN grade_corrections g ON g.target_id = t.target_id
+            WHERE t.request_id = ?
+            ON CONFLICT(course_name, student_number) DO UPDATE SET
+                evaluation = COALESCE(excluded.evaluation, evaluation),
+                observation = COALESCE(excluded.observation, observation),
+                last_request_id = excluded.last_request_id,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (request_id,))
+
+        cursor.execute('''
+            SELECT DISTINCT g.course_name
+            FROM correction_targets t
+            JOIN grade_corrections g ON g.target_id = t.target_id
+            WHERE t.request_id = ?
+        ''', (request_id,))
+        self.refresh_distribution(cursor, [row[0] for row in cursor.fetchall()])
+
+    def refresh_distribution(self, cursor, courses=None):
+        """指定した講座（None なら全講座）の分布を成績から集計し直す"""
+        if courses is not None:
+            courses = list(courses)
+            if not courses:
+                return
+            course_filter = f"course_name IN ({','.join('?' * len(courses))})"
+            params = courses
+        else:
+            course_filter = 'course_name IS NOT NULL'
+            params = []
+
+        cursor.execute(f'DELETE FROM grade_distribution WHERE {course_filter}', params)
+
+        # 評定と3観点をそれぞれ1回の集約で数える
+        observation_positions = ' UNION ALL '.join(
+            f"SELECT {position} as position, '{item}' as item"
+            for position, item in enumerate(OBSERVATION_ITEMS, 1)
+        )
+        cursor.execute(f'''
+            INSERT INTO grade_distribution (course_name, item, value, student_count)
+            SELECT course_name, '{EVALUATION_ITEM}', CAST(evaluation AS TEXT), COUNT(*)
+            FROM grade_snapshots
+            WHERE {course_filter} AND evaluation IS NOT NULL
+            GROUP BY course_name, evaluation
+            UNION ALL
+            SELECT course_name, item, substr(observation, position, 1), COUNT(*)
+            FROM grade_snapshots
+            JOIN ({observation_positions}) ON length(observation) >= position
+            WHERE {course_filter}
+            GROUP BY course_name, item, substr(observation, position, 1)
+        ''', params + params)
+
+    def course_summary(self, cursor, course_name):
+        """講座の人数・評定平均と、項目ごとの分布"""
+        cursor.execute('''
+            SELECT COUNT(*), COUNT(evaluation), AVG(evaluation)
+            FROM grade_snapshots
+            WHERE course_name = ?
+        ''', (course_name,))
+        student_count, evaluated_count, average = cursor.fetchone()
+
+        cursor.execute('''
+            SELECT item, value, student_count
+            FROM grade_distribution
+            WHERE course_name = ?
+            ORDER BY item, value
+        ''', (course_name,))
+        distribution = {}
+        for item, value, count in cursor.fetchall():
+            distribution.setdefault(item, {})[value] = count
+
+        return {
+            'course_name': course_name,
+            'student_count': student_count,
+            'evaluated_count': evaluated_count,
+            'average_evaluation': average,
+            'distribution': distribution
+        }
+
+    def change_report(self, cursor, course_name, since=None):
+        """講座で承認された成績訂正による変更（生徒ごとに最初の訂正前と現在の値）
+
+        since（YYYY-MM-DD）を指定すると、その日以降に承認された訂正のみを対象にする。
+        訂正前の値は、評定・観点別評価それぞれを最初に訂正したときの値とする。
+        分布の増減は、訂正した項目について訂正前と現在の値の差から求める。
+        """
+        since_epoch = date_to_epoch(since) if since else None
+        cursor.execute(f'''
+            WITH changes AS (
+                SELECT
+                    t.student_number,
+                    t.student_name,
+                    FIRST_VALUE(g.before_evaluation) OVER (
+                        PARTITION BY t.student_number
+                        ORDER BY g.before_evaluation IS NULL, r.approved_epoch, r.request_id
+                    ) as before_evaluation,
+                    FIRST_VALUE(NULLIF(g.before_observation, '')) OVER (
+                        PARTITION BY t.student_number
+                        ORDER BY NULLIF(g.before_observation, '') IS NULL, r.approved_epoch, r.request_id
+                    ) as before_observation,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY t.student_number
+                        ORDER BY r.approved_epoch, r.request_id
+                    ) as position,
+                    COUNT(*) OVER (PARTITION BY t.student_number) as change_count
+                FROM correction_requests r
+                JOIN correction_targets t ON t.request_id = r.request_id
+                JOIN grade_corrections g ON g.target_id = t.target_id
+                WHERE r.status = {APPROVED} AND g.course_name = ?
+                  AND (? IS NULL OR r.approved_epoch >= ?)
+            )
+            SELECT
+                c.student_number,
+                COALESCE(s.student_name, c.student_name) as student_name,
+                c.before_evaluation,
+                s.evaluation as after_evaluation,
+                c.before_observation,
+                s.observation as after_observation,
+                c.change_count,
+                s.last_request_id,
+                s.updated_at
+            FROM changes c
+            LEFT JOIN grade_snapshots s
+                ON s.course_name = ? AND s.student_number = c.student_number
+            WHERE c.position = 1
+            ORDER BY c.student_number
+        ''', (course_name, since_epoch, since_epoch, course_name))
+        students = [dict(row) for row in cursor.fetchall()]
+
+        # 分布の増減（訂正していない項目は数えない）
+        delta = {}
+
+        def count(item, before, after):
+            values = delta.setdefault(item, {})
+            for value, step in ((before, -1), (after, 1)):
+                if value is not None and value != '':
+                    values[str(value)] = values.get(str(value), 0) + step
+
+        for student in students:
+            if student['before_evaluation'] is not None:
+                count(EVALUATION_ITEM, student['before_evaluation'], student['after_evaluation'])
+            before = student['before_observation'] or ''
+            after = student['after_observation'] or ''
+            for position, item in enumerate(OBSERVATION_ITEMS):
+                if len(before) > position:
+                    count(item, before[position], after[position] if len(after) > position else None)
+
+        report = self.course_summary(cursor, course_name)
+        report['since'] = since
+        report['students'] = students
+        report['distribution_change'] = {
+            item: {value: change for value, change in sorted(values.items()) if change}
+            for item, values in delta.items()
+        }
+        return report
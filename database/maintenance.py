@@ -0,0 +1,188 @@
+# database/maintenance.py
+import sqlite3
+import threading
+import time
+
+
+class DatabaseMaintenance:
+    """統計更新・増分VACUUM・整合性チェックの実行と記録
+
+    アイドル時の実行（run）は短時間で終わる PRAGMA optimize と増分VACUUMのみとし、
+    DB全体を読み書きする処理（auto_vacuum の変換のためのVACUUM・ANALYZE・整合性チェック）は
+    管理者が明示的に実行する（run(full=True)、python cli.py maintenance --full）。
+    """
+
+    # 1回の増分VACUUMで解放する最大ページ数
+    VACUUM_PAGES_PER_RUN = 2000
+
+    # PRAGMA optimize で統計を取り直す際に1インデックスあたり読む行数の目安
+    ANALYSIS_LIMIT = 1000
+
+    # アイドル時は他端末が使用中なら待たずに見送る
+    BUSY_TIMEOUT = 1.0
+
+    # 明示的な実行では他端末の書き込みが終わるのを待つ
+    FULL_BUSY_TIMEOUT = 30.0
+
+    def __init__(self, db_path, vacuum_pages=VACUUM_PAGES_PER_RUN):
+        self.db_path = db_path
+        self.vacuum_pages = vacuum_pages
+
+    def create_tables(self, cursor):
+        """メンテナンス履歴テーブル作成"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task VARCHAR(30) NOT NULL,
+                started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                duration_ms INTEGER,
+                result TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_maintenance_started ON maintenance_log(started_at)')
+
+    def run(self, full=False):
+        """タスクを順に実行し、タスクごとの結果を返す
+
+        full=True では auto_vacuum の変換（既存DBは一度だけ全体のVACUUM）・ANALYZE・整合性チェックも行う。
+        VACUUM の間は他の端末の読み書きがすべて待たされるため、利用者の少ない時間に実行する。
+        """
+        connection = sqlite3.connect(self.db_path,
+                                     timeout=self.FULL_BUSY_TIMEOUT if full else self.BUSY_TIMEOUT,
+                                     isolation_level=None)
+        results = []
+
+        try:
+            if full:
+                tasks = [
+                    ('auto_vacuum', self._ensure_incremental_vacuum),
+                    ('analyze', self._analyze),
+                    ('incremental_vacuum', self._incremental_vacuum),
+                    ('quick_check', self._quick_check),
+                ]
+            else:
+                tasks = [
+                    ('optimize', self._optimize),
+                    ('incremental_vacuum', self._incremental_vacuum),
+                ]
+            for task, function in tasks:
+                started = time.perf_counter()
+                try:
+                    result = function(connection)
+                except sqlite3.OperationalError as e:
+                    # ロック中などは次回に回す
+                    result = f'skipped: {e}'
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                results.append({'task': task, 'duration_ms': duration_ms, 'result': result})
+
+            self._record(connection, results)
+            return results
+
+        finally:
+            connection.close()
+
+    def _ensure_incremental_vacuum(self, connection):
+        """auto_vacuum を INCREMENTAL に切り替え（既存DBは一度だけVACUUMが必要）"""
+        mode = connection.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if mode == 2:
+            return 'incremental'
+
+        connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        connection.execute('VACUUM')
+        return 'converted to incremental'
+
+    def _analyze(self, connection):
+        """全テーブルの統計を取り直す"""
+        connection.execute('ANALYZE')
+        return 'analyze'
+
+    def _optimize(self, connection):
+        """統計が古くなったテーブルのみ、読む行数を抑えて更新"""
+        connection.execute(f'PRAGMA analysis_limit = {int(self.ANALYSIS_LIMIT)}')
+        connection.execute('PRAGMA optimize')
+        return 'optimize'
+
+    def _incremental_vacuum(self, connection):
+        """空きページを少しずつ解放"""
+        mode = connection.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if mode != 2:
+            return 'skipped: auto_vacuum が INCREMENTAL ではありません（maintenance --full で変換）'
+
+        free_pages = connection.execute('PRAGMA freelist_count').fetchone()[0]
+        pages = min(free_pages, self.vacuum_pages)
+        if pages:
+            connection.execute(f'PRAGMA incremental_vacuum({pages})').fetchall()
+        return f'freed {pages} of {free_pages} pages'
+
+    def _quick_check(self, connection):
+        """整合性チェック"""
+        rows = connection.execute('PRAGMA quick_check').fetchall()
+        return rows[0][0] if len(rows) == 1 else '; '.join(row[0] for row in rows[:10])
+
+    def _record(self, connection, results):
+        """実行結果を履歴テーブルに記録"""
+        try:
+            connection.executemany('''
+                INSERT INTO maintenance_log (task, duration_ms, result)
+                VALUES (?, ?, ?)
+            ''', [(r['task'], r['duration_ms'], r['result']) for r in results])
+        except sqlite3.OperationalError:
+            pass
+
+
+class IdleMaintenanceScheduler:
+    """Tkイベントループの操作状況からアイドル時を検出してメンテナンスを実行"""
+
+    # アイドル判定の確認間隔（ミリ秒）
+    CHECK_INTERVAL_MS = 30000
+
+    def __init__(self, root, db_manager, idle_minutes=5, interval_hours=24):
+        self.root = root
+        self.db_manager = db_manager
+        self.idle_seconds = idle_minutes * 60
+        self.interval_seconds = interval_hours * 3600
+
+        self.last_activity = time.monotonic()
+        self.running = False
+        self.last_results = None
+        self.next_due = None
+
+    def start(self):
+        """操作の監視と定期確認を開始"""
+        for sequence in ('<Any-KeyPress>', '<Any-ButtonPress>', '<Motion>'):
+            self.root.bind_all(sequence, self._on_activity, add='+')
+        self.root.after(self.CHECK_INTERVAL_MS, self._check)
+
+    def _on_activity(self, event):
+        self.last_activity = time.monotonic()
+
+    def _check(self):
+        try:
+            if self._should_run():
+                self.running = True
+                threading.Thread(target=self._run, name='db-maintenance', daemon=True).start()
+        finally:
+            self.root.after(self.CHECK_INTERVAL_MS, self._check)
+
+    def _should_run(self):
+        if self.running or self.db_manager.write_in_progress:
+            return False
+        if time.monotonic() - self.last_activity < self.idle_seconds:
+            return False
+
+        if self.next_due is not None and time.monotonic() < self.next_due:
+            return False
+
+        # 他端末の実行分も含めて前回実行から間隔が空いているか（期限到来時のみ照会）
+        elapsed = self.db_manager.seconds_since_last_maintenance()
+        if elapsed is not None and elapsed < self.interval_seconds:
+            self.next_due = time.monotonic() + self.interval_seconds - elapsed
+            return False
+        return True
+
+    def _run(self):
+        try:
+            self.last_results = self.db_manager.run_maintenance()
+        finally:
+            self.next_due = time.monotonic() + self.interval_seconds
+            self.running = False
@@ -0,0 +1,237 @@
+# database/outbox.py
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+class SubmissionOutbox:
+    """共有DBに保存できなかった申請を端末のローカルディスクに保持するキュー"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        connection = self._connect()
+        try:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    idempotency_key TEXT PRIMARY KEY,
+                    form_data TEXT NOT NULL,
+                    system_info TEXT NOT NULL,
+                    queued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    failed INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def enqueue(self, form_data, system_info):
+        """申請をキューに追加し、冪等キーを返す（同じキーの二重登録は無視）"""
+        form_data = dict(form_data)
+        key = form_data.setdefault('client_request_key', uuid.uuid4().hex)
+        now = time.time()
+
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.execute('''
+                    INSERT OR IGNORE INTO outbox (
+                        idempotency_key, form_data, system_info, queued_at, next_attempt_at
+                    ) VALUES (?, ?, ?, ?, ?)
+                ''', (key, json.dumps(form_data, ensure_ascii=False),
+                      json.dumps(system_info, ensure_ascii=False), now, now))
+                connection.commit()
+            finally:
+                connection.close()
+
+        return key
+
+    def due_entries(self, now=None):
+        """再送時刻に達したエントリ（古い順）"""
+        now = time.time() if now is None else now
+
+        with self._lock:
+            connection = self._connect()
+            try:
+                rows = connection.execute('''
+                    SELECT idempotency_key, form_data, system_info, attempts
+                    FROM outbox
+                    WHERE failed = 0 AND next_attempt_at <= ?
+                    ORDER BY queued_at
+                ''', (now,)).fetchall()
+            finally:
+                connection.close()
+
+        return [
+            {'key': key, 'form_data': json.loads(form_data),
+             'system_info': json.loads(system_info), 'attempts': attempts}
+            for key, form_data, system_info, attempts in rows
+        ]
+
+    def counts(self):
+        """(送信待ち件数, 送信不可件数)"""
+        with self._lock:
+            connection = self._connect()
+            try:
+                return connection.execute('''
+                    SELECT COALESCE(SUM(failed = 0), 0), COALESCE(SUM(failed = 1), 0) FROM outbox
+                ''').fetchone()
+            finally:
+                connection.close()
+
+    def next_attempt_in(self):
+        """次の再送までの秒数（送信待ちがなければ None）"""
+        with self._lock:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    'SELECT MIN(next_attempt_at) FROM outbox WHERE failed = 0'
+                ).fetchone()
+            finally:
+                connection.close()
+
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def mark_sent(self, key):
+        """送信済みエントリを削除"""
+        self._execute('DELETE FROM outbox WHERE idempotency_key = ?', (key,))
+
+    def mark_retry(self, key, error, next_attempt_at):
+        """再送予定を更新"""
+        self._execute('''
+            UPDATE outbox
+            SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+            WHERE idempotency_key = ?
+        ''', (error, next_attempt_at, key))
+
+    def postpone_all(self, next_attempt_at):
+        """共有DBが使えない間は全エントリの再送を遅らせる"""
+        self._execute('''
+            UPDATE outbox SET next_attempt_at = MAX(next_attempt_at, ?)
+            WHERE failed = 0
+        ''', (next_attempt_at,))
+
+    def mark_failed(self, key, error):
+        """再送しても成功しないエントリ（入力内容の不備など）"""
+        self._execute('''
+            UPDATE outbox SET attempts = attempts + 1, last_error = ?, failed = 1
+            WHERE idempotency_key = ?
+        ''', (error, key))
+
+    def _execute(self, sql, params):
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.execute(sql, params)
+                connection.commit()
+            finally:
+                connection.close()
+
+
+class OutboxSyncWorker:
+    """キューの申請を共有DBへバックグラウンドで再送（指数バックオフ）
+
+    起動時に共有DBを初期化できなかった場合（initialized=False）は、
+    再送の前に初期化を同じ間隔で再試行する。
+    """
+
+    BASE_DELAY = 5
+    MAX_DELAY = 300
+
+    def __init__(self, outbox, db_manager, initialized=True):
+        self.outbox = outbox
+        self.db_manager = db_manager
+        self.initialized = initialized
+        self._initialize_attempts = 0
+
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # UIスレッドから参照する状態（ファイルを読まずに表示できるよう保持）
+        self.pending_count, self.failed_count = outbox.counts()
+        self.last_error = None
+
+    def submit(self, form_data, system_info):
+        """キューに追加して再送を起こす"""
+        key = self.outbox.enqueue(form_data, system_info)
+        self.pending_count, self.failed_count = self.outbox.counts()
+        self._wake_event.set()
+        return key
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='outbox-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.initialized and not self.initialize_once():
+                self._wake_event.wait(self._backoff(self._initialize_attempts))
+                self._wake_event.clear()
+                continue
+
+            self.sync_once()
+
+            wait = self.outbox.next_attempt_in()
+            self._wake_event.wait(self.MAX_DELAY if wait is None else wait)
+            self._wake_event.clear()
+
+    def initialize_once(self):
+        """共有DBの初期化を1回試行（成功したら True）"""
+        try:
+            self.db_manager.initialize_database()
+        except sqlite3.OperationalError as e:
+            self._initialize_attempts += 1
+            self.last_error = str(e)
+            return False
+        self.initialized = True
+        self.last_error = None
+        return True
+
+    def sync_once(self):
+        """再送時刻に達した申請を送信"""
+        for entry in self.outbox.due_entries():
+            if self._stop_event.is_set():
+                break
+
+            result = self.db_manager.save_correction_request(
+                entry['form_data'], entry['system_info'])
+
+            if result['success']:
+                self.outbox.mark_sent(entry['key'])
+                self.last_error = None
+            elif result.get('retryable'):
+                next_attempt_at = time.time() + self._backoff(entry['attempts'])
+                self.outbox.mark_retry(entry['key'], result['error'], next_attempt_at)
+                # 共有DBが使えない間は残りも送らない
+                self.outbox.postpone_all(next_attempt_at)
+                self.last_error = result['error']
+                break
+            else:
+                self.outbox.mark_failed(entry['key'], result['error'])
+                self.last_error = result['error']
+
+        self.pending_count, self.failed_count = self.outbox.counts()
+
+    def _backoff(self, attempts):
+        delay = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempts)
+        return delay * random.uniform(0.8, 1.2)
@@ -0,0 +1,164 @@
+# database/remote.py
+import json
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from database.rows import rows_from_lists
+
+
+class ServiceError(Exception):
+    """サービスがエラーを返した"""
+
+
+class RemoteDatabaseClient:
+    """サービスモード（service.py）に HTTP/JSON で接続する
+
+    MainWindow・LoginDialog が使う DatabaseManager のメソッドと同じ名前・戻り値で呼び出せる。
+    """
+
+    # 承認待ち一覧を取得する際の1ページの件数
+    PAGE_SIZE = 500
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.token = None
+
+        # 他校舎の横断・ローカルコピーはサーバー側で扱う
+        self.shards = {}
+        self.replica = None
+        self.last_shard_errors = {}
+
+    def _request(self, method, path, query=None, data=None):
+        url = self.base_url + path
+        if query:
+            url += '?' + urlencode({key: value for key, value in query.items() if value is not None})
+
+        body = None if data is None else json.dumps(data, ensure_ascii=False).encode('utf-8')
+        request = Request(url, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8'))['error']
+            except (ValueError, KeyError):
+                message = str(e)
+            raise ServiceError(message) from e
+
+    def _write(self, method, path, data):
+        """更新系の呼び出し（DatabaseManager と同様に失敗も結果の辞書で返す）"""
+        try:
+            return self._request(method, path, data=data)
+        except (ServiceError, OSError) as e:
+            return {'success': False, 'error': str(e)}
+
+    def _rows(self, path, limit, offset=0, request_ids=None, shard=None):
+        query = {'limit': limit, 'offset': offset, 'shard': shard}
+        if request_ids:
+            query['ids'] = ','.join(str(request_id) for request_id in request_ids)
+        payload = self._request('GET', path, query)
+        return rows_from_lists(payload['columns'], payload['rows']), payload['has_more']
+
+    # --- 認証 ---
+
+    def load_user_directory(self):
+        """アカウント情報はサーバー側で保持するため何もしない"""
+
+    def authenticate_user(self, username, password):
+        result = self._request('POST', '/api/login', data={'username': username, 'password': password})
+        self.token = result.pop('token', None)
+        return result
+
+    # --- 申請 ---
+
+    def save_correction_request(self, form_data, system_info):
+        """申請を送信（サーバーに接続できない場合は 'retryable': True）"""
+        # 記入者・端末情報はサーバー側でログイン中のアカウントと接続元として記録される
+        try:
+            return self._request('POST', '/api/requests',
+                                 data={'form_data': form_data, 'system_info': system_info})
+        except ServiceError as e:
+            return {'success': False, 'error': str(e)}
+        except (URLError, OSError) as e:
+            return {'success': False, 'error': str(e), 'retryable': True}
+
+    def find_conflicting_requests(self, form_data):
+        return self._request('POST', '/api/requests/conflicts', data={'form_data': form_data})['conflicts']
+
+    def approve_request(self, request_id, approver_name, approver_id=None, expected_version=None,
+                        shard=None):
+        # 承認者はサーバー側でログイン中のアカウントとして記録される
+        return self._write('POST', f'/api/requests/{request_id}/approve',
+                           data={'expected_version': expected_version, 'shard': shard})
+
+    def reject_request(self, request_id, reason, expected_version=None, shard=None):
+        return self._write('POST', f'/api/requests/{request_id}/reject',
+                           data={'reason': reason, 'expected_version': expected_version,
+                                 'shard': shard})
+
+    def claim_next_requests(self, claimant, count, claimant_name=None):
+        # 担当者はサーバー側でログイン中のアカウントとして記録される
+        result = self._write('POST', '/api/queue/claim', data={'count': count})
+        if result.get('success'):
+            result['claimed'] = [tuple(key) for key in result['claimed']]
+        return result
+
+    def release_claims(self, claimant, request_ids=None, shard=None):
+        return self._write('POST', '/api/queue/release',
+                           data={'request_ids': request_ids, 'shard': shard})
+
+    def fetch_pending_rows(self, limit=None, offset=0, request_ids=None, shard=None):
+        if request_ids:
+            return self._rows('/api/requests/pending', self.PAGE_SIZE, 0, request_ids, shard)[0]
+        if limit is not None:
+            return self._rows('/api/requests/pending', limit, offset)[0]
+
+        # 全件はページ単位で取得
+        rows = []
+        has_more = True
+        while has_more:
+            page, has_more = self._rows('/api/requests/pending', self.PAGE_SIZE, offset + len(rows))
+            rows.extend(page)
+        return rows
+
+    def fetch_history_rows(self, limit=200, offset=0, request_ids=None, shard=None):
+        return self._rows('/api/requests/history', limit, offset, request_ids, shard)[0]
+
+    def get_request_detail(self, request_id, shard=None):
+        result = self._request('GET', f'/api/requests/{request_id}', {'shard': shard})
+        return result.get('request')
+
+    # --- 検索・統計 ---
+
+    def get_student_summary(self, student_number):
+        return self._request('GET', f'/api/students/{quote(student_number)}/summary')['summary']
+
+    def get_student_corrections(self, student_number):
+        return self._request('GET', f'/api/students/{quote(student_number)}/corrections')['corrections']
+
+    def get_approved_slips(self, date_from=None, date_to=None, request_ids=None, shard=None):
+        query = {'date_from': date_from, 'date_to': date_to, 'shard': shard}
+        if request_ids:
+            query['ids'] = ','.join(str(request_id) for request_id in request_ids)
+        return self._request('GET', '/api/slips', query)['slips']
+
+    def get_statistics_months(self):
+        return self._request('GET', '/api/statistics/months')['months']
+
+    def get_monthly_statistics(self, month):
+        return self._request('GET', f'/api/statistics/{month}')
+
+    def get_maintenance_history(self, limit=20):
+        return self._request('GET', '/api/maintenance/history', {'limit': limit})['history']
+
+    def backup_now(self):
+        return self._write('POST', '/api/backup', data={})
+
+    def data_age_seconds(self):
+        return None
@@ -0,0 +1,124 @@
+# database/replica.py
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from database.backup import copy_database
+
+
+class ReadReplica:
+    """共有DBの読み取り専用コピーを端末ローカルに保持
+
+    バックアップAPIで定期的にコピーし、共有DBのファイルが前回から
+    変わっていなければコピーを省略する。一覧・統計などの参照は
+    鮮度の上限内であればローカルのコピーから読み取る。
+    """
+
+    def __init__(self, primary_path, replica_path, max_staleness_seconds=300,
+                 refresh_seconds=60, pages_per_step=256, step_sleep=0.005):
+        self.primary_path = primary_path
+        self.replica_path = Path(replica_path)
+        self.max_staleness_seconds = max_staleness_seconds
+        self.refresh_seconds = refresh_seconds
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+
+        # 共有DBと一致していることを最後に確認した時刻
+        self.synced_at = None
+        self.last_error = None
+
+        self._signature = None
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _primary_signature(self):
+        """共有DB（WALファイルを含む）の更新時刻・サイズとファイル変更カウンタ
+
+        更新時刻の精度が粗いファイルシステムでも検出できるよう、
+        コミットごとに増えるヘッダのカウンタ（24〜27バイト目）も比較する。
+        """
+        signature = []
+        for suffix in ('', '-wal'):
+            try:
+                stat = os.stat(f'{self.primary_path}{suffix}')
+            except FileNotFoundError:
+                continue
+            signature.append((suffix, stat.st_mtime_ns, stat.st_size))
+
+        with open(self.primary_path, 'rb') as f:
+            signature.append(f.read(28)[24:])
+        return tuple(signature)
+
+    def refresh(self):
+        """共有DBが変わっていればコピーを更新し、結果を返す"""
+        with self._lock:
+            checked_at = time.time()
+            try:
+                signature = self._primary_signature()
+                if signature and signature == self._signature:
+                    self.synced_at = checked_at
+                    return {'success': True, 'copied': False}
+
+                started = time.perf_counter()
+                self.replica_path.parent.mkdir(parents=True, exist_ok=True)
+                source = sqlite3.connect(self.primary_path, timeout=30)
+                target = sqlite3.connect(self.replica_path, timeout=30)
+                try:
+                    copy_database(source, target, self.pages_per_step, self.step_sleep)
+                finally:
+                    target.close()
+                    source.close()
+
+                self._signature = signature
+                self.synced_at = checked_at
+                self.last_error = None
+                return {'success': True, 'copied': True,
+                        'seconds': time.perf_counter() - started}
+
+            except (sqlite3.Error, OSError) as e:
+                self.last_error = str(e)
+                return {'success': False, 'error': str(e)}
+
+    def request_refresh(self):
+        """この端末で書き込んだ直後などに更新を前倒しする"""
+        self._wake_event.set()
+
+    def age_seconds(self):
+        """コピーが共有DBと一致していた時点からの経過秒数（未同期なら None）"""
+        if self.synced_at is None:
+            return None
+        return time.time() - self.synced_at
+
+    def is_fresh(self):
+        """鮮度の上限内かどうか"""
+        age = self.age_seconds()
+        return age is not None and age <= self.max_staleness_seconds
+
+    def connect(self):
+        """コピーへの読み取り専用接続"""
+        return sqlite3.connect(f'{self.replica_path.resolve().as_uri()}?mode=ro', uri=True)
+
+    def start(self):
+        """バックグラウンドでの定期更新を開始"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                self.refresh()
+                self._wake_event.wait(self.refresh_seconds)
+                self._wake_event.clear()
+
+        self._thread = threading.Thread(target=run, name='read-replica', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """定期更新を停止"""
+        self._stop_event.set()
+        self._wake_event.set()
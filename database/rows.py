@@ -0,0 +1,55 @@
+# database/rows.py
+from collections import namedtuple
+from functools import lru_cache, partial
+
+# 直前に使った (cursor.description, 行クラス) の組
+_last_row_class = (None, None)
+
+# 履歴一覧の行の末尾に並ぶ表示用の列（Treeview の values と同じ順）
+HISTORY_DISPLAY_FIELDS = (
+    'date_str', 'time_str', 'applicant_name', 'student_number', 'student_name', 'type_label',
+    'subject', 'course_name', 'period', 'change_detail', 'reason_short', 'status_label',
+    'approver_name',
+)
+HISTORY_VALUES = slice(-len(HISTORY_DISPLAY_FIELDS), None)
+
+
+@lru_cache(maxsize=64)
+def _row_class(fields):
+    """列名の組み合わせごとに namedtuple クラスを1度だけ作成"""
+    return namedtuple('Row', fields)
+
+
+def namedtuple_factory(cursor, row):
+    """sqlite3 の row_factory：列名でアクセスできる軽量なタプルを返す
+
+    同じ SELECT の結果では cursor.description が同一オブジェクトのため、
+    行ごとの列名解決を省略する。
+    """
+    global _last_row_class
+
+    description = cursor.description
+    cached_description, row_class = _last_row_class
+    if description is not cached_description:
+        row_class = _row_class(tuple(column[0] for column in description))
+        _last_row_class = (description, row_class)
+
+    return row_class._make(row)
+
+
+def fetch_rows(cursor):
+    """残りの全行を行タプルのリストで返す（cursor.row_factory は None にしておく）
+
+    sqlite3 が作ったタプルを tuple.__new__ で行クラスに詰め替えるだけのため、
+    row_factory と違い1行ごとに Python の関数を呼び出さない。
+    """
+    rows = cursor.fetchall()
+    if not rows:
+        return rows
+    row_class = _row_class(tuple(column[0] for column in cursor.description))
+    return list(map(partial(tuple.__new__, row_class), rows))
+
+
+def rows_from_lists(columns, rows):
+    """列名リストと値のリスト（JSONで受け取った一覧など）から行タプルを作成"""
+    return list(map(partial(tuple.__new__, _row_class(tuple(columns))), rows))
@@ -0,0 +1,261 @@
+# database/statistics.py
+from datetime import date
+
+from database import enums
+from database.dates import NOW_EPOCH
+
+
+class StatisticsCounters:
+    """日別・種別・状態別の集計カウンタ
+
+    申請・承認・却下と同一トランザクション内で差分更新し、
+    ダッシュボードはこのカウンタのみを参照する。
+    """
+
+    def create_tables(self, cursor):
+        """集計テーブル作成"""
+        # 申請日ごとの件数（現在の状態別）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily_requests (
+                stat_date DATE NOT NULL,
+                correction_type VARCHAR(20) NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                request_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stat_date, correction_type, status)
+            )
+        ''')
+
+        # 処理日ごとの承認・却下件数と処理日数の合計
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily_decisions (
+                stat_date DATE NOT NULL,
+                correction_type VARCHAR(20) NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                decision_count INTEGER NOT NULL DEFAULT 0,
+                turnaround_seconds INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stat_date, correction_type, status)
+            )
+        ''')
+
+        # 申請日ごとの講座別件数
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily_courses (
+                stat_date DATE NOT NULL,
+                course_name VARCHAR(100) NOT NULL,
+                request_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stat_date, course_name)
+            )
+        ''')
+
+    def is_empty(self, cursor):
+        """カウンタが未作成かどうか"""
+        cursor.execute('SELECT 1 FROM stats_daily_requests LIMIT 1')
+        return cursor.fetchone() is None
+
+    def record_submission(self, cursor, correction_type, course_name):
+        """新規申請を加算"""
+        cursor.execute('''
+            INSERT INTO stats_daily_requests (stat_date, correction_type, status, request_count)
+            VALUES (date('now'), ?, 'pending', 1)
+            ON CONFLICT(stat_date, correction_type, status) DO UPDATE SET
+                request_count = request_count + 1
+        ''', (correction_type,))
+
+        if course_name:
+            cursor.execute('''
+                INSERT INTO stats_daily_courses (stat_date, course_name, request_count)
+                VALUES (date('now'), ?, 1)
+                ON CONFLICT(stat_date, course_name) DO UPDATE SET
+                    request_count = request_count + 1
+            ''', (course_name,))
+
+    def record_status_change(self, cursor, request_id, old_status, new_status):
+        """状態変更を反映（申請日側の付け替えと処理日側の加算）"""
+        if old_status == new_status:
+            return
+
+        cursor.execute(f'''
+            SELECT
+                date(request_epoch, 'unixepoch') as stat_date,
+                correction_type,
+                {NOW_EPOCH} - request_epoch as turnaround
+            FROM correction_requests
+            WHERE request_id = ?
+        ''', (request_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return
+
+        stat_date, turnaround = row[0], row[2] or 0
+        correction_type = enums.decode(enums.CORRECTION_TYPE_CODES, row[1])
+
+        cursor.execute('''
+            UPDATE stats_daily_requests
+            SET request_count = request_count - 1
+            WHERE stat_date = ? AND correction_type = ? AND status = ?
+        ''', (stat_date, correction_type, old_status))
+        cursor.execute('''
+            INSERT INTO stats_daily_requests (stat_date, correction_type, status, request_count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(stat_date, correction_type, status) DO UPDATE SET
+                request_count = request_count + 1
+        ''', (stat_date, correction_type, new_status))
+
+        if new_status in ('approved', 'rejected'):
+            cursor.execute('''
+                INSERT INTO stats_daily_decisions (
+                    stat_date, correction_type, status, decision_count, turnaround_seconds
+                ) VALUES (date('now'), ?, ?, 1, ?)
+                ON CONFLICT(stat_date, correction_type, status) DO UPDATE SET
+                    decision_count = decision_count + 1,
+                    turnaround_seconds = turnaround_seconds + excluded.turnaround_seconds
+            ''', (correction_type, new_status, turnaround))
+
+    def rebuild(self, cursor):
+        """既存の申請データからカウンタを再構築"""
+        cursor.execute('DELETE FROM stats_daily_requests')
+        cursor.execute('DELETE FROM stats_daily_decisions')
+        cursor.execute('DELETE FROM stats_daily_courses')
+
+        # 集計テーブルは状態・種別を名前で持つ
+        type_name = enums.sql_name('correction_type', enums.CORRECTION_TYPE_CODES)
+        status_name = enums.sql_name('status', enums.STATUS_CODES)
+
+        cursor.execute(f'''
+            INSERT INTO stats_daily_requests (stat_date, correction_type, status, request_count)
+            SELECT date(request_epoch, 'unixepoch'), {type_name}, {status_name}, COUNT(*)
+            FROM correction_requests
+            GROUP BY date(request_epoch, 'unixepoch'), correction_type, status
+        ''')
+
+        # 承認は approved_date、却下は updated_at を処理日とみなす
+        cursor.execute(f'''
+            INSERT INTO stats_daily_decisions (
+                stat_date, correction_type, status, decision_count, turnaround_seconds
+            )
+            SELECT
+                date(decided_epoch, 'unixepoch'), {type_name}, {status_name}, COUNT(*),
+                SUM(decided_epoch - request_epoch)
+            FROM (
+                SELECT
+                    correction_type, status, request_epoch,
+                    CASE WHEN status = {enums.APPROVED} THEN approved_epoch
+                         ELSE CAST(strftime('%s', updated_at) AS INTEGER) END as decided_epoch
+                FROM correction_requests
+                WHERE status IN ({enums.APPROVED}, {enums.REJECTED})
+            )
+            WHERE decided_epoch IS NOT NULL
+            GROUP BY date(decided_epoch, 'unixepoch'), correction_type, status
+        ''')
+
+        cursor.execute('''
+            INSERT INTO stats_daily_courses (stat_date, course_name, request_count)
+            SELECT date(r.request_epoch, 'unixepoch'), c.course_name, COUNT(DISTINCT r.request_id)
+            FROM correction_requests r
+            JOIN correction_targets t ON t.request_id = r.request_id
+            JOIN (
+                SELECT target_id, course_name FROM attendance_corrections
+                UNION ALL
+                SELECT target_id, course_name FROM grade_corrections
+            ) c ON c.target_id = t.target_id
+            GROUP BY date(r.request_epoch, 'unixepoch'), c.course_name
+        ''')
+
+    def list_months(self, cursor):
+        """集計が存在する年月の一覧（新しい順）"""
+        cursor.execute('''
+            SELECT DISTINCT substr(stat_date, 1, 7) FROM stats_daily_requests
+            UNION
+            SELECT DISTINCT substr(stat_date, 1, 7) FROM stats_daily_decisions
+            ORDER BY 1 DESC
+        ''')
+        return [row[0] for row in cursor.fetchall()]
+
+    def monthly_summary(self, cursor, month, top_courses=10):
+        """指定年月（YYYY-MM）の集計値を取得（top_courses=None で全講座）"""
+        start, end = self._month_range(month)
+
+        # 種別・状態別の申請件数
+        cursor.execute('''
+            SELECT correction_type, status, SUM(request_count)
+            FROM stats_daily_requests
+            WHERE stat_date >= ? AND stat_date < ?
+            GROUP BY correction_type, status
+        ''', (start, end))
+
+        by_type = {}
+        for correction_type, status, count in cursor.fetchall():
+            counts = by_type.setdefault(correction_type, {'total': 0})
+            counts[status] = count
+            counts['total'] += count
+
+        # 承認率と処理日数
+        cursor.execute('''
+            SELECT status, SUM(decision_count), SUM(turnaround_seconds)
+            FROM stats_daily_decisions
+            WHERE stat_date >= ? AND stat_date < ?
+            GROUP BY status
+        ''', (start, end))
+
+        decisions = {status: (count, seconds) for status, count, seconds in cursor.fetchall()}
+        approved, approved_seconds = decisions.get('approved', (0, 0))
+        rejected, _ = decisions.get('rejected', (0, 0))
+        decided = approved + rejected
+
+        # 講座別件数（上位）
+        cursor.execute('''
+            SELECT course_name, SUM(request_count) as total
+            FROM stats_daily_courses
+            WHERE stat_date >= ? AND stat_date < ?
+            GROUP BY course_name
+            ORDER BY total DESC, course_name
+            LIMIT ?
+        ''', (start, end, -1 if top_courses is None else top_courses))
+
+        return {
+            'month': month,
+            'by_type': by_type,
+            'total_requests': sum(counts['total'] for counts in by_type.values()),
+            'approved_count': approved,
+            'rejected_count': rejected,
+            'approval_rate': approved / decided if decided else None,
+            'average_turnaround_days': (approved_seconds / approved / 86400) if approved else None,
+            'top_courses': [(row[0], row[1]) for row in cursor.fetchall()]
+        }
+
+    def combine(self, summaries, month, top_courses=10):
+        """複数DBの monthly_summary（講座は全件）を合算"""
+        by_type = {}
+        courses = {}
+        approved = rejected = 0
+        approved_days = 0.0
+
+        for summary in summaries:
+            for correction_type, counts in summary['by_type'].items():
+                combined = by_type.setdefault(correction_type, {})
+                for status, count in counts.items():
+                    combined[status] = combined.get(status, 0) + count
+            for course_name, count in summary['top_courses']:
+                courses[course_name] = courses.get(course_name, 0) + count
+            approved += summary['approved_count']
+            rejected += summary['rejected_count']
+            approved_days += (summary['average_turnaround_days'] or 0) * summary['approved_count']
+
+        decided = approved + rejected
+        return {
+            'month': month,
+            'by_type': by_type,
+            'total_requests': sum(counts['total'] for counts in by_type.values()),
+            'approved_count': approved,
+            'rejected_count': rejected,
+            'approval_rate': approved / decided if decided else None,
+            'average_turnaround_days': approved_days / approved if approved else None,
+            'top_courses': sorted(courses.items(), key=lambda item: (-item[1], item[0]))[:top_courses]
+        }
+
+    def _month_range(self, month):
+        """YYYY-MM を [月初, 翌月初) の日付文字列に変換"""
+        year, month_number = (int(part) for part in month.split('-'))
+        start = date(year, month_number, 1)
+        end = date(year + month_number // 12, month_number % 12 + 1, 1)
+        return start.isoformat(), end.isoformat()
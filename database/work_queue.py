@@ -0,0 +1,125 @@
+# database/work_queue.py
+from database import enums
+from database.dates import NOW_EPOCH
+from database.enums import PENDING
+
+# 種別ごとの処理期限（申請日からの日数）
+DEFAULT_SLA_DAYS = {
+    'attendance': 3,
+    'grade': 5,
+}
+
+# 担当の確保時間（分）
+DEFAULT_LEASE_MINUTES = 30
+
+# 締切日のない場合の期限（9999-12-31 23:59:59 UTC）
+NO_CUTOFF_EPOCH = 253402300799
+
+# 締切日の 'YYYY-MM-DD HH:MM:SS'（端末の時刻）を UNIX 時刻に変換するSQL式
+LOCAL_EPOCH = "CAST(strftime('%s', ?, 'utc') AS INTEGER)"
+
+
+class WorkQueue:
+    """承認待ち申請の処理順（期限の近い順）と管理者ごとの担当
+
+    期限 due_at は申請日＋種別ごとの日数とし、それより前に通知表の締切などの締切日があれば
+    締切日の終わりに早める。経過日数は期限に織り込まれるため、期限の昇順がそのまま優先順になる。
+    承認待ちのみの部分インデックスで先頭の数件だけを読み、担当は一定時間で自動的に解除される。
+    期限・確保期限は UNIX 時刻（秒）の整数で保存・比較する（表示用の due_at・claimed_until は生成列）。
+    """
+
+    def __init__(self, sla_days=None, cutoff_dates=(), lease_minutes=DEFAULT_LEASE_MINUTES):
+        self.sla_days = dict(DEFAULT_SLA_DAYS, **(sla_days or {}))
+        self.cutoff_dates = sorted(cutoff_dates)
+        self.lease_minutes = lease_minutes
+
+    def create_indexes(self, cursor):
+        """処理順のインデックス（承認・却下済みの申請は含めない）"""
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_request_queue
+            ON correction_requests(due_epoch, request_id) WHERE status = {PENDING}
+        ''')
+
+    def _due_epoch_sql(self):
+        """期限（UNIX 時刻）を求める式とパラメータ（correction_requests の1行に対して評価）"""
+        cases = ' '.join('WHEN ? THEN ?' for _ in self.sla_days)
+        params = []
+        for correction_type, days in self.sla_days.items():
+            params += [enums.encode(enums.CORRECTION_TYPE_CODES, correction_type), int(days) * 86400]
+        sla_due = f"request_epoch + CASE correction_type {cases} ELSE ? END"
+        params.append(int(max(self.sla_days.values())) * 86400)
+
+        if not self.cutoff_dates:
+            return sla_due, params
+
+        # 申請日以降で最初の締切日（締切日の終わりを端末の時刻からUTCに変換）
+        cutoffs = ' '.join(f"WHEN request_epoch <= {LOCAL_EPOCH} THEN {LOCAL_EPOCH}"
+                           for _ in self.cutoff_dates)
+        for cutoff in self.cutoff_dates:
+            params += [f'{cutoff} 23:59:59'] * 2
+        return f"MIN({sla_due}, COALESCE(CASE {cutoffs} END, {NO_CUTOFF_EPOCH}))", params
+
+    def update_due_dates(self, cursor, condition, params=()):
+        """条件に合う申請の期限を現在の設定で計算し直す"""
+        expression, expression_params = self._due_epoch_sql()
+        cursor.execute(f'UPDATE correction_requests SET due_epoch = {expression} WHERE {condition}',
+                       (*expression_params, *params))
+        return cursor.rowcount
+
+    def claim(self, cursor, claimant, count, claimant_name=None):
+        """他の管理者が担当していない承認待ちを期限の近い順に count 件確保し、新たに確保した申請IDを返す
+
+        自分が担当中の申請は件数に含めず、確保時間だけを延長する。
+        担当者はユーザー名 claimant で照合し、表示名 claimant_name は表示用に記録する。
+        判定と更新を1文で行うため、同時に実行しても同じ申請を二重に確保しない。
+        """
+        cursor.execute(f'SELECT {NOW_EPOCH}')
+        now = cursor.fetchone()[0]
+        claimed_until = now + int(self.lease_minutes) * 60
+
+        cursor.execute(f'''
+            SELECT request_id FROM correction_requests INDEXED BY idx_request_queue
+            WHERE status = {PENDING} AND claimed_by = ? AND claimed_until_epoch > ?
+        ''', (claimant, now))
+        held = {row[0] for row in cursor.fetchall()}
+
+        cursor.execute(f'''
+            UPDATE correction_requests
+            SET claimed_by = ?, claimed_by_name = ?, claimed_until_epoch = ?
+            WHERE request_id IN (
+                SELECT request_id FROM correction_requests INDEXED BY idx_request_queue
+                WHERE status = {PENDING}
+                  AND (claimed_until_epoch IS NULL OR claimed_until_epoch <= ?)
+                ORDER BY due_epoch, request_id
+                LIMIT ?
+            )
+        ''', (claimant, claimant_name, claimed_until, now, count))
+
+        cursor.execute(f'''
+            UPDATE correction_requests INDEXED BY idx_request_queue
+            SET claimed_until_epoch = ?
+            WHERE status = {PENDING} AND claimed_by = ? AND claimed_until_epoch > ?
+        ''', (claimed_until, claimant, now))
+
+        cursor.execute(f'''
+            SELECT request_id FROM correction_requests INDEXED BY idx_request_queue
+            WHERE status = {PENDING} AND claimed_by = ? AND claimed_until_epoch = ?
+            ORDER BY due_epoch, request_id
+        ''', (claimant, claimed_until))
+        return [row[0] for row in cursor.fetchall() if row[0] not in held]
+
+    def release(self, cursor, claimant, request_ids=None):
+        """承認待ちのうち自分の担当を解除（request_ids 省略時は全件）し、解除した申請IDを返す"""
+        id_filter = f"AND request_id IN ({','.join('?' * len(request_ids))})" if request_ids else ''
+        cursor.execute(f'''
+            SELECT request_id FROM correction_requests INDEXED BY idx_request_queue
+            WHERE status = {PENDING} AND claimed_by = ? AND claimed_until_epoch > {NOW_EPOCH} {id_filter}
+        ''', (claimant, *(request_ids or ())))
+        released = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f'''
+            UPDATE correction_requests INDEXED BY idx_request_queue
+            SET claimed_by = NULL, claimed_by_name = NULL, claimed_until_epoch = NULL
+            WHERE status = {PENDING} AND claimed_by = ? {id_filter}
+        ''', (claimant, *(request_ids or ())))
+        return released
@@ -1,30 +1,70 @@
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-import ttkbootstrap as tb
-from datetime import datetime
+# 起動プロファイル（--profile-startup）は他のモジュールより先に計測を開始する
+from utils.startup_profile import StartupProfiler, profiling_requested
+startup_profiler = StartupProfiler.install() if profiling_requested() else None
+
 import sqlite3
-import json
-import socket
-import platform
-import os
-from pathlib import Path
 
+import ttkbootstrap as tb
+from tkinter import messagebox
 
 from database.db_manager import DatabaseManager
-from ui.main_window import MainWindow
+from database.maintenance import IdleMaintenanceScheduler
+from database.outbox import SubmissionOutbox, OutboxSyncWorker
 from utils.system_info import SystemInfo
+from utils.settings import load_settings
+from utils.notifier import ChangeNotifier
 from auth.login import LoginDialog
 
+# メイン画面（ui.main_window）とサービスモードの接続（database.remote）は
+# ログイン画面の表示を遅らせないよう、使用する時点で読み込む
+
 class GradeCorrectionApp:
-    def __init__(self):
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        if self.profiler:
+            self.profiler.mark("モジュール読み込み完了")
+        
         self.root = tb.Window(themename="cosmo")
         self.root.title("成績訂正申請システム")
         self.root.geometry("1200x800")
         
 
-        self.db_manager = DatabaseManager()
-        self.db_manager.initialize_database()
+        self.settings = load_settings()
+        
+        # サービスモードのサーバーが設定されていれば共有DBを直接開かない
+        self.remote = bool(self.settings['service']['url'])
+        if self.remote:
+            from database.remote import RemoteDatabaseClient
+            self.db_manager = RemoteDatabaseClient(self.settings['service']['url'])
+        else:
+            self.db_manager = DatabaseManager(self.settings['database_path'],
+                                              self.settings['shard_name'] or None)
+            work_queue = self.settings['work_queue']
+            self.db_manager.configure_work_queue(work_queue['sla_days'], work_queue['cutoff_dates'],
+                                                 work_queue['lease_minutes'])
+            attachments = self.settings['attachments']
+            self.db_manager.configure_attachments(attachments['directory'] or None,
+                                                  attachments['max_file_mb'])
+        
+        # 共有DBに接続できなくても起動し、申請は端末に保存して初期化・送信を再試行する
+        database_ready = True
+        if not self.remote:
+            try:
+                self.db_manager.initialize_database()
+            except sqlite3.OperationalError as e:
+                database_ready = False
+                messagebox.showwarning(
+                    "オフラインで起動",
+                    f"共有データベースに接続できません。\n{e}\n\n"
+                    "申請はこの端末に保存され、接続が回復すると自動的に送信されます。\n"
+                    "ログインできない場合は、しばらくしてから再度お試しください。"
+                )
+        
+        # 未送信申請の再送ワーカー（ログイン前から共有DBの初期化・再送を再試行）
+        self.outbox_worker = OutboxSyncWorker(
+            SubmissionOutbox(self.settings['outbox_path']), self.db_manager, database_ready)
+        self.outbox_worker.start()
         
 
         self.system_info = SystemInfo()
@@ -40,7 +80,9 @@ class GradeCorrectionApp:
     
     def show_login(self):
         """ログインダイアログを表示"""
-        login_dialog = LoginDialog(self.root)
+        login_dialog = LoginDialog(self.root, self.db_manager)
+        if self.profiler:
+            self.root.after_idle(self.profiler.mark, "ログイン画面の表示")
         self.root.wait_window(login_dialog.dialog)
         
         if login_dialog.user_info:
@@ -50,18 +92,105 @@ class GradeCorrectionApp:
     
     def setup_main_window(self):
         """メインウィンドウの設定"""
+        from ui.main_window import MainWindow
+        
+        if not self.remote:
+            self.setup_database_tasks()
+        
+        # 他の端末への変更通知（サービスモードではサーバーが送信）
+        self.notifier = None
+        notifications = self.settings['notifications']
+        if notifications['enabled']:
+            self.notifier = ChangeNotifier(notifications['port'], notifications['channel'],
+                                           notifications['broadcast_address'])
+            try:
+                self.notifier.start()
+            except OSError:
+                self.notifier = None
+            if self.notifier and not self.remote:
+                self.db_manager.notifier = self.notifier
+        
+        # 添付画像のサムネイル（画像処理ライブラリは最初の作成時に読み込む）
+        self.thumbnail_cache = None
+        if not self.remote:
+            from utils.thumbnails import ThumbnailCache
+            attachments = self.settings['attachments']
+            try:
+                self.thumbnail_cache = ThumbnailCache(attachments['thumbnail_cache'],
+                                                      attachments['thumbnail_cache_mb'])
+            except OSError:
+                self.thumbnail_cache = None
+        
         self.main_window = MainWindow(
             self.root, 
             self.db_manager, 
             self.current_user,
-            self.system_info
+            self.system_info,
+            self.outbox_worker,
+            self.notifier,
+            self.thumbnail_cache
         )
+        if self.profiler:
+            self.root.after_idle(self.finish_startup_profile)
+    
+    def finish_startup_profile(self):
+        """メイン画面の表示までの計測結果を書き出す"""
+        self.profiler.mark("メイン画面の表示")
+        self.profiler.write_report()
+    
+    def setup_database_tasks(self):
+        """共有DBを直接開く場合の横断表示・バックアップ・メンテナンス（サービスモードではサーバーが実行）"""
+        # 他校舎のDBは管理者画面でのみ横断表示
+        if self.current_user.get('is_admin'):
+            for shard in self.settings['shards']:
+                self.db_manager.register_shard(shard['name'], shard['path'])
+        
+        # 定期バックアップは管理者の端末でのみ実行
+        backup = self.settings['backup']
+        if self.current_user.get('is_admin') and backup['enabled']:
+            self.db_manager.configure_backup(
+                backup['directory'],
+                keep=backup['keep'],
+                pages_per_step=backup['pages_per_step'],
+                step_sleep=backup['step_sleep_seconds']
+            )
+            self.db_manager.start_backup_scheduler(backup['interval_hours'])
+        
+        # 参照用ローカルコピーも管理者の端末でのみ使用
+        replica = self.settings['replica']
+        if self.current_user.get('is_admin') and replica['enabled']:
+            self.db_manager.configure_replica(
+                replica['path'],
+                max_staleness_seconds=replica['max_staleness_seconds'],
+                refresh_seconds=replica['refresh_seconds']
+            )
+        
+        # アイドル時メンテナンスも管理者の端末でのみ実行
+        maintenance = self.settings['maintenance']
+        if self.current_user.get('is_admin') and maintenance['enabled']:
+            self.maintenance_scheduler = IdleMaintenanceScheduler(
+                self.root, self.db_manager,
+                idle_minutes=maintenance['idle_minutes'],
+                interval_hours=maintenance['interval_hours']
+            )
+            self.maintenance_scheduler.start()
     
     def run(self):
         """アプリケーション実行"""
         self.root.mainloop()
+        if not self.remote:
+            self.db_manager.stop_backup_scheduler()
+            self.db_manager.stop_replica()
+        self.outbox_worker.stop()
+        if getattr(self, 'notifier', None):
+            self.notifier.stop()
+        if getattr(self, 'thumbnail_cache', None):
+            self.thumbnail_cache.shutdown()
 
 if __name__ == "__main__":
-    app = GradeCorrectionApp()
+    # PyInstaller onefile で訂正票出力のプロセスプールを使うために必要
+    import multiprocessing
+    multiprocessing.freeze_support()
+    app = GradeCorrectionApp(startup_profiler)
     app.run()
 
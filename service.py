@@ -0,0 +1,316 @@
+# service.py
+"""成績訂正申請システム - サービスモード
+
+共有DBをこのプロセスだけが開き、各端末のアプリは HTTP/JSON で接続する。
+    python service.py --host 0.0.0.0 --port 8765
+"""
+import argparse
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from database.db_manager import DatabaseManager
+from utils.notifier import ChangeNotifier
+from utils.settings import load_settings
+
+
+class CorrectionService:
+    """HTTPの要求を DatabaseManager の呼び出しに振り分ける
+
+    書き込みはロックで1件ずつ実行し、ログイン後に発行するトークンで
+    利用者と管理者の権限を確認する。
+    """
+
+    PAGE_SIZE = 200
+    MAX_PAGE_SIZE = 1000
+
+    # ログインセッションの有効時間
+    SESSION_SECONDS = 12 * 3600
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.write_lock = threading.Lock()
+
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+        # (HTTPメソッド, パス, 処理, 必要な権限: None / 'user' / 'admin')
+        self.routes = [
+            ('POST', r'/api/login', self.login, None),
+            ('GET', r'/api/requests/pending', self.list_pending, 'admin'),
+            ('GET', r'/api/requests/history', self.list_history, 'user'),
+            ('POST', r'/api/requests', self.submit, 'user'),
+            ('POST', r'/api/requests/conflicts', self.conflicts, 'user'),
+            ('GET', r'/api/requests/(\d+)', self.detail, 'user'),
+            ('POST', r'/api/requests/(\d+)/approve', self.approve, 'admin'),
+            ('POST', r'/api/requests/(\d+)/reject', self.reject, 'admin'),
+            ('POST', r'/api/queue/claim', self.claim, 'admin'),
+            ('POST', r'/api/queue/release', self.release, 'admin'),
+            ('GET', r'/api/students/([^/]+)/summary', self.student_summary, 'admin'),
+            ('GET', r'/api/students/([^/]+)/corrections', self.student_corrections, 'admin'),
+            ('GET', r'/api/slips', self.slips, 'admin'),
+            ('GET', r'/api/statistics/months', self.statistics_months, 'admin'),
+            ('GET', r'/api/statistics/(\d{4}-\d{2})', self.monthly_statistics, 'admin'),
+            ('GET', r'/api/maintenance/history', self.maintenance_history, 'admin'),
+            ('POST', r'/api/backup', self.backup, 'admin'),
+        ]
+
+    def dispatch(self, method, path, headers, body, client_address=None):
+        """(HTTPステータス, 応答JSON) を返す（client_address は接続元のIPアドレス）"""
+        url = urlparse(path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        for route_method, pattern, handler, role in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if route_method != method or not match:
+                continue
+
+            user = self._session_user(headers.get('Authorization', ''))
+            if role and user is None:
+                return 401, {'success': False, 'error': 'ログインが必要です'}
+            if role == 'admin' and not user.get('is_admin'):
+                return 403, {'success': False, 'error': '管理者権限が必要です'}
+            if user is not None:
+                user = dict(user, ip_address=client_address)
+
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                return 400, {'success': False, 'error': 'JSONの形式が正しくありません'}
+
+            try:
+                return 200, handler(*match.groups(), query=query, data=data, user=user)
+            except (KeyError, ValueError) as e:
+                return 400, {'success': False, 'error': f'パラメータが正しくありません: {e}'}
+            except Exception as e:
+                return 500, {'success': False, 'error': str(e)}
+
+        return 404, {'success': False, 'error': f'{method} {url.path} はありません'}
+
+    def _session_user(self, authorization):
+        token = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else None
+        with self._sessions_lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if time.monotonic() > session['expires']:
+                del self._sessions[token]
+                return None
+            return session['user']
+
+    def _page(self, query):
+        limit = min(int(query.get('limit', self.PAGE_SIZE)), self.MAX_PAGE_SIZE)
+        offset = int(query.get('offset', 0))
+        if limit <= 0 or offset < 0:
+            raise ValueError('limit / offset')
+        return limit, offset
+
+    def _rows_payload(self, rows, limit, offset):
+        """行タプルを列名＋値の配列で返す（1件余分に取得して続きの有無を判定）"""
+        return {
+            'columns': list(rows[0]._fields) if rows else [],
+            'rows': [list(row) for row in rows[:limit]],
+            'offset': offset,
+            'has_more': len(rows) > limit
+        }
+
+    # --- 認証 ---
+
+    def login(self, query, data, user):
+        result = self.db_manager.authenticate_user(data['username'], data['password'])
+        if result['success']:
+            token = secrets.token_urlsafe(32)
+            now = time.monotonic()
+            with self._sessions_lock:
+                # 期限切れのセッション（ログアウトせずに終了した端末の分など）を削除
+                for expired in [key for key, session in self._sessions.items()
+                                if now > session['expires']]:
+                    del self._sessions[expired]
+                self._sessions[token] = {
+                    'user': result['user'],
+                    'expires': now + self.SESSION_SECONDS
+                }
+            result['token'] = token
+        return result
+
+    # --- 申請 ---
+
+    def _request_ids(self, query):
+        return [int(i) for i in query['ids'].split(',')] if query.get('ids') else None
+
+    def list_pending(self, query, data, user):
+        limit, offset = self._page(query)
+        rows = self.db_manager.fetch_pending_rows(limit=limit + 1, offset=offset,
+                                                  request_ids=self._request_ids(query),
+                                                  shard=query.get('shard'))
+        return self._rows_payload(rows, limit, offset)
+
+    def list_history(self, query, data, user):
+        limit, offset = self._page(query)
+        rows = self.db_manager.fetch_history_rows(limit=limit + 1, offset=offset,
+                                                  request_ids=self._request_ids(query),
+                                                  shard=query.get('shard'))
+        return self._rows_payload(rows, limit, offset)
+
+    def detail(self, request_id, query, data, user):
+        request = self.db_manager.get_request_detail(int(request_id), query.get('shard'))
+        if request is None:
+            return {'success': False, 'error': f'申請ID {request_id} が見つかりません'}
+        return {'success': True, 'request': request}
+
+    def submit(self, query, data, user):
+        # 記入者はログイン中のアカウント、端末情報は接続元として記録（端末から送られた値は使わない）
+        form_data = dict(data['form_data'], applicant_name=user['name'], applicant_id=user.get('id'))
+        system_info = {'ip_address': user['ip_address'], 'hostname': None, 'os_info': None}
+        with self.write_lock:
+            return self.db_manager.save_correction_request(form_data, system_info)
+
+    def conflicts(self, query, data, user):
+        return {'conflicts': self.db_manager.find_conflicting_requests(data['form_data'])}
+
+    def approve(self, request_id, query, data, user):
+        # 承認者はログイン中のアカウントとして記録
+        with self.write_lock:
+            return self.db_manager.approve_request(
+                int(request_id), user['name'], user.get('id'),
+                expected_version=data.get('expected_version'),
+                shard=data.get('shard')
+            )
+
+    def reject(self, request_id, query, data, user):
+        with self.write_lock:
+            return self.db_manager.reject_request(
+                int(request_id), data['reason'],
+                expected_version=data.get('expected_version'),
+                shard=data.get('shard')
+            )
+
+    def claim(self, query, data, user):
+        # 担当者はログイン中のアカウント（一意なユーザー名）として記録
+        with self.write_lock:
+            return self.db_manager.claim_next_requests(user['username'], int(data['count']), user['name'])
+
+    def release(self, query, data, user):
+        with self.write_lock:
+            return self.db_manager.release_claims(user['username'], data.get('request_ids'),
+                                                  shard=data.get('shard'))
+
+    # --- 検索・統計 ---
+
+    def student_summary(self, student_number, query, data, user):
+        return {'summary': self.db_manager.get_student_summary(student_number)}
+
+    def student_corrections(self, student_number, query, data, user):
+        return {'corrections': self.db_manager.get_student_corrections(student_number)}
+
+    def slips(self, query, data, user):
+        return {'slips': self.db_manager.get_approved_slips(
+            date_from=query.get('date_from'), date_to=query.get('date_to'),
+            request_ids=self._request_ids(query), shard=query.get('shard'))}
+
+    def statistics_months(self, query, data, user):
+        return {'months': self.db_manager.get_statistics_months()}
+
+    def monthly_statistics(self, month, query, data, user):
+        return self.db_manager.get_monthly_statistics(month)
+
+    def maintenance_history(self, query, data, user):
+        limit = min(int(query.get('limit', 20)), self.MAX_PAGE_SIZE)
+        return {'history': self.db_manager.get_maintenance_history(limit=limit)}
+
+    def backup(self, query, data, user):
+        return self.db_manager.backup_now()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSONの送受信のみを行い、処理は CorrectionService に任せる"""
+
+    protocol_version = 'HTTP/1.1'
+
+    # 受け付ける要求本文の上限
+    MAX_BODY_BYTES = 1024 * 1024
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.MAX_BODY_BYTES:
+            status, payload = 413, {'success': False, 'error': '要求が大きすぎます'}
+            self.close_connection = True
+        else:
+            body = self.rfile.read(length).decode('utf-8') if length else ''
+            status, payload = self.server.service.dispatch(self.command, self.path, self.headers, body,
+                                                           self.client_address[0])
+
+        content = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def create_server(db_manager, host='127.0.0.1', port=8765):
+    """サービスを設定したHTTPサーバーを作成（port=0 で空きポート）"""
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = CorrectionService(db_manager)
+    return server
+
+
+def main():
+    settings = load_settings()
+    service_settings = settings['service']
+
+    parser = argparse.ArgumentParser(description='成績訂正申請システム サービスモード')
+    parser.add_argument('--host', default=service_settings['host'])
+    parser.add_argument('--port', type=int, default=service_settings['port'])
+    parser.add_argument('--db', default=settings['database_path'])
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db, settings['shard_name'] or None)
+    work_queue = settings['work_queue']
+    db_manager.configure_work_queue(work_queue['sla_days'], work_queue['cutoff_dates'],
+                                    work_queue['lease_minutes'])
+    db_manager.initialize_database()
+    for shard in settings['shards']:
+        db_manager.register_shard(shard['name'], shard['path'])
+
+    # 変更はサーバーから各端末へ通知
+    notifications = settings['notifications']
+    if notifications['enabled']:
+        db_manager.notifier = ChangeNotifier(notifications['port'], notifications['channel'],
+                                             notifications['broadcast_address'])
+
+    # 端末ではなくサーバーで定期バックアップを実行
+    backup = settings['backup']
+    if backup['enabled']:
+        db_manager.configure_backup(
+            backup['directory'],
+            keep=backup['keep'],
+            pages_per_step=backup['pages_per_step'],
+            step_sleep=backup['step_sleep_seconds']
+        )
+        db_manager.start_backup_scheduler(backup['interval_hours'])
+
+    server = create_server(db_manager, args.host, args.port)
+    print(f"サービスを開始しました: http://{args.host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db_manager.stop_backup_scheduler()
+
+
+if __name__ == '__main__':
+    main()
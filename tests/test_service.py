@@ -0,0 +1,224 @@
+# tests/test_service.py
+"""サービスモード（service.py）と RemoteDatabaseClient の HTTP/JSON のやり取り
+
+一時フォルダのDBで空きポート（port=0）のサーバーを起動し、端末側のクライアントから呼び出す。
+"""
+import threading
+
+import pytest
+
+from database.db_manager import DatabaseManager
+from database.remote import RemoteDatabaseClient, ServiceError
+from service import create_server
+
+PASSWORD = 'password123'
+
+# 端末から送られる端末情報（サーバー側では使わない）
+CLIENT_INFO = {'ip_address': '192.0.2.1', 'hostname': 'client', 'os_info': 'Windows 11'}
+
+
+def attendance_form(student_number='F1234', course_name='数学A', **overrides):
+    form_data = {
+        'applicant_name': '端末で入力した名前',
+        'applicant_id': 'X999',
+        'reason': '出席簿の記入漏れ',
+        'correction_type': 'attendance',
+        'students': [{'number': student_number, 'name': '山田花子'}],
+        'periods': ['前期中間'],
+        'attendance': {'date': '2025-05-01', 'period': '1,2', 'subject': '数学',
+                       'course_name': course_name, 'before_status': '欠席', 'after_status': '出席'},
+    }
+    form_data.update(overrides)
+    return form_data
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / 'service.db'))
+    db_manager.initialize_database()
+    db_manager.configure_backup(str(tmp_path / 'backup'))
+    # 表示名が同じ管理者を2人登録（担当はユーザー名で区別される）
+    db_manager.create_user('sato1', PASSWORD, '佐藤', 'A001', is_admin=True)
+    db_manager.create_user('sato2', PASSWORD, '佐藤', 'A002', is_admin=True)
+    db_manager.create_user('tanaka', PASSWORD, '田中太郎', 'T001')
+    return db_manager
+
+
+@pytest.fixture
+def base_url(db_manager):
+    server = create_server(db_manager, '127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def login(base_url, username):
+    client = RemoteDatabaseClient(base_url)
+    result = client.authenticate_user(username, PASSWORD)
+    assert result['success'], result
+    return client
+
+
+def test_login_requires_valid_credentials(base_url):
+    client = RemoteDatabaseClient(base_url)
+    assert client.authenticate_user('tanaka', 'wrong')['reason'] == 'bad_password'
+    assert client.authenticate_user('nobody', PASSWORD)['reason'] == 'unknown_user'
+    assert client.token is None
+
+    result = client.authenticate_user('tanaka', PASSWORD)
+    assert result['user'] == {'username': 'tanaka', 'name': '田中太郎', 'id': 'T001', 'is_admin': False}
+    assert 'token' not in result
+    assert client.token
+
+
+def test_requests_without_valid_token_are_rejected(base_url):
+    client = RemoteDatabaseClient(base_url)
+    with pytest.raises(ServiceError, match='ログインが必要です'):
+        client.fetch_history_rows()
+
+    client.token = 'invalid-token'
+    with pytest.raises(ServiceError, match='ログインが必要です'):
+        client.fetch_history_rows()
+    assert client.save_correction_request(attendance_form(), CLIENT_INFO)['success'] is False
+
+
+def test_admin_routes_require_admin(base_url):
+    client = login(base_url, 'tanaka')
+    with pytest.raises(ServiceError, match='管理者権限が必要です'):
+        client.fetch_pending_rows(limit=10)
+    assert client.approve_request(1, '田中太郎')['success'] is False
+
+
+def test_unknown_route_and_bad_parameters(base_url):
+    client = login(base_url, 'sato1')
+    with pytest.raises(ServiceError, match='はありません'):
+        client._request('GET', '/api/nope')
+    with pytest.raises(ServiceError, match='パラメータが正しくありません'):
+        client._request('GET', '/api/requests/history', {'limit': 0})
+
+
+def test_submit_records_session_identity(base_url, db_manager):
+    client = login(base_url, 'tanaka')
+    result = client.save_correction_request(attendance_form(), CLIENT_INFO)
+    assert result['success'], result
+
+    detail = client.get_request_detail(result['request_id'])
+    assert detail['applicant_name'] == '田中太郎'
+    assert detail['applicant_id'] == 'T001'
+    assert detail['created_by_ip'] == '127.0.0.1'
+    assert detail['created_by_hostname'] is None
+    assert client.get_request_detail(99999) is None
+
+
+def test_submit_with_same_key_is_not_duplicated(base_url):
+    client = login(base_url, 'tanaka')
+    form_data = attendance_form(client_request_key='form-1')
+    first = client.save_correction_request(form_data, CLIENT_INFO)
+    second = client.save_correction_request(form_data, CLIENT_INFO)
+    assert first == {'success': True, 'request_id': first['request_id']}
+    assert second == {'success': True, 'request_id': first['request_id'], 'duplicate': True}
+    assert len(client.fetch_history_rows()) == 1
+
+
+def test_submit_reports_missing_fields(base_url):
+    client = login(base_url, 'tanaka')
+    form_data = attendance_form()
+    del form_data['reason']
+    result = client.save_correction_request(form_data, CLIENT_INFO)
+    assert result['success'] is False
+    assert not result.get('retryable')
+
+
+def test_conflicts(base_url):
+    client = login(base_url, 'tanaka')
+    client.save_correction_request(attendance_form(), CLIENT_INFO)
+    conflicts = client.find_conflicting_requests(attendance_form())
+    assert [conflict['student_number'] for conflict in conflicts] == ['F1234']
+    assert client.find_conflicting_requests(attendance_form(course_name='英語B')) == []
+
+
+def test_pending_and_history_pagination(base_url, db_manager):
+    for i in range(7):
+        result = db_manager.save_correction_request(attendance_form(f'F{i:04d}'), CLIENT_INFO)
+        assert result['success']
+    client = login(base_url, 'sato1')
+
+    first = client.fetch_pending_rows(limit=3)
+    second = client.fetch_pending_rows(limit=3, offset=3)
+    assert len(first) == len(second) == 3
+    assert {row.request_id for row in first}.isdisjoint(row.request_id for row in second)
+
+    client.PAGE_SIZE = 2
+    assert [row.request_id for row in client.fetch_pending_rows()] == \
+        [row.request_id for row in db_manager.fetch_pending_rows()]
+
+    history = client.fetch_history_rows(limit=5)
+    assert [tuple(row) for row in history] == \
+        [tuple(row) for row in db_manager.fetch_history_rows(limit=5)]
+    assert len(client.fetch_history_rows(limit=5, offset=5)) == 2
+    assert [row.request_id for row in client.fetch_history_rows(request_ids=[3])] == [3]
+
+
+def test_claim_and_release_use_username(base_url, db_manager):
+    for i in range(4):
+        db_manager.save_correction_request(attendance_form(f'F{i:04d}'), CLIENT_INFO)
+    first, second = login(base_url, 'sato1'), login(base_url, 'sato2')
+
+    claimed = first.claim_next_requests('佐藤', 2)['claimed']
+    assert claimed == [('', 1), ('', 2)]
+    assert second.claim_next_requests('佐藤', 2)['claimed'] == [('', 3), ('', 4)]
+    assert first.claim_next_requests('佐藤', 2)['claimed'] == []
+
+    # 同じ表示名の別の管理者の担当は解除できない
+    assert second.release_claims('佐藤', request_ids=[1, 2])['released'] == []
+    rows = {row.request_id: row for row in first.fetch_pending_rows()}
+    assert (rows[1].claimed_by, rows[1].claimed_name) == ('sato1', '佐藤')
+    assert rows[3].claimed_by == 'sato2'
+
+    assert first.release_claims('佐藤')['released'] == [1, 2]
+
+
+def test_approve_reject_and_versions(base_url, db_manager):
+    for i in range(2):
+        db_manager.save_correction_request(attendance_form(f'F{i:04d}'), CLIENT_INFO)
+    client = login(base_url, 'sato1')
+    first, second = client.fetch_pending_rows()
+
+    assert client.approve_request(first.request_id, '表示名は使われない',
+                                  expected_version=first.version)['success']
+    assert client.reject_request(first.request_id, '重複',
+                                 expected_version=first.version)['success'] is False
+    assert client.reject_request(second.request_id, '重複',
+                                 expected_version=second.version)['success']
+
+    approved = client.get_request_detail(first.request_id)
+    assert approved['status'] == 'approved'
+    assert (approved['approver_name'], approved['approver_id']) == ('佐藤', 'A001')
+    assert client.get_request_detail(second.request_id)['status'] == 'rejected'
+    assert client.fetch_pending_rows() == []
+
+
+def test_student_search_statistics_and_slips(base_url, db_manager):
+    request_id = db_manager.save_correction_request(attendance_form(), CLIENT_INFO)['request_id']
+    client = login(base_url, 'sato1')
+    client.approve_request(request_id, '佐藤')
+
+    assert client.get_student_summary('F1234')['total_count'] == 1
+    assert len(client.get_student_corrections('F1234')) == 1
+
+    months = client.get_statistics_months()
+    assert months
+    assert client.get_monthly_statistics(months[0])['total_requests'] == 1
+
+    slips = client.get_approved_slips(request_ids=[request_id])
+    assert [slip['request_id'] for slip in slips] == [request_id]
+    assert isinstance(client.get_maintenance_history(), list)
+
+
+def test_backup(base_url, tmp_path):
+    client = login(base_url, 'sato1')
+    result = client.backup_now()
+    assert result['success'], result
+    assert (tmp_path / 'backup').exists()
@@ -0,0 +1,291 @@
+# ui/attachments.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import itertools
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添付ファイルの選択で表示する種類
+FILE_TYPES = [
+    ("画像・PDF", "*.jpg *.jpeg *.png *.gif *.bmp *.tif *.tiff *.pdf"),
+    ("すべてのファイル", "*.*"),
+]
+
+STATE_LABELS = {'saving': '保存中…', 'saved': '', 'error': '失敗'}
+
+
+def format_size(size_bytes):
+    if size_bytes >= 1024 * 1024:
+        return f'{size_bytes / (1024 * 1024):.1f}MB'
+    return f'{max(1, size_bytes // 1024)}KB'
+
+
+class AttachmentField:
+    """申請フォームの添付ファイル欄
+
+    ファイルを選ぶと保存先へのコピー（内容のハッシュ計算を含む）をワーカースレッドで行い、
+    一覧には保存中・失敗などの状態を表示する。送信時は保存済みのファイルの参照だけを渡すため、
+    申請の保存（共有DBへの書き込み）は添付の件数・大きさによらず短時間で終わる。
+    画面を閉じると保存待ちのファイルは取り消し、ワーカーを終了する。
+    """
+
+    # 保存結果の確認間隔（ミリ秒）
+    POLL_INTERVAL_MS = 100
+
+    # 1件の申請に添付できるファイル数
+    MAX_FILES = 20
+
+    def __init__(self, parent, root, db_manager):
+        self.root = root
+        self.db_manager = db_manager
+        self.frame = ttk.Frame(parent)
+
+        list_frame = ttk.Frame(self.frame)
+        list_frame.pack(fill=tk.X, pady=(0, 3))
+
+        scrollbar = ttk.Scrollbar(list_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(list_frame, height=4, font=('Arial', 9),
+                                  selectmode=tk.EXTENDED, yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+
+        button_frame = ttk.Frame(self.frame)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="追加...", command=self.add_files,
+                   width=8).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="削除", command=self.remove_selected,
+                   width=8).pack(side=tk.LEFT)
+
+        # 一覧の順に {'token', 'path', 'state', 'reference', 'error'}
+        self.items = []
+        self.tokens = itertools.count()
+        self.updates = queue.Queue()
+        self.executor = None
+        self.polling = False
+        self.frame.bind('<Destroy>', self.shutdown)
+
+    def add_files(self):
+        paths = filedialog.askopenfilenames(title="添付するファイルを選択", filetypes=FILE_TYPES)
+        if not paths:
+            return
+
+        available = self.MAX_FILES - len(self.items)
+        if len(paths) > available:
+            messagebox.showwarning("添付ファイル",
+                                   f"添付できるのは {self.MAX_FILES} 件までです。"
+                                   f"先頭の {max(available, 0)} 件のみ追加します。")
+            paths = paths[:max(available, 0)]
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='attachment')
+        for path in paths:
+            item = {'token': next(self.tokens), 'path': path, 'state': 'saving',
+                    'reference': None, 'error': None}
+            self.items.append(item)
+            self.executor.submit(self.store, item['token'], path)
+        self.refresh()
+
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def store(self, token, path):
+        """保存先へコピー（ワーカースレッドで実行）"""
+        try:
+            self.updates.put((token, self.db_manager.attachments.store(path), None))
+        except (OSError, ValueError) as e:
+            self.updates.put((token, None, str(e)))
+
+    def poll(self):
+        if not self.frame.winfo_exists():
+            return
+
+        try:
+            while True:
+                token, reference, error = self.updates.get_nowait()
+                for item in self.items:
+                    if item['token'] == token:
+                        item['state'] = 'error' if error else 'saved'
+                        item['reference'] = reference
+                        item['error'] = error
+                self.refresh()
+        except queue.Empty:
+            pass
+
+        if any(item['state'] == 'saving' for item in self.items):
+            self.root.after(self.POLL_INTERVAL_MS, self.poll)
+        else:
+            self.polling = False
+
+    def refresh(self):
+        self.listbox.delete(0, tk.END)
+        for item in self.items:
+            text = os.path.basename(item['path'])
+            if item['reference']:
+                text += f"（{format_size(item['reference']['size_bytes'])}）"
+            label = STATE_LABELS[item['state']]
+            if label:
+                text += f"  {label}"
+            self.listbox.insert(tk.END, text)
+            if item['state'] == 'error':
+                self.listbox.itemconfig(tk.END, foreground='red')
+
+    def remove_selected(self):
+        # 保存中のものは結果を受け取っても一覧に戻さない（保存先のファイルは参照されないまま残る）
+        selected = set(self.listbox.curselection())
+        self.items = [item for index, item in enumerate(self.items) if index not in selected]
+        self.refresh()
+
+    def clear(self):
+        self.items = []
+        self.refresh()
+
+    def validate(self):
+        """入力チェック（エラーメッセージの一覧を返す）"""
+        errors = []
+        if any(item['state'] == 'saving' for item in self.items):
+            errors.append("添付ファイルの保存が終わるまでお待ちください")
+        for item in self.items:
+            if item['state'] == 'error':
+                errors.append(f"添付ファイルを保存できません: {item['error']}")
+        return errors
+
+    def shutdown(self, event=None):
+        if event is not None and event.widget is not self.frame:
+            return
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def get_attachments(self):
+        """保存済みの添付ファイルの参照（同じ内容のファイルは1件にまとめる）"""
+        references = {}
+        for item in self.items:
+            if item['reference']:
+                references.setdefault(item['reference']['sha256'], item['reference'])
+        return list(references.values())
+
+
+class ThumbnailStrip:
+    """申請詳細の添付ファイル（サムネイルを横に並べて表示）
+
+    サムネイルは表示範囲に入ったものだけを ThumbnailCache に依頼し、完了したものから表示する。
+    画面を閉じると作成待ちの依頼は取り消す。ダブルクリックで元のファイルを開く。
+    """
+
+    POLL_INTERVAL_MS = 100
+
+    # 1件の表示幅・高さ（サムネイルとファイル名）
+    CELL_WIDTH = 180
+    CELL_HEIGHT = 200
+
+    def __init__(self, parent, root, attachments, thumbnail_cache=None):
+        self.root = root
+        self.attachments = attachments
+        self.thumbnail_cache = thumbnail_cache
+
+        self.frame = ttk.LabelFrame(parent, text=f"添付ファイル（{len(attachments)}件）", padding=5)
+
+        self.canvas = tk.Canvas(self.frame, height=self.CELL_HEIGHT, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.canvas.configure(xscrollcommand=lambda first, last: (scrollbar.set(first, last),
+                                                                  self.request_visible()))
+        self.canvas.pack(fill=tk.X)
+        scrollbar.pack(fill=tk.X)
+
+        self.image_labels = []
+        for index, attachment in enumerate(attachments):
+            cell = ttk.Frame(self.canvas, width=self.CELL_WIDTH - 10, height=self.CELL_HEIGHT)
+            cell.pack_propagate(False)
+            image_label = ttk.Label(cell, anchor=tk.CENTER,
+                                    text="読み込み中…" if thumbnail_cache else "プレビューなし")
+            image_label.pack(fill=tk.BOTH, expand=True)
+            name_label = ttk.Label(cell, text=f"{attachment['file_name']}\n"
+                                              f"{format_size(attachment['size_bytes'])}",
+                                   font=('Arial', 8), anchor=tk.CENTER, justify=tk.CENTER,
+                                   wraplength=self.CELL_WIDTH - 10)
+            name_label.pack(fill=tk.X)
+            for widget in (cell, image_label, name_label):
+                widget.bind('<Double-Button-1>', lambda e, a=attachment: self.open_attachment(a))
+            self.canvas.create_window(index * self.CELL_WIDTH, 0, window=cell, anchor=tk.NW)
+            self.image_labels.append(image_label)
+        self.canvas.configure(scrollregion=(0, 0, len(attachments) * self.CELL_WIDTH, self.CELL_HEIGHT))
+        self.canvas.bind('<Configure>', lambda e: self.request_visible())
+
+        # 添付の位置 → Future（依頼済みのもの）と、表示中の画像（参照を保持しないと消える）
+        self.futures = {}
+        self.images = []
+        self.errors = queue.Queue()
+        self.frame.bind('<Destroy>', self.cancel)
+        self.root.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def request_visible(self):
+        """表示範囲（前後1件を含む）のサムネイルを依頼"""
+        if self.thumbnail_cache is None:
+            return
+        left = self.canvas.canvasx(0)
+        first = max(0, int(left // self.CELL_WIDTH) - 1)
+        last = min(len(self.attachments) - 1,
+                   int((left + self.canvas.winfo_width()) // self.CELL_WIDTH) + 1)
+        for index in range(first, last + 1):
+            if index not in self.futures:
+                attachment = self.attachments[index]
+                self.futures[index] = self.thumbnail_cache.request(attachment['sha256'],
+                                                                   attachment['path'])
+
+    def poll(self):
+        if not self.frame.winfo_exists():
+            return
+
+        for index, future in list(self.futures.items()):
+            if future is None or not future.done():
+                continue
+            self.futures[index] = None
+            label = self.image_labels[index]
+            try:
+                image = tk.PhotoImage(file=future.result())
+            except Exception:
+                # 画像以外（PDFなど）や読めないファイルは拡張子のみ表示
+                extension = os.path.splitext(self.attachments[index]['file_name'])[1].upper()
+                label.config(text=extension.lstrip('.') or "プレビューなし")
+                continue
+            self.images.append(image)
+            label.config(image=image, text="")
+
+        try:
+            while True:
+                messagebox.showerror("エラー", self.errors.get_nowait(), parent=self.frame)
+        except queue.Empty:
+            pass
+
+        self.root.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def cancel(self, event=None):
+        if event is not None and event.widget is not self.frame:
+            return
+        for future in self.futures.values():
+            if future is not None:
+                future.cancel()
+
+    def open_attachment(self, attachment):
+        """元のファイル名で一時フォルダにコピーして、既定のアプリで開く（コピーはワーカースレッド）"""
+        def run():
+            try:
+                directory = tempfile.mkdtemp(prefix='grade_correction_')
+                path = os.path.join(directory, os.path.basename(attachment['file_name']))
+                shutil.copyfile(attachment['path'], path)
+                if hasattr(os, 'startfile'):
+                    os.startfile(path)
+                else:
+                    webbrowser.open(Path(path).as_uri())
+            except OSError as e:
+                self.errors.put(f"添付ファイルを開けません: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
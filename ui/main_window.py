@@ -1,19 +1,63 @@
 # ui/main_window.py - 完全版（レイアウト調整・最大化起動）
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import ttkbootstrap as tb
-from ttkbootstrap.constants import *
+from tkinter import ttk, messagebox, simpledialog, filedialog
 from ttkbootstrap.widgets import DateEntry
 from datetime import datetime
 import json
+import queue
 import re
+import threading
+import uuid
+
+from database.dates import parse_date
+from database.enums import STATUS_LABELS, CORRECTION_TYPE_LABELS as TYPE_LABELS
+from database.rows import HISTORY_VALUES
+from ui.attachments import AttachmentField, ThumbnailStrip
+from ui.student_grid import StudentGrid, STUDENT_NUMBER_PATTERN
 
 class MainWindow:
-    def __init__(self, root, db_manager, current_user, system_info):
+    # 未送信件数表示の更新間隔（ミリ秒）
+    OUTBOX_POLL_MS = 2000
+    
+    # 参照データの古さ表示の更新間隔（ミリ秒）
+    DATA_AGE_POLL_MS = 5000
+    
+    # 変更通知の確認間隔（ミリ秒、受信キューのみ参照）
+    NOTIFY_POLL_MS = 500
+    
+    # 履歴一覧の表示件数
+    HISTORY_LIMIT = 200
+    
+    # 承認待ち一覧の表示件数（期限の近い順の先頭）と、一度に担当する件数
+    QUEUE_LIMIT = 200
+    CLAIM_COUNT = 10
+    
+    def __init__(self, root, db_manager, current_user, system_info, outbox_worker=None,
+                 notifier=None, thumbnail_cache=None):
         self.root = root
         self.db_manager = db_manager
         self.current_user = current_user
         self.system_info = system_info
+        self.outbox_worker = outbox_worker
+        self.notifier = notifier
+        self.thumbnail_cache = thumbnail_cache
+        
+        # 添付ファイル欄（サービスモードでは添付の保存先を扱わないため表示しない）
+        self.attachment_field = None
+        
+        # 送信ごとの申請キー（同じ内容の再送信・ダブルクリックを1件にまとめる）
+        self.form_key = uuid.uuid4().hex
+        self.form_key_payload = None
+        
+        # 一覧の行ID → 校舎名（他校舎のDBを横断表示する場合の書き込み先）
+        self.row_shards = {}
+        
+        # 承認待ち一覧の行ID → (期限, 申請ID)（通知で追加する行の挿入位置の判定用）
+        self.pending_keys = {}
+        
+        self.data_age_var = tk.StringVar()
+        if self.db_manager.replica:
+            self.update_data_age()
         
         # ウィンドウを最大化して起動
         self.root.state('zoomed')  # Windows
@@ -34,6 +78,10 @@ class MainWindow:
             self.setup_admin_ui()
         else:
             self.setup_user_ui()
+        
+        # 他の端末の変更は通知を受けたときだけ一覧に反映
+        if self.notifier:
+            self.poll_change_notifications()
     
     def setup_styles(self):
         """カスタムスタイルの設定"""
@@ -77,8 +125,23 @@ class MainWindow:
         # 左側のコンテンツ（入力フォーム）
         self.setup_left_panel(left_frame)
         
-        # 右側のコンテンツ（管理者用の承認機能付き一覧）
-        self.setup_admin_right_panel(right_frame)
+        # 右側のコンテンツ（一覧タブと統計タブ）
+        notebook = ttk.Notebook(right_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        
+        list_tab = ttk.Frame(notebook)
+        dashboard_tab = ttk.Frame(notebook)
+        notebook.add(list_tab, text="申請一覧")
+        notebook.add(dashboard_tab, text="統計")
+        
+        # 管理者用の承認機能付き一覧
+        self.setup_admin_right_panel(list_tab)
+        
+        # 統計ダッシュボード（タブ表示時に読み込み）
+        self.setup_dashboard_panel(dashboard_tab)
+        notebook.bind('<<NotebookTabChanged>>',
+                      lambda e: self.refresh_dashboard()
+                      if notebook.select() == str(dashboard_tab) else None)
     
     def setup_ui(self):
         """通常ユーザー用UI設定"""
@@ -140,6 +203,10 @@ class MainWindow:
         # セクション5: 対象期間
         self.setup_period_section(scrollable_frame)
         
+        # セクション6: 添付ファイル
+        if hasattr(self.db_manager, 'attachments'):
+            self.setup_attachment_section(scrollable_frame)
+        
         # ボタングループ
         self.setup_buttons(scrollable_frame)
         
@@ -222,62 +289,9 @@ class MainWindow:
         self.setup_multiple_students_table()
     
     def setup_multiple_students_table(self):
-        """複数生徒入力テーブル"""
-        # ヘッダー
-        header_frame = ttk.Frame(self.multiple_frame)
-        header_frame.pack(fill=tk.X, pady=(5, 3))
-        
-        ttk.Label(header_frame, text="No.", width=4, font=('Arial', 8, 'bold')).pack(side=tk.LEFT, padx=3)
-        ttk.Label(header_frame, text="組番号", width=8, font=('Arial', 8, 'bold')).pack(side=tk.LEFT, padx=3)
-        ttk.Label(header_frame, text="氏名", width=12, font=('Arial', 8, 'bold')).pack(side=tk.LEFT, padx=3)
-        ttk.Label(header_frame, text="操作", width=6, font=('Arial', 8, 'bold')).pack(side=tk.LEFT, padx=3)
-        
-        # 生徒入力行を格納するフレーム
-        self.students_container = ttk.Frame(self.multiple_frame)
-        self.students_container.pack(fill=tk.BOTH, expand=True)
-        
-        # 追加ボタン
-        add_button = ttk.Button(self.multiple_frame, text="+ 追加",
-                               command=self.add_student_row)
-        add_button.pack(pady=5)
-        
-        self.student_entries = []
-        self.add_student_row()  # 初期行を1つ追加
-    
-    def add_student_row(self):
-        """生徒入力行を追加"""
-        row_frame = ttk.Frame(self.students_container)
-        row_frame.pack(fill=tk.X, pady=1)
-        
-        row_num = len(self.student_entries) + 1
-        
-        ttk.Label(row_frame, text=str(row_num), width=4, font=('Arial', 8)).pack(side=tk.LEFT, padx=3)
-        
-        number_var = tk.StringVar()
-        ttk.Entry(row_frame, textvariable=number_var, width=8, font=('Arial', 8)).pack(side=tk.LEFT, padx=3)
-        
-        name_var = tk.StringVar()
-        ttk.Entry(row_frame, textvariable=name_var, width=12, font=('Arial', 8)).pack(side=tk.LEFT, padx=3)
-        
-        def remove_this_row():
-            if len(self.student_entries) > 1:
-                row_frame.destroy()
-                self.student_entries.remove((number_var, name_var))
-                self.update_row_numbers()
-            else:
-                messagebox.showwarning("警告", "最低1名は必要です")
-        
-        ttk.Button(row_frame, text="削除", command=remove_this_row, width=6).pack(side=tk.LEFT, padx=3)
-        
-        self.student_entries.append((number_var, name_var))
-    
-    def update_row_numbers(self):
-        """行番号を更新"""
-        for i, child in enumerate(self.students_container.winfo_children()):
-            if child.winfo_class() == 'Frame':
-                label = child.winfo_children()[0]
-                if label.winfo_class() == 'Label':
-                    label.config(text=str(i + 1))
+        """複数生徒入力テーブル（Excelからの貼り付けに対応した一覧表）"""
+        self.student_grid = StudentGrid(self.multiple_frame)
+        self.student_grid.pack(fill=tk.BOTH, expand=True)
     
     def setup_correction_type_section(self, parent):
         """訂正種別セクション"""
@@ -518,6 +532,15 @@ class MainWindow:
                     cb = ttk.Checkbutton(row_frame, text=periods[idx], variable=var)
                     cb.pack(side=tk.LEFT, padx=(0, 10))
     
+    def setup_attachment_section(self, parent):
+        """添付ファイルセクション"""
+        frame = ttk.LabelFrame(parent, text="6. 添付ファイル（出席簿の写真・答案のスキャンなど）", 
+                              style='Section.TLabelframe', padding=10)
+        frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.attachment_field = AttachmentField(frame, self.root, self.db_manager)
+        self.attachment_field.frame.pack(fill=tk.X)
+    
     def setup_buttons(self, parent):
         """ボタングループ"""
         button_frame = ttk.Frame(parent)
@@ -527,13 +550,39 @@ class MainWindow:
                   command=self.show_preview,
                   style='primary.TButton', width=10).pack(side=tk.LEFT, padx=(0, 5))
         
-        ttk.Button(button_frame, text="申請実行", 
-                  command=self.submit_request,
-                  style='success.TButton', width=10).pack(side=tk.LEFT, padx=(0, 5))
+        self.submit_button = ttk.Button(button_frame, text="申請実行", 
+                                        command=self.submit_request,
+                                        style='success.TButton', width=10)
+        self.submit_button.pack(side=tk.LEFT, padx=(0, 5))
         
         ttk.Button(button_frame, text="クリア", 
                   command=self.clear_form,
                   style='warning.TButton', width=10).pack(side=tk.LEFT)
+        
+        # 未送信キューの状態
+        self.outbox_status_var = tk.StringVar()
+        self.outbox_status_label = ttk.Label(parent, textvariable=self.outbox_status_var,
+                                             font=('Arial', 9), foreground='gray')
+        self.outbox_status_label.pack(anchor=tk.W, padx=10)
+        if self.outbox_worker:
+            self.update_outbox_status()
+    
+    def update_outbox_status(self):
+        """未送信キューの件数を表示（ワーカーが保持する件数のみ参照）"""
+        pending = self.outbox_worker.pending_count
+        failed = self.outbox_worker.failed_count
+        
+        if pending or failed:
+            text = f"未送信の申請: {pending}件（接続回復後に自動送信）"
+            if failed:
+                text += f"　送信不可: {failed}件"
+            self.outbox_status_var.set(text)
+            self.outbox_status_label.config(foreground='red')
+        else:
+            self.outbox_status_var.set("未送信の申請はありません")
+            self.outbox_status_label.config(foreground='gray')
+        
+        self.root.after(self.OUTBOX_POLL_MS, self.update_outbox_status)
     
     def setup_right_panel(self, parent):
         """右側パネル - 履歴一覧表示（70%幅）"""
@@ -619,7 +668,7 @@ class MainWindow:
         title_label.pack(pady=(5, 8))
         
         # 上部：承認待ち一覧
-        pending_frame = ttk.LabelFrame(parent, text="承認待ち申請", padding=5)
+        pending_frame = ttk.LabelFrame(parent, text="承認待ち申請（期限の近い順）", padding=5)
         pending_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 5))
         
         # 承認ボタンエリア
@@ -633,7 +682,13 @@ class MainWindow:
                   command=self.reject_selected,
                   style='danger.TButton').pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(approve_button_frame, text="詳細表示", 
-                  command=self.show_pending_detail).pack(side=tk.LEFT)
+                  command=self.show_pending_detail).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Button(approve_button_frame, text=f"次の{self.CLAIM_COUNT}件を担当",
+                  command=self.claim_next_requests).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(approve_button_frame, text="担当を解除",
+                  command=self.release_claims).pack(side=tk.LEFT)
+        ttk.Button(approve_button_frame, text="訂正票出力",
+                  command=self.export_slips).pack(side=tk.RIGHT)
         
         # 承認待ちリスト
         pending_list_frame = ttk.Frame(pending_frame)
@@ -642,7 +697,8 @@ class MainWindow:
         scrollbar = ttk.Scrollbar(pending_list_frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        columns = ('申請日', '記入者', '組番号', '氏名', '種別', '変更内容', '理由')
+        # 他校舎のDBを登録している場合は校舎列を追加
+        columns = self.shard_columns() + ('期限', '担当', '申請日', '記入者', '組番号', '氏名', '種別', '変更内容', '理由')
         
         self.pending_tree = ttk.Treeview(pending_list_frame, columns=columns,
                                         show='tree headings', height=10,
@@ -652,14 +708,25 @@ class MainWindow:
         for col in columns:
             self.pending_tree.heading(col, text=col)
         
-        widths = {'#0': 40, '申請日': 100, '記入者': 80, '組番号': 70, 
+        widths = {'#0': 40, '期限': 85, '担当': 70, '申請日': 100, '記入者': 80, '組番号': 70, 
                  '氏名': 90, '種別': 50, '変更内容': 120, '理由': 200}
+        if self.db_manager.shards:
+            widths['校舎'] = 70
         for col, width in widths.items():
             self.pending_tree.column(col, width=width)
         
+        # 期限切れは赤字、自分の担当は背景色で表示
+        self.pending_tree.tag_configure('overdue', foreground='red')
+        self.pending_tree.tag_configure('mine', background='#e0f0ff')
+        
         self.pending_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.pending_tree.yview)
         
+        # 接続できなかった校舎の表示
+        self.shard_status_var = tk.StringVar()
+        ttk.Label(pending_frame, textvariable=self.shard_status_var,
+                  font=('Arial', 9), foreground='red').pack(anchor=tk.W)
+        
         # 下部：全履歴一覧
         history_frame = ttk.LabelFrame(parent, text="全申請履歴", padding=5)
         history_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=(5, 8))
@@ -676,6 +743,20 @@ class MainWindow:
         ttk.Button(filter_frame, text="更新", 
                   command=self.refresh_all_lists, width=6).pack(side=tk.LEFT)
         
+        # 生徒別表示
+        ttk.Label(filter_frame, text="組番号:", font=('Arial', 9)).pack(side=tk.LEFT, padx=(15, 5))
+        self.student_lookup_var = tk.StringVar()
+        lookup_entry = ttk.Entry(filter_frame, textvariable=self.student_lookup_var,
+                                 font=('Arial', 9), width=8)
+        lookup_entry.pack(side=tk.LEFT, padx=(0, 5))
+        lookup_entry.bind('<Return>', lambda e: self.show_student_timeline())
+        ttk.Button(filter_frame, text="生徒別表示",
+                  command=self.show_student_timeline).pack(side=tk.LEFT)
+        
+        # 参照データの古さ（ローカルコピー使用時）
+        ttk.Label(filter_frame, textvariable=self.data_age_var,
+                 font=('Arial', 9), foreground='gray').pack(side=tk.RIGHT)
+        
         # 全履歴リスト
         history_list_frame = ttk.Frame(history_frame)
         history_list_frame.pack(fill=tk.BOTH, expand=True)
@@ -683,15 +764,24 @@ class MainWindow:
         scrollbar2 = ttk.Scrollbar(history_list_frame)
         scrollbar2.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.history_tree = ttk.Treeview(history_list_frame, columns=columns,
+        # 列は insert_history_row が書き込む値の順（承認待ちの期限・担当の列は含めない）
+        history_columns = self.shard_columns() + ('申請日', '時刻', '記入者', '組番号', '氏名', '種別',
+                                                  '科目', '講座名', '時限', '変更内容', '理由', '状態', '承認者')
+        
+        self.history_tree = ttk.Treeview(history_list_frame, columns=history_columns,
                                         show='tree headings',
                                         yscrollcommand=scrollbar2.set)
         
         self.history_tree.heading('#0', text='ID')
-        for col in columns:
+        for col in history_columns:
             self.history_tree.heading(col, text=col)
         
-        for col, width in widths.items():
+        history_widths = {'#0': 40, '申請日': 80, '時刻': 60, '記入者': 80, '組番号': 70, '氏名': 90,
+                          '種別': 50, '科目': 60, '講座名': 120, '時限': 50, '変更内容': 120,
+                          '理由': 150, '状態': 60, '承認者': 80}
+        if self.db_manager.shards:
+            history_widths['校舎'] = 70
+        for col, width in history_widths.items():
             self.history_tree.column(col, width=width)
         
         self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -702,152 +792,494 @@ class MainWindow:
         # 初期データ読み込み
         self.refresh_all_lists()
     
+    def setup_dashboard_panel(self, parent):
+        """統計ダッシュボード（集計カウンタのみ参照）"""
+        title_label = ttk.Label(parent, text="月次統計", style='Title.TLabel')
+        title_label.pack(pady=(5, 8))
+        
+        # 対象月選択
+        month_frame = ttk.Frame(parent)
+        month_frame.pack(fill=tk.X, padx=8, pady=(0, 8))
+        
+        ttk.Label(month_frame, text="対象月:", font=('Arial', 9)).pack(side=tk.LEFT, padx=(0, 5))
+        self.dashboard_month_var = tk.StringVar(value=datetime.now().strftime('%Y-%m'))
+        self.dashboard_month_combo = ttk.Combobox(month_frame, textvariable=self.dashboard_month_var,
+                                                  font=('Arial', 9), width=10, state="readonly")
+        self.dashboard_month_combo.pack(side=tk.LEFT, padx=(0, 8))
+        self.dashboard_month_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh_dashboard())
+        
+        ttk.Button(month_frame, text="更新",
+                  command=self.refresh_dashboard, width=6).pack(side=tk.LEFT)
+        ttk.Label(month_frame, textvariable=self.data_age_var,
+                 font=('Arial', 9), foreground='gray').pack(side=tk.RIGHT)
+        
+        # 概要
+        summary_frame = ttk.LabelFrame(parent, text="概要", padding=10)
+        summary_frame.pack(fill=tk.X, padx=8, pady=5)
+        
+        self.dashboard_summary_var = tk.StringVar()
+        ttk.Label(summary_frame, textvariable=self.dashboard_summary_var,
+                 font=('Arial', 10), justify=tk.LEFT).pack(anchor=tk.W)
+        
+        # 種別ごとの件数
+        type_frame = ttk.LabelFrame(parent, text="種別ごとの申請件数", padding=5)
+        type_frame.pack(fill=tk.X, padx=8, pady=5)
+        
+        type_columns = ('種別', '合計', '処理中', '承認済', '差戻し')
+        self.dashboard_type_tree = ttk.Treeview(type_frame, columns=type_columns,
+                                                show='headings', height=3)
+        for col in type_columns:
+            self.dashboard_type_tree.heading(col, text=col)
+            self.dashboard_type_tree.column(col, width=90)
+        self.dashboard_type_tree.pack(fill=tk.X)
+        
+        # 講座別件数
+        course_frame = ttk.LabelFrame(parent, text="申請の多い講座", padding=5)
+        course_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=(5, 8))
+        
+        course_columns = ('順位', '講座名', '件数')
+        self.dashboard_course_tree = ttk.Treeview(course_frame, columns=course_columns,
+                                                  show='headings', height=10)
+        for col in course_columns:
+            self.dashboard_course_tree.heading(col, text=col)
+        self.dashboard_course_tree.column('順位', width=50)
+        self.dashboard_course_tree.column('講座名', width=200)
+        self.dashboard_course_tree.column('件数', width=80)
+        self.dashboard_course_tree.pack(fill=tk.BOTH, expand=True)
+        
+        # データベース管理
+        db_frame = ttk.LabelFrame(parent, text="データベース管理", padding=10)
+        db_frame.pack(fill=tk.X, padx=8, pady=(0, 8))
+        
+        ttk.Button(db_frame, text="今すぐバックアップ",
+                  command=self.run_backup).pack(side=tk.LEFT, padx=(0, 10))
+        self.backup_status_var = tk.StringVar()
+        ttk.Label(db_frame, textvariable=self.backup_status_var,
+                 font=('Arial', 9)).pack(side=tk.LEFT)
+        
+        self.maintenance_status_var = tk.StringVar()
+        ttk.Label(db_frame, textvariable=self.maintenance_status_var,
+                 font=('Arial', 9), foreground='gray').pack(side=tk.RIGHT)
+    
+    def run_backup(self):
+        """オンラインバックアップをバックグラウンドで実行"""
+        self.backup_status_var.set("バックアップ中...")
+        results = queue.Queue()
+        
+        threading.Thread(target=lambda: results.put(self.db_manager.backup_now()),
+                         daemon=True).start()
+        
+        def poll():
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                self.root.after(200, poll)
+                return
+            
+            if result['success']:
+                self.backup_status_var.set(
+                    f"最終バックアップ: {result['finished_at']}（{result['size'] // 1024} KB）")
+            else:
+                self.backup_status_var.set("バックアップ失敗")
+                messagebox.showerror("エラー", f"バックアップに失敗しました: {result['error']}")
+        
+        self.root.after(200, poll)
+    
+    def refresh_dashboard(self):
+        """統計ダッシュボードを更新"""
+        months = self.db_manager.get_statistics_months()
+        current_month = datetime.now().strftime('%Y-%m')
+        if current_month not in months:
+            months.insert(0, current_month)
+        self.dashboard_month_combo['values'] = months
+        
+        stats = self.db_manager.get_monthly_statistics(self.dashboard_month_var.get())
+        
+        approval_rate = f"{stats['approval_rate'] * 100:.1f}%" if stats['approval_rate'] is not None else '-'
+        turnaround = f"{stats['average_turnaround_days']:.1f}日" if stats['average_turnaround_days'] is not None else '-'
+        self.dashboard_summary_var.set(
+            f"申請件数: {stats['total_requests']}件\n"
+            f"承認: {stats['approved_count']}件　却下: {stats['rejected_count']}件　"
+            f"承認率: {approval_rate}\n"
+            f"平均処理日数（申請→承認）: {turnaround}"
+        )
+        
+        for item in self.dashboard_type_tree.get_children():
+            self.dashboard_type_tree.delete(item)
+        for correction_type, counts in sorted(stats['by_type'].items()):
+            self.dashboard_type_tree.insert('', 'end', values=(
+                TYPE_LABELS.get(correction_type, correction_type),
+                counts['total'],
+                counts.get('pending', 0),
+                counts.get('approved', 0),
+                counts.get('rejected', 0)
+            ))
+        
+        for item in self.dashboard_course_tree.get_children():
+            self.dashboard_course_tree.delete(item)
+        for rank, (course_name, count) in enumerate(stats['top_courses'], start=1):
+            self.dashboard_course_tree.insert('', 'end', values=(rank, course_name, count))
+        
+        # 最終メンテナンス
+        history = self.db_manager.get_maintenance_history(limit=4)
+        if history:
+            total_ms = sum(h['duration_ms'] or 0 for h in history)
+            self.maintenance_status_var.set(
+                f"最終メンテナンス: {history[0]['started_at']}（{total_ms} ms）")
+        else:
+            self.maintenance_status_var.set("メンテナンス未実行")
+    
     def approve_selected(self):
         """選択された申請を承認"""
-        selection = self.pending_tree.selection()
-        if not selection:
+        selected = self.selected_request(self.pending_tree)
+        if not selected:
             messagebox.showwarning("選択エラー", "承認する申請を選択してください")
             return
         
-        item = self.pending_tree.item(selection[0])
-        request_id = item['text']
+        request_id, shard = selected
         
         if messagebox.askyesno("確認", f"申請ID {request_id} を承認しますか？"):
-            cursor = self.db_manager.connect()
+            result = self.db_manager.approve_request(
+                request_id,
+                self.current_user['name'],
+                self.current_user.get('id'),
+                expected_version=self.pending_versions.get((shard, str(request_id))),
+                shard=shard
+            )
             
-            try:
-                cursor.execute('''
-                    UPDATE correction_requests 
-                    SET status = 'approved',
-                        approved_date = CURRENT_TIMESTAMP,
-                        approver_name = ?,
-                        approver_id = ?
-                    WHERE request_id = ?
-                ''', (
-                    self.current_user['name'],
-                    self.current_user.get('id'),
-                    request_id
-                ))
-                
-                self.db_manager.connection.commit()
+            if result['success']:
                 messagebox.showinfo("成功", "申請を承認しました")
                 self.refresh_all_lists()
-                
-            except Exception as e:
-                self.db_manager.connection.rollback()
-                messagebox.showerror("エラー", f"承認処理に失敗しました: {str(e)}")
-            
-            finally:
-                self.db_manager.close()
+            elif result.get('conflict'):
+                self.show_status_conflict(result)
+            else:
+                messagebox.showerror("エラー", f"承認処理に失敗しました: {result['error']}")
     
     def reject_selected(self):
         """選択された申請を却下"""
-        selection = self.pending_tree.selection()
-        if not selection:
+        selected = self.selected_request(self.pending_tree)
+        if not selected:
             messagebox.showwarning("選択エラー", "却下する申請を選択してください")
             return
         
-        item = self.pending_tree.item(selection[0])
-        request_id = item['text']
+        request_id, shard = selected
         
         # 却下理由入力ダイアログ
         reason = simpledialog.askstring("却下理由", "却下理由を入力してください:")
         
         if reason:
-            cursor = self.db_manager.connect()
+            result = self.db_manager.reject_request(
+                request_id, reason,
+                expected_version=self.pending_versions.get((shard, str(request_id))),
+                shard=shard
+            )
             
-            try:
-                cursor.execute('''
-                    UPDATE correction_requests 
-                    SET status = 'rejected',
-                        rejection_reason = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE request_id = ?
-                ''', (reason, request_id))
-                
-                self.db_manager.connection.commit()
+            if result['success']:
                 messagebox.showinfo("成功", "申請を却下しました")
                 self.refresh_all_lists()
-                
-            except Exception as e:
-                self.db_manager.connection.rollback()
-                messagebox.showerror("エラー", f"却下処理に失敗しました: {str(e)}")
-            
-            finally:
-                self.db_manager.close()
+            elif result.get('conflict'):
+                self.show_status_conflict(result)
+            else:
+                messagebox.showerror("エラー", f"却下処理に失敗しました: {result['error']}")
+    
+    def claim_next_requests(self):
+        """担当者のいない承認待ちを期限の近い順に担当し、一覧で選択"""
+        result = self.db_manager.claim_next_requests(self.current_user['username'], self.CLAIM_COUNT,
+                                                     self.current_user['name'])
+        if not result['success']:
+            messagebox.showerror("エラー", f"担当の設定に失敗しました: {result['error']}")
+            return
+        if not result['claimed']:
+            messagebox.showinfo("担当", "担当できる承認待ち申請はありません")
+            return
+        
+        self.refresh_pending_list()
+        claimed = {(shard or '', str(request_id)) for shard, request_id in result['claimed']}
+        items = [item for item in self.pending_tree.get_children()
+                 if (self.row_shards.get(item) or '', str(self.pending_tree.item(item)['text'])) in claimed]
+        self.pending_tree.selection_set(items)
+        if items:
+            self.pending_tree.see(items[0])
+    
+    def release_claims(self):
+        """自分の担当をすべて解除"""
+        errors = []
+        for shard in [None, *self.db_manager.shards]:
+            result = self.db_manager.release_claims(self.current_user['username'], shard=shard)
+            if not result['success']:
+                errors.append(result['error'])
+        
+        if errors:
+            messagebox.showerror("エラー", f"担当の解除に失敗しました: {'、'.join(errors)}")
+        self.refresh_pending_list()
+    
+    def update_data_age(self):
+        """履歴・統計の表示データがいつ時点のものかを表示"""
+        age = self.db_manager.data_age_seconds()
+        if age is None:
+            self.data_age_var.set("表示データ: 最新（共有DB）")
+        elif age < 60:
+            self.data_age_var.set(f"表示データ: {int(age)}秒前の時点")
+        else:
+            self.data_age_var.set(f"表示データ: {int(age // 60)}分前の時点")
+        
+        self.root.after(self.DATA_AGE_POLL_MS, self.update_data_age)
+    
+    def shard_columns(self):
+        """他校舎のDBを登録している場合のみ表示する列"""
+        return ('校舎',) if self.db_manager.shards else ()
+    
+    def shard_values(self, row):
+        return (row.shard,) if self.db_manager.shards else ()
+    
+    def selected_request(self, tree):
+        """選択行の (申請ID, 校舎名) を取得（未選択なら None）"""
+        selection = tree.selection()
+        if not selection:
+            return None
+        return tree.item(selection[0])['text'], self.row_shards.get(selection[0])
+    
+    def show_status_conflict(self, result):
+        """他の管理者との競合を通知し、一覧を最新の状態にする"""
+        messagebox.showwarning(
+            "更新の競合",
+            f"{result['error']}。\n一覧を最新の状態に更新します。"
+        )
+        self.refresh_all_lists()
+    
+    def export_slips(self):
+        """承認済み訂正の訂正票を一括出力（全申請履歴の選択分、未選択なら承認日の範囲）"""
+        # 選択分は校舎ごとにまとめて取得
+        selected = {}
+        for item in self.history_tree.selection():
+            selected.setdefault(self.row_shards.get(item), []).append(self.history_tree.item(item)['text'])
+        
+        if selected:
+            slips = []
+            for shard, request_ids in selected.items():
+                slips.extend(self.db_manager.get_approved_slips(request_ids=request_ids, shard=shard))
+        else:
+            today = datetime.now()
+            date_from = simpledialog.askstring("訂正票出力", "承認日（開始, YYYY-MM-DD）:",
+                                               initialvalue=today.strftime('%Y-%m-01'))
+            if not date_from:
+                return
+            date_to = simpledialog.askstring("訂正票出力", "承認日（終了, YYYY-MM-DD）:",
+                                             initialvalue=today.strftime('%Y-%m-%d'))
+            if not date_to:
+                return
+            slips = self.db_manager.get_approved_slips(date_from=date_from, date_to=date_to)
+        
+        if not slips:
+            messagebox.showinfo("訂正票出力", "出力対象の承認済み申請がありません")
+            return
+        
+        output_dir = filedialog.askdirectory(title="訂正票の出力先フォルダを選択")
+        if not output_dir:
+            return
+        
+        # 訂正票の出力処理（プロセスプール・画像処理）は初回の出力時に読み込む
+        from ui.slip_export import SlipExportDialog
+        SlipExportDialog(self.root, slips, output_dir).start()
     
     def show_pending_detail(self):
         """承認待ち申請の詳細表示"""
-        selection = self.pending_tree.selection()
-        if not selection:
+        selected = self.selected_request(self.pending_tree)
+        if not selected:
             messagebox.showwarning("選択エラー", "表示する申請を選択してください")
             return
         
-        item = self.pending_tree.item(selection[0])
-        request_id = item['text']
-        self.show_request_detail(request_id)
+        self.show_request_detail(*selected)
+    
+    def show_student_timeline(self, student_number=None):
+        """生徒別の訂正一覧を表示"""
+        student_number = (student_number or self.student_lookup_var.get()).strip()
+        if not student_number:
+            messagebox.showwarning("入力エラー", "組番号を入力してください")
+            return
+        
+        summary = self.db_manager.get_student_summary(student_number)
+        if not summary:
+            messagebox.showinfo("生徒別表示", f"組番号 {student_number} の訂正申請はありません")
+            return
+        
+        timeline_window = tk.Toplevel(self.root)
+        timeline_window.title(f"生徒別訂正一覧 - {student_number} {summary['student_name'] or ''}")
+        timeline_window.geometry("900x500")
+        
+        # 集計（生徒別集計テーブルから取得）
+        summary_frame = ttk.LabelFrame(timeline_window, text="集計", padding=8)
+        summary_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        
+        summary_text = (
+            f"合計: {summary['total_count']}件　"
+            f"出欠: {summary['attendance_count']}件　"
+            f"成績: {summary['grade_count']}件　／　"
+            f"処理中: {summary['pending_count']}件　"
+            f"承認済: {summary['approved_count']}件　"
+            f"差戻し: {summary['rejected_count']}件"
+        )
+        ttk.Label(summary_frame, text=summary_text, font=('Arial', 10)).pack(anchor=tk.W)
+        
+        # 訂正一覧
+        list_frame = ttk.Frame(timeline_window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        scrollbar = ttk.Scrollbar(list_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = self.shard_columns() + ('申請日', '種別', '講座名', '日付', '時限', '変更内容', '状態', '記入者', '承認者')
+        timeline_tree = ttk.Treeview(list_frame, columns=columns,
+                                     show='tree headings',
+                                     yscrollcommand=scrollbar.set)
+        
+        timeline_tree.heading('#0', text='ID')
+        for col in columns:
+            timeline_tree.heading(col, text=col)
+        
+        widths = {'#0': 40, '申請日': 90, '種別': 50, '講座名': 120, '日付': 90,
+                 '時限': 60, '変更内容': 140, '状態': 60, '記入者': 80, '承認者': 80}
+        if self.db_manager.shards:
+            widths['校舎'] = 70
+        for col, width in widths.items():
+            timeline_tree.column(col, width=width)
+        
+        timeline_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=timeline_tree.yview)
+        
+        timeline_shards = {}
+        for row in self.db_manager.get_student_corrections(student_number):
+            item = timeline_tree.insert('', 'end',
+                                 text=row['request_id'],
+                                 values=((row['shard'],) if self.db_manager.shards else ()) + (
+                                     (row['request_date'] or '')[:10],
+                                     TYPE_LABELS.get(row['correction_type'], ''),
+                                     row['course_name'] or '',
+                                     row['attendance_date'] or '',
+                                     f"{row['period_number']}限" if row['period_number'] else '',
+                                     row['change_detail'] or '',
+                                     STATUS_LABELS.get(row['status'], ''),
+                                     row['applicant_name'] or '',
+                                     row['approver_name'] or ''
+                                 ))
+            timeline_shards[item] = row['shard']
+        
+        def show_selected_detail(event):
+            selection = timeline_tree.selection()
+            if selection:
+                self.show_request_detail(timeline_tree.item(selection[0])['text'],
+                                         timeline_shards[selection[0]])
+        
+        timeline_tree.bind('<Double-Button-1>', show_selected_detail)
+        
+        ttk.Button(timeline_window, text="閉じる",
+                  command=timeline_window.destroy).pack(pady=8)
     
     def refresh_all_lists(self):
         """管理者用：全リストを更新"""
-        # 承認待ちリストを更新
+        self.refresh_pending_list()
+        
+        # 全履歴リストも更新
+        self.refresh_history()
+        
+        if self.db_manager.last_shard_errors:
+            self.shard_status_var.set(
+                "接続できない校舎があります: " + "、".join(self.db_manager.last_shard_errors))
+        else:
+            self.shard_status_var.set("")
+    
+    def refresh_pending_list(self):
+        """承認待ち一覧を期限の近い順の先頭 QUEUE_LIMIT 件で更新"""
         for item in self.pending_tree.get_children():
             self.pending_tree.delete(item)
+            self.row_shards.pop(item, None)
+        self.pending_keys = {}
         
-        cursor = self.db_manager.connect()
-        
-        # 承認待ち申請を取得
-        cursor.execute('''
-            SELECT 
-                r.request_id,
-                r.request_date,
-                r.applicant_name,
-                t.student_number,
-                t.student_name,
-                r.correction_type,
-                r.reason,
-                CASE 
-                    WHEN r.correction_type = 'attendance' THEN
-                        (SELECT a.before_status || '→' || a.after_status
-                         FROM attendance_corrections a
-                         WHERE a.target_id = t.target_id LIMIT 1)
-                    ELSE
-                        (SELECT 
-                            CASE 
-                                WHEN g.before_evaluation IS NOT NULL THEN
-                                    '評価:' || g.before_evaluation || '→' || g.after_evaluation
-                                ELSE
-                                    '観点:' || g.before_observation || '→' || g.after_observation
-                            END
-                         FROM grade_corrections g
-                         WHERE g.target_id = t.target_id LIMIT 1)
-                END as change_detail
-            FROM correction_requests r
-            LEFT JOIN correction_targets t ON r.request_id = t.request_id
-            WHERE r.status = 'pending'
-            ORDER BY r.request_date DESC
-        ''')
-        
-        for row in cursor.fetchall():
-            type_map = {'attendance': '出欠', 'grade': '成績'}
-            date_str = row['request_date'][:10] if row['request_date'] else ''
-            reason_short = row['reason'][:30] + '...' if len(row['reason'] or '') > 30 else row['reason']
+        # 承認待ち申請を取得（承認・却下時の競合検出用に取得時のバージョンを保持）
+        self.pending_versions = {}
+        for row in self.db_manager.fetch_pending_rows(limit=self.QUEUE_LIMIT):
+            self.insert_pending_row(row, 'end')
+    
+    def insert_pending_row(self, row, index=None):
+        """承認待ち一覧に1行追加（index 省略時は期限の順の位置）"""
+        key = (row.due_at, row.request_id)
+        if index is None:
+            index = 'end'
+            for position, item in enumerate(self.pending_tree.get_children()):
+                if self.pending_keys.get(item, key) > key:
+                    index = position
+                    break
+        
+        tags = []
+        if row.overdue:
+            tags.append('overdue')
+        if row.claimed_by and row.claimed_by == self.current_user['username']:
+            tags.append('mine')
+        
+        self.pending_versions[(row.shard, str(row.request_id))] = row.version
+        item = self.pending_tree.insert('', index, 
+                                text=row.request_id,
+                                tags=tags,
+                                values=self.shard_values(row) + (
+                                    row.due_str,
+                                    row.claimed_name,
+                                    row.date_str,
+                                    row.applicant_name,
+                                    row.student_number,
+                                    row.student_name,
+                                    TYPE_LABELS.get(row.correction_type, ''),
+                                    row.change_detail,
+                                    row.reason_short
+                                ))
+        self.row_shards[item] = row.shard
+        self.pending_keys[item] = key
+    
+    def poll_change_notifications(self):
+        """他の端末からの変更通知を確認（DBには問い合わせない）"""
+        messages = self.notifier.drain()
+        if messages:
+            self.apply_changes(messages)
+        self.root.after(self.NOTIFY_POLL_MS, self.poll_change_notifications)
+    
+    def apply_changes(self, messages):
+        """通知された申請だけを一覧に差分反映（担当の変更は承認待ち一覧のみ）"""
+        changed = {}
+        claimed = {}
+        for message in messages:
+            if not isinstance(message.get('request_id'), int):
+                continue
+            if message.get('event') in ('created', 'approved', 'rejected'):
+                changed.setdefault(message.get('shard') or '', set()).add(message['request_id'])
+            elif message.get('event') == 'claimed':
+                claimed.setdefault(message.get('shard') or '', set()).add(message['request_id'])
+        
+        targets = [(self.history_tree, changed)]
+        if hasattr(self, 'pending_tree'):
+            pending = {shard: changed.get(shard, set()) | claimed.get(shard, set())
+                       for shard in {*changed, *claimed}}
+            targets.append((self.pending_tree, pending))
+        
+        # 変更された申請の行を取り除いてから最新の行を追加（履歴は先頭、承認待ちは期限の順の位置）
+        for tree, changes in targets:
+            keys = {(shard, str(request_id)) for shard, ids in changes.items() for request_id in ids}
+            if not keys:
+                continue
+            for item in tree.get_children():
+                if (self.row_shards.get(item) or '', str(tree.item(item)['text'])) in keys:
+                    tree.delete(item)
+                    self.row_shards.pop(item, None)
+                    self.pending_keys.pop(item, None)
             
-            self.pending_tree.insert('', 'end', 
-                                    text=row['request_id'],
-                                    values=(
-                                        date_str,
-                                        row['applicant_name'] or '',
-                                        row['student_number'] or '',
-                                        row['student_name'] or '',
-                                        type_map.get(row['correction_type'], ''),
-                                        row['change_detail'] or '',
-                                        reason_short or ''
-                                    ))
-        
-        self.db_manager.close()
-        
-        # 全履歴リストも更新
-        self.refresh_history()
+            for shard, request_ids in changes.items():
+                request_ids = sorted(request_ids)
+                if tree is self.history_tree:
+                    for row in reversed(self.db_manager.fetch_history_rows(limit=self.HISTORY_LIMIT,
+                                                                           request_ids=request_ids,
+                                                                           shard=shard)):
+                        self.insert_history_row(row, 0)
+                else:
+                    for row in self.db_manager.fetch_pending_rows(request_ids=request_ids, shard=shard):
+                        self.insert_pending_row(row)
     
     def toggle_target_type(self):
         """対象者タイプの切り替え"""
@@ -904,10 +1336,10 @@ class MainWindow:
         if self.target_type_var.get() == "individual":
             content += f"対象者: {self.student_number_var.get()} {self.student_name_var.get()}\n\n"
         else:
-            content += "対象者（複数）:\n"
-            for num, name in self.student_entries:
-                if num.get() and name.get():
-                    content += f"  {num.get()} {name.get()}\n"
+            students = self.student_grid.get_students()
+            content += f"対象者（複数・{len(students)}名）:\n"
+            for student in students:
+                content += f"  {student['number']} {student['name']}\n"
             content += "\n"
         
         content += f"訂正種別: {'出欠関連' if self.correction_type_var.get() == 'attendance' else '成績のみ'}\n\n"
@@ -949,6 +1381,11 @@ class MainWindow:
             if var.get():
                 content += f"  ✓ {period}\n"
         
+        if self.attachment_field and self.attachment_field.items:
+            content += "\n添付ファイル:\n"
+            for line in self.attachment_field.listbox.get(0, tk.END):
+                content += f"  {line}\n"
+        
         return content
     
     def submit_from_preview(self, preview_window):
@@ -962,6 +1399,7 @@ class MainWindow:
             self.reason_text.delete(1.0, tk.END)
             self.student_number_var.set("")
             self.student_name_var.set("")
+            self.student_grid.clear()
             self.attendance_date.entry.delete(0, tk.END)
             self.attendance_date.entry.insert(0, datetime.now().strftime('%Y-%m-%d'))
             self.subject_var.set("")
@@ -974,32 +1412,117 @@ class MainWindow:
             for var in self.period_checkboxes.values():
                 var.set(False)
             
+            if self.attachment_field:
+                self.attachment_field.clear()
+            
             self.target_type_var.set("individual")
             self.correction_type_var.set("attendance")
             
             self.toggle_target_type()
             self.toggle_correction_type()
+            self.reset_form_key()
+    
+    def reset_form_key(self):
+        """新しい申請キーを発行"""
+        self.form_key = uuid.uuid4().hex
+        self.form_key_payload = None
+    
+    def assign_form_key(self, form_data):
+        """申請キーを付与（前回送信時から内容が変わっていれば新しいキーにする）"""
+        payload = json.dumps(form_data, sort_keys=True, ensure_ascii=False)
+        if self.form_key_payload is not None and payload != self.form_key_payload:
+            self.reset_form_key()
+        self.form_key_payload = payload
+        form_data['client_request_key'] = self.form_key
     
     def submit_request(self):
-        """申請送信"""
+        """申請送信（重複確認と保存はワーカースレッドで行い、画面は共有DBの応答を待たない）"""
+        if str(self.submit_button['state']) == tk.DISABLED:
+            # 送信中（プレビューからの二重送信を防ぐ）
+            return
         if not self.validate_form():
             return
         
         form_data = self.collect_form_data()
+        self.assign_form_key(form_data)
         system_info = self.system_info.get_info()
+        self.run_submission(form_data, system_info, check_conflicts=True)
+    
+    def run_submission(self, form_data, system_info, check_conflicts):
+        """重複確認・保存をバックグラウンドで実行し、結果を画面のスレッドで処理"""
+        self.submit_button.config(state=tk.DISABLED, text="送信中...")
+        results = queue.Queue()
+        
+        def work():
+            if check_conflicts:
+                try:
+                    conflicts = self.db_manager.find_conflicting_requests(form_data)
+                except Exception:
+                    # 共有DBに接続できない場合は確認を省略（送信時に一時保存される）
+                    conflicts = []
+                if conflicts:
+                    results.put(('conflicts', conflicts))
+                    return
+            results.put(('saved', self.db_manager.save_correction_request(form_data, system_info)))
+        
+        threading.Thread(target=work, daemon=True).start()
+        
+        def poll():
+            try:
+                kind, value = results.get_nowait()
+            except queue.Empty:
+                self.root.after(100, poll)
+                return
+            
+            self.submit_button.config(state=tk.NORMAL, text="申請実行")
+            if kind == 'conflicts':
+                if self.confirm_conflicts(value):
+                    self.run_submission(form_data, system_info, check_conflicts=False)
+            else:
+                self.finish_submission(form_data, system_info, value)
         
-        result = self.db_manager.save_correction_request(form_data, system_info)
-        
-        if result['success']:
+        self.root.after(100, poll)
+    
+    def finish_submission(self, form_data, system_info, result):
+        """保存結果の表示（共有DBが使えない場合は端末に一時保存）"""
+        if result.get('duplicate'):
+            messagebox.showinfo("送信済み", f"この申請は既に送信されています。\n申請ID: {result['request_id']}")
+        elif result['success']:
             messagebox.showinfo("成功", f"申請を送信しました。\n申請ID: {result['request_id']}")
             self.clear_form()
             if hasattr(self, 'refresh_all_lists'):
                 self.refresh_all_lists()
             else:
                 self.refresh_history()
+        elif result.get('retryable') and self.outbox_worker:
+            # 共有DBが使えない場合は端末に保存して後で自動送信
+            self.outbox_worker.submit(form_data, system_info)
+            messagebox.showinfo("一時保存",
+                                "共有データベースに接続できないため、申請をこの端末に保存しました。\n"
+                                "接続が回復すると自動的に送信されます。")
+            self.clear_form()
         else:
             messagebox.showerror("エラー", f"申請の送信に失敗しました。\n{result['error']}")
     
+    def confirm_conflicts(self, conflicts):
+        """重複申請を表示し、続行するか確認"""
+        lines = [
+            f"申請ID {c['request_id']}（{STATUS_LABELS.get(c['status'], c['status'])}）: "
+            f"{c['student_number']} {c['student_name']} {c['period_number']}限 "
+            f"{c['before_status']}→{c['after_status']}（記入者: {c['applicant_name']}）"
+            for c in conflicts[:10]
+        ]
+        if len(conflicts) > 10:
+            lines.append(f"ほか {len(conflicts) - 10} 件")
+        
+        return messagebox.askyesno(
+            "重複申請の確認",
+            "同じ生徒・日付・時限・講座の申請が既にあります。\n\n"
+            + "\n".join(lines)
+            + "\n\nこのまま申請しますか？",
+            icon='warning'
+        )
+    
     def validate_form(self):
         """フォームバリデーション"""
         errors = []
@@ -1013,14 +1536,25 @@ class MainWindow:
         if self.target_type_var.get() == "individual":
             if not self.student_number_var.get():
                 errors.append("組番号を入力してください")
-            elif not re.match(r'^[A-Za-z][0-9]{4}$', self.student_number_var.get()):
+            elif not re.match(STUDENT_NUMBER_PATTERN, self.student_number_var.get()):
                 errors.append("組番号は「アルファベット1文字+4桁数字」の形式で入力してください（例: F1234）")
             if not self.student_name_var.get():
                 errors.append("氏名を入力してください")
+        else:
+            errors.extend(self.student_grid.validate())
         
         if not any(var.get() for var in self.period_vars.values()):
             errors.append("対象期間を選択してください")
         
+        if self.correction_type_var.get() == "attendance":
+            try:
+                parse_date(self.attendance_date.entry.get())
+            except ValueError as e:
+                errors.append(str(e))
+        
+        if self.attachment_field:
+            errors.extend(self.attachment_field.validate())
+        
         if errors:
             messagebox.showerror("入力エラー", "\n".join(errors))
             return False
@@ -1044,11 +1578,7 @@ class MainWindow:
                 'name': self.student_name_var.get()
             }]
         else:
-            form_data['students'] = [
-                {'number': num.get(), 'name': name.get()}
-                for num, name in self.student_entries
-                if num.get() and name.get()
-            ]
+            form_data['students'] = self.student_grid.get_students()
         
         if self.correction_type_var.get() == "attendance":
             selected_periods = []
@@ -1082,6 +1612,9 @@ class MainWindow:
                 form_data['grade']['before_observation'] = ''.join([v.get() for v in self.before_obs_vars])
                 form_data['grade']['after_observation'] = ''.join([v.get() for v in self.after_obs_vars])
         
+        if self.attachment_field:
+            form_data['attachments'] = self.attachment_field.get_attachments()
+        
         return form_data
     
     def get_correction_items(self):
@@ -1099,97 +1632,40 @@ class MainWindow:
         """履歴リストを更新"""
         for item in self.history_tree.get_children():
             self.history_tree.delete(item)
+            self.row_shards.pop(item, None)
         
-        cursor = self.db_manager.connect()
-        
-        cursor.execute('''
-            SELECT 
-                r.request_id,
-                r.request_date,
-                r.applicant_name,
-                t.student_number,
-                t.student_name,
-                r.correction_type,
-                r.status,
-                r.approver_name,
-                r.reason,
-                CASE 
-                    WHEN r.correction_type = 'attendance' THEN a.subject
-                    ELSE ''
-                END as subject,
-                CASE 
-                    WHEN r.correction_type = 'attendance' THEN a.course_name
-                    ELSE g.course_name
-                END as course_name,
-                CASE 
-                    WHEN r.correction_type = 'attendance' THEN a.period_number
-                    ELSE ''
-                END as period,
-                CASE 
-                    WHEN r.correction_type = 'attendance' THEN
-                        a.before_status || '→' || a.after_status
-                    ELSE
-                        CASE 
-                            WHEN g.before_evaluation IS NOT NULL THEN
-                                '評価:' || g.before_evaluation || '→' || g.after_evaluation
-                            ELSE
-                                '観点:' || g.before_observation || '→' || g.after_observation
-                        END
-                END as change_detail
-            FROM correction_requests r
-            LEFT JOIN correction_targets t ON r.request_id = t.request_id
-            LEFT JOIN attendance_corrections a ON t.target_id = a.target_id
-            LEFT JOIN grade_corrections g ON t.target_id = g.target_id
-            ORDER BY r.request_date DESC
-            LIMIT 200
-        ''')
-        
-        for row in cursor.fetchall():
-            status_map = {'pending': '処理中', 'approved': '承認済', 'rejected': '差戻し'}
-            type_map = {'attendance': '出欠', 'grade': '成績'}
-            
-            if row['request_date']:
-                date_parts = row['request_date'].split(' ')
-                date_str = date_parts[0] if len(date_parts) > 0 else ''
-                time_str = date_parts[1][:5] if len(date_parts) > 1 else ''
-            else:
-                date_str = ''
-                time_str = ''
-            
-            reason_short = row['reason'][:30] + '...' if len(row['reason'] or '') > 30 else row['reason']
-            
-            self.history_tree.insert('', 'end', 
-                                    text=row['request_id'],
-                                    values=(
-                                        date_str,
-                                        time_str,
-                                        row['applicant_name'] or '',
-                                        row['student_number'] or '',
-                                        row['student_name'] or '',
-                                        type_map.get(row['correction_type'], ''),
-                                        row['subject'] or '',
-                                        row['course_name'] or '',
-                                        row['period'] + '限' if row['period'] else '',
-                                        row['change_detail'] or '',
-                                        reason_short or '',
-                                        status_map.get(row['status'], ''),
-                                        row['approver_name'] or ''
-                                    ))
-        
-        self.db_manager.close()
+        for row in self.db_manager.fetch_history_rows(limit=self.HISTORY_LIMIT):
+            self.insert_history_row(row)
+    
+    def insert_history_row(self, row, index='end'):
+        """履歴一覧に1行追加（表示用の列は行の末尾にSQLで整形済み）"""
+        item = self.history_tree.insert('', index, 
+                                text=row.request_id,
+                                values=self.shard_values(row) + row[HISTORY_VALUES])
+        self.row_shards[item] = row.shard
     
-    def show_request_detail(self, request_id):
+    def show_request_detail(self, request_id, shard=None):
         """申請詳細を表示"""
         detail_window = tk.Toplevel(self.root)
         detail_window.title(f"申請詳細 - ID: {request_id}")
         detail_window.geometry("800x600")
         
-        detail_text = tk.Text(detail_window, wrap=tk.WORD, font=('Arial', 10))
+        detail_text = tk.Text(detail_window, wrap=tk.WORD, font=('Arial', 10), height=15)
         detail_text.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
         
-        cursor = self.db_manager.connect()
-        cursor.execute('SELECT * FROM correction_requests WHERE request_id = ?', (request_id,))
-        request = cursor.fetchone()
+        request = self.db_manager.get_request_detail(request_id, shard)
+        
+        # 添付ファイルは参照の一覧だけを読み、サムネイルは表示範囲に入ったものから作成
+        attachments = []
+        if request and hasattr(self.db_manager, 'get_attachments'):
+            try:
+                attachments = self.db_manager.get_attachments(request_id, shard)
+            except Exception:
+                attachments = []
+        if attachments:
+            detail_window.geometry("800x720")
+            strip = ThumbnailStrip(detail_window, self.root, attachments, self.thumbnail_cache)
+            strip.frame.pack(fill=tk.X, padx=15)
         
         if request:
             details = f"""
@@ -1209,17 +1685,11 @@ class MainWindow:
             detail_text.insert(1.0, details)
             detail_text.config(state=tk.DISABLED)
         
-        self.db_manager.close()
-        
         ttk.Button(detail_window, text="閉じる", 
                   command=detail_window.destroy).pack(pady=8)
     
     def show_history_detail(self, event):
         """履歴の詳細を表示"""
-        selection = self.history_tree.selection()
-        if not selection:
-            return
-        
-        item = self.history_tree.item(selection[0])
-        request_id = item['text']
-        self.show_request_detail(request_id)
\ No newline at end of file
+        selected = self.selected_request(self.history_tree)
+        if selected:
+            self.show_request_detail(*selected)
\ No newline at end of file
@@ -0,0 +1,75 @@
+# ui/slip_export.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+import queue
+import threading
+
+from utils.slip_renderer import SlipRenderer
+
+
+class SlipExportDialog:
+    """訂正票の出力と進捗表示
+
+    描画はプロセスプールで実行し、進捗はキュー経由で受け取る。
+    プロセスプールと画像処理の読み込みを起動時に行わないよう、
+    MainWindow からは訂正票の出力時に初めて読み込む。
+    """
+
+    # 進捗の確認間隔（ミリ秒）
+    POLL_INTERVAL_MS = 100
+
+    def __init__(self, root, slips, output_dir):
+        self.root = root
+        self.slips = slips
+        self.output_dir = output_dir
+
+        self.window = tk.Toplevel(root)
+        self.window.title("訂正票出力")
+        self.window.geometry("400x130")
+        self.window.transient(root)
+
+        self.progress_label = ttk.Label(self.window, text=f"0 / {len(slips)} 枚")
+        self.progress_label.pack(pady=(15, 5))
+        self.progress_bar = ttk.Progressbar(self.window, maximum=len(slips), length=340)
+        self.progress_bar.pack(pady=5)
+
+        self.cancel_event = threading.Event()
+        ttk.Button(self.window, text="中止", command=self.cancel_event.set).pack(pady=5)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel_event.set)
+
+        self.updates = queue.Queue()
+
+    def start(self):
+        threading.Thread(target=self.render, daemon=True).start()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def render(self):
+        try:
+            renderer = SlipRenderer(self.output_dir)
+            written = renderer.render(
+                self.slips,
+                progress_callback=lambda done, total: self.updates.put(('progress', done)),
+                cancel_event=self.cancel_event
+            )
+            self.updates.put(('done', len(written)))
+        except Exception as e:
+            self.updates.put(('error', str(e)))
+
+    def poll(self):
+        try:
+            while True:
+                kind, value = self.updates.get_nowait()
+                if kind == 'progress':
+                    self.progress_bar['value'] = value
+                    self.progress_label.config(text=f"{value} / {len(self.slips)} 枚")
+                elif kind == 'done':
+                    self.window.destroy()
+                    messagebox.showinfo("訂正票出力", f"{value} 枚の訂正票を出力しました。\n{self.output_dir}")
+                    return
+                else:
+                    self.window.destroy()
+                    messagebox.showerror("エラー", f"訂正票の出力に失敗しました: {value}")
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_INTERVAL_MS, self.poll)
@@ -0,0 +1,311 @@
+# ui/student_grid.py
+import tkinter as tk
+from tkinter import ttk
+import re
+import unicodedata
+
+# 組番号の形式（アルファベット1文字+4桁数字）
+STUDENT_NUMBER_PATTERN = r'^[A-Za-z][0-9]{4}$'
+
+
+class StudentGrid:
+    """複数生徒の入力表（1つの Treeview で全行を表示）
+
+    行ごとに入力欄を作らず、セルの編集は1つの Entry を対象セルの上に重ねて行う。
+    Excel からコピーしたタブ区切りの「組番号・氏名」を貼り付けでき、
+    入力チェックは全行を1回の走査でまとめて行う。
+    """
+
+    COLUMNS = ('number', 'name', 'check')
+    EDITABLE_COLUMNS = ('number', 'name')
+
+    # 表示する行数（それ以上はスクロール）
+    VISIBLE_ROWS = 8
+
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+
+        list_frame = ttk.Frame(self.frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 3))
+
+        scrollbar = ttk.Scrollbar(list_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(list_frame, columns=self.COLUMNS, show='tree headings',
+                                 height=self.VISIBLE_ROWS, selectmode='extended',
+                                 yscrollcommand=scrollbar.set)
+        self.tree.heading('#0', text='No.')
+        self.tree.heading('number', text='組番号')
+        self.tree.heading('name', text='氏名')
+        self.tree.heading('check', text='確認')
+        self.tree.column('#0', width=40, stretch=False)
+        self.tree.column('number', width=70, stretch=False)
+        self.tree.column('name', width=110)
+        self.tree.column('check', width=90)
+        self.tree.tag_configure('error', background='#ffe0e0')
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.tree.yview)
+
+        # セル編集用の入力欄（1つを使い回す）
+        self.editor = ttk.Entry(self.tree, font=('Arial', 9))
+        self.editing = None
+        self.editor.bind('<Return>', lambda e: self.finish_edit(move='down'))
+        self.editor.bind('<Tab>', lambda e: self.finish_edit(move='next'))
+        self.editor.bind('<Escape>', self.on_editor_escape)
+        self.editor.bind('<FocusOut>', lambda e: self.finish_edit())
+        self.editor.bind('<<Paste>>', self.on_editor_paste)
+
+        self.tree.bind('<Double-Button-1>', self.on_double_click)
+        self.tree.bind('<Return>', lambda e: self.edit_focused())
+        self.tree.bind('<F2>', lambda e: self.edit_focused())
+        self.tree.bind('<Delete>', lambda e: self.remove_selected())
+        self.tree.bind('<<Paste>>', lambda e: self.paste_clipboard())
+        # スクロールするとセルの位置がずれるため編集を確定
+        self.tree.bind('<MouseWheel>', self.on_scroll, add='+')
+
+        # 操作ボタン
+        button_frame = ttk.Frame(self.frame)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="+ 追加", command=self.add_row,
+                   width=6).pack(side=tk.LEFT, padx=(0, 3))
+        ttk.Button(button_frame, text="削除", command=self.remove_selected,
+                   width=6).pack(side=tk.LEFT, padx=3)
+        ttk.Button(button_frame, text="貼り付け", command=self.paste_clipboard,
+                   width=8).pack(side=tk.LEFT, padx=3)
+        self.count_label = ttk.Label(button_frame, font=('Arial', 8))
+        self.count_label.pack(side=tk.RIGHT)
+
+        ttk.Label(self.frame, text="Excelの「組番号・氏名」の2列をコピーして貼り付けできます（Ctrl+V）",
+                  font=('Arial', 8), foreground='gray').pack(anchor=tk.W, pady=(3, 0))
+
+        self.add_row()
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # --- 行の操作 ---
+
+    def add_row(self, number='', name=''):
+        """末尾に行を追加"""
+        item = self.tree.insert('', 'end', text=str(len(self.tree.get_children()) + 1),
+                                values=(number, name, ''))
+        self.update_count()
+        return item
+
+    def remove_selected(self):
+        """選択行を削除（最後の1行は空欄に戻す）"""
+        self.cancel_edit()
+        selection = self.tree.selection()
+        if not selection:
+            return
+        self.tree.delete(*selection)
+        if not self.tree.get_children():
+            self.add_row()
+        self.renumber()
+
+    def clear(self):
+        """全行を削除して空欄の1行に戻す"""
+        self.cancel_edit()
+        self.tree.delete(*self.tree.get_children())
+        self.add_row()
+
+    def renumber(self):
+        for index, item in enumerate(self.tree.get_children(), 1):
+            self.tree.item(item, text=str(index))
+        self.update_count()
+
+    def update_count(self):
+        count = sum(1 for number, name in self.rows() if number or name)
+        self.count_label.config(text=f"{count} 名")
+
+    def rows(self):
+        """(組番号, 氏名) を表示順に返す"""
+        for item in self.tree.get_children():
+            values = self.tree.item(item, 'values')
+            yield values[0], values[1]
+
+    def get_students(self):
+        """入力済みの行を申請データの形式で返す"""
+        return [{'number': number, 'name': name} for number, name in self.rows() if number and name]
+
+    # --- セルの編集 ---
+
+    def on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)
+        if item and column in ('#1', '#2'):
+            self.start_edit(item, self.EDITABLE_COLUMNS[int(column[1:]) - 1])
+
+    def edit_focused(self):
+        item = self.tree.focus() or self.tree.get_children()[-1]
+        self.start_edit(item, 'number')
+
+    def start_edit(self, item, column):
+        self.finish_edit()
+        self.tree.see(item)
+        self.tree.update_idletasks()
+        bbox = self.tree.bbox(item, column)
+        if not bbox:
+            return
+
+        x, y, width, height = bbox
+        self.editing = (item, column)
+        self.editor.delete(0, tk.END)
+        self.editor.insert(0, self.tree.set(item, column))
+        self.editor.place(x=x, y=y, width=width, height=height)
+        self.editor.focus_set()
+        self.editor.select_range(0, tk.END)
+
+    def finish_edit(self, move=None):
+        """編集中のセルを確定し、move に応じて次のセルの編集を始める"""
+        if self.editing is None:
+            return 'break'
+
+        item, column = self.editing
+        self.editing = None
+        self.editor.place_forget()
+        if self.tree.exists(item):
+            value = self.editor.get()
+            self.tree.set(item, column, normalize_number(value) if column == 'number' else value.strip())
+            self.update_count()
+
+        if move and self.tree.exists(item):
+            if move == 'next' and column == 'number':
+                self.start_edit(item, 'name')
+            else:
+                # 最終行の次は新しい行を追加して続けて入力
+                next_item = self.tree.next(item) or self.add_row()
+                self.tree.selection_set(next_item)
+                self.tree.focus(next_item)
+                self.start_edit(next_item, 'number' if move == 'next' else column)
+        return 'break'
+
+    def cancel_edit(self):
+        self.editing = None
+        self.editor.place_forget()
+
+    def on_editor_escape(self, event):
+        self.cancel_edit()
+        self.tree.focus_set()
+        return 'break'
+
+    def on_scroll(self, event):
+        self.finish_edit()
+
+    # --- 貼り付け ---
+
+    def on_editor_paste(self, event):
+        """複数行・複数列の貼り付けは表全体に展開し、それ以外は入力欄に貼り付け"""
+        try:
+            text = self.editor.clipboard_get()
+        except tk.TclError:
+            return None
+        if '\t' not in text and '\n' not in text.strip():
+            return None
+
+        start = self.editing[0] if self.editing else None
+        self.cancel_edit()
+        self.paste_rows(parse_student_rows(text), start)
+        return 'break'
+
+    def paste_clipboard(self):
+        try:
+            text = self.tree.clipboard_get()
+        except tk.TclError:
+            return 'break'
+        self.paste_rows(parse_student_rows(text), self.tree.focus() or None)
+        return 'break'
+
+    def paste_rows(self, students, start=None):
+        """start の行から順に上書きし、足りない分は行を追加
+
+        start を指定しない場合は、入力済みの最後の行の次から書き込む。
+        """
+        if not students:
+            return
+
+        items = list(self.tree.get_children())
+        if start in items:
+            index = items.index(start)
+        else:
+            index = 0
+            for position, (number, name) in enumerate(self.rows()):
+                if number or name:
+                    index = position + 1
+
+        for number, name in students:
+            if index < len(items):
+                self.tree.item(items[index], values=(number, name, ''), tags=())
+            else:
+                items.append(self.add_row(number, name))
+            index += 1
+
+        self.renumber()
+        self.validate()
+
+    # --- 入力チェック ---
+
+    def validate(self):
+        """全行を1回の走査でチェックし、エラーの行に印を付けてエラーメッセージを返す"""
+        errors = []
+        seen = {}
+        count = 0
+        format_error = False
+
+        for index, item in enumerate(self.tree.get_children(), 1):
+            number, name = self.tree.item(item, 'values')[:2]
+            problems = []
+            if number or name:
+                count += 1
+                if not re.match(STUDENT_NUMBER_PATTERN, number):
+                    problems.append('組番号の形式')
+                    format_error = True
+                if not name:
+                    problems.append('氏名なし')
+                if number in seen:
+                    problems.append(f'{seen[number]}行目と重複')
+                elif number:
+                    seen[number] = index
+
+            self.tree.item(item, tags=('error',) if problems else (),
+                           values=(number, name, '・'.join(problems) if problems else ('OK' if number else '')))
+            if problems:
+                errors.append(f"{index}行目（{number or '組番号なし'}）: {'・'.join(problems)}")
+
+        if count == 0:
+            errors.append("対象者を1名以上入力してください")
+        elif format_error:
+            errors.insert(0, "組番号は「アルファベット1文字+4桁数字」の形式で入力してください（例: F1234）")
+
+        # 表示が長くならないよう先頭の数件に絞る
+        if len(errors) > 11:
+            errors = errors[:11] + [f"ほか {len(errors) - 11} 件"]
+        return errors
+
+
+def normalize_number(value):
+    """組番号の全角英数字を半角・大文字にそろえる"""
+    return unicodedata.normalize('NFKC', value).strip().upper()
+
+
+def parse_student_rows(text):
+    """クリップボードのテキストを (組番号, 氏名) のリストに変換
+
+    タブ区切り（Excel のコピー）を基本とし、タブがない行は組番号の後の空白で区切る。
+    「組番号」などの見出し行は読み飛ばす。
+    """
+    students = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if '\t' in line:
+            cells = line.split('\t')
+        else:
+            cells = re.split(r'[ 　]+', line.strip(), maxsplit=1)
+
+        number = normalize_number(cells[0])
+        name = cells[1].strip() if len(cells) > 1 else ''
+        if '番号' in number:
+            continue
+        students.append((number, name))
+    return students
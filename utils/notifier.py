@@ -0,0 +1,102 @@
+# utils/notifier.py
+import json
+import queue
+import socket
+import threading
+import uuid
+
+
+class ChangeNotifier:
+    """申請の作成・承認・却下を同じネットワーク内の起動中の端末へUDPブロードキャストで通知
+
+    受信した通知はキューに溜め、画面側が drain() で取り出す。
+    通知が届かなかった場合も「更新」ボタンで従来どおり再読み込みできる。
+    """
+
+    # 受信待ちのタイムアウト（停止要求の確認間隔）
+    RECEIVE_TIMEOUT = 1.0
+
+    # 1通知の最大サイズ
+    MAX_MESSAGE_BYTES = 1024
+
+    def __init__(self, port=47810, channel='grade_correction', broadcast_address='<broadcast>'):
+        self.port = port
+        self.channel = channel
+        self.broadcast_address = broadcast_address
+
+        # 自分が送った通知を受信時に除外するための識別子
+        self.instance_id = uuid.uuid4().hex[:12]
+
+        self.events = queue.Queue()
+        self._send_lock = threading.Lock()
+        self._send_socket = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def publish(self, event, request_id, shard=None):
+        """変更を通知（送信に失敗しても例外にしない）"""
+        message = json.dumps({
+            'channel': self.channel,
+            'sender': self.instance_id,
+            'event': event,
+            'request_id': request_id,
+            'shard': shard or ''
+        }, separators=(',', ':')).encode('utf-8')
+
+        with self._send_lock:
+            try:
+                if self._send_socket is None:
+                    self._send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    self._send_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                self._send_socket.sendto(message, (self.broadcast_address, self.port))
+            except OSError:
+                pass
+
+    def start(self):
+        """受信を開始（同じ端末で複数起動していても受信できるようポートを共有）"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        receive_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receive_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            receive_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        receive_socket.bind(('', self.port))
+        receive_socket.settimeout(self.RECEIVE_TIMEOUT)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._receive, args=(receive_socket,),
+                                        name='change-notifier', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _receive(self, receive_socket):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    data, _ = receive_socket.recvfrom(self.MAX_MESSAGE_BYTES)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+
+                try:
+                    message = json.loads(data.decode('utf-8'))
+                except ValueError:
+                    continue
+                if message.get('channel') != self.channel or message.get('sender') == self.instance_id:
+                    continue
+                self.events.put(message)
+        finally:
+            receive_socket.close()
+
+    def drain(self):
+        """受信済みの通知をすべて取り出す"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.events.get_nowait())
+            except queue.Empty:
+                return messages
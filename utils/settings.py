@@ -0,0 +1,87 @@
+# utils/settings.py
+import copy
+import json
+from pathlib import Path
+
+# 実行フォルダの settings.json で上書きできる設定
+SETTINGS_FILE = 'settings.json'
+
+DEFAULT_SETTINGS = {
+    'database_path': 'grade_correction.db',
+    # 複数校舎の運用：この端末の校舎名と、管理者が横断表示する他校舎のDB
+    # 例: 'shards': [{'name': '北校舎', 'path': '//north/share/grade_correction.db'}]
+    'shard_name': '',
+    'shards': [],
+    # 共有DBに保存できない申請を一時保存する端末ローカルのファイル
+    'outbox_path': str(Path.home() / '.grade_correction' / 'outbox.db'),
+    # サービスモード：url を設定すると共有DBを直接開かずサーバーに接続する
+    'service': {
+        'url': '',
+        'host': '127.0.0.1',
+        'port': 8765,
+    },
+    # 申請の作成・承認・却下を同じネットワーク内の端末へ通知（UDPブロードキャスト）
+    'notifications': {
+        'enabled': True,
+        'port': 47810,
+        'channel': 'grade_correction',
+        'broadcast_address': '<broadcast>',
+    },
+    'backup': {
+        'enabled': True,
+        'directory': 'backups',
+        'keep': 14,
+        'interval_hours': 24,
+        'pages_per_step': 64,
+        'step_sleep_seconds': 0.02,
+    },
+    # 管理者画面の履歴・統計を端末ローカルのコピーから表示
+    'replica': {
+        'enabled': False,
+        'path': str(Path.home() / '.grade_correction' / 'replica.db'),
+        'max_staleness_seconds': 300,
+        'refresh_seconds': 60,
+    },
+    'maintenance': {
+        'enabled': True,
+        'idle_minutes': 5,
+        'interval_hours': 24,
+    },
+    # 承認待ちの処理期限：申請日からの日数（種別ごと）と、それより優先する締切日（通知表の締切など）
+    # 例: 'cutoff_dates': ['2024-07-19', '2024-12-20']
+    'work_queue': {
+        'sla_days': {'attendance': 3, 'grade': 5},
+        'cutoff_dates': [],
+        'lease_minutes': 30,
+    },
+    # 申請の添付ファイル：directory が空なら共有DBと同じフォルダの attachments に保存
+    # サムネイルは端末ローカルに保存し、合計が thumbnail_cache_mb を超えたら古く使われたものから削除
+    'attachments': {
+        'directory': '',
+        'max_file_mb': 20,
+        'thumbnail_cache': str(Path.home() / '.grade_correction' / 'thumbnails'),
+        'thumbnail_cache_mb': 100,
+    },
+}
+
+
+def _merge(base, override):
+    """辞書を再帰的にマージ"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_settings(path=SETTINGS_FILE):
+    """既定値に settings.json の内容を重ねた設定を返す"""
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    settings_path = Path(path)
+
+    if settings_path.exists():
+        with open(settings_path, encoding='utf-8') as f:
+            _merge(settings, json.load(f))
+
+    return settings
@@ -0,0 +1,187 @@
+# utils/slip_renderer.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# 訂正票のサイズ（A5横・150dpi）
+SLIP_SIZE = (1240, 874)
+SLIP_DPI = 150
+
+# 日本語フォントの候補（OSごと）
+FONT_CANDIDATES = [
+    'C:/Windows/Fonts/meiryo.ttc',
+    'C:/Windows/Fonts/YuGothM.ttc',
+    'C:/Windows/Fonts/msgothic.ttc',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/fonts-japanese-gothic.ttf',
+]
+
+TYPE_LABELS = {'attendance': '出欠関連', 'grade': '成績のみ'}
+
+# 訂正票の記入欄
+FIELD_LABELS = (
+    '申請ID', '申請日時', '承認日時', '記入者', '承認者', '対象生徒',
+    '訂正種別', '講座名', '訂正内容', '対象期間', '訂正理由',
+)
+
+# ワーカープロセスごとのキャッシュ（フォントとテンプレート画像）
+_worker_state = {}
+
+
+def find_font_path():
+    """利用可能な日本語フォントを探す"""
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _load_font(size):
+    from PIL import ImageFont
+
+    font_path = _worker_state.get('font_path')
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow 10.1 未満はサイズ指定不可
+        return ImageFont.load_default()
+
+
+def _init_worker(font_path):
+    """ワーカー初期化：フォントと罫線入りテンプレートを一度だけ作成"""
+    from PIL import Image, ImageDraw
+
+    _worker_state['font_path'] = font_path
+    _worker_state['fonts'] = {
+        'title': _load_font(40),
+        'label': _load_font(22),
+        'value': _load_font(24),
+    }
+
+    template = Image.new('RGB', SLIP_SIZE, 'white')
+    draw = ImageDraw.Draw(template)
+    fonts = _worker_state['fonts']
+    width, height = SLIP_SIZE
+
+    draw.rectangle((30, 30, width - 30, height - 30), outline='black', width=3)
+    draw.text((60, 50), '成績・出欠 訂正票', font=fonts['title'], fill='black')
+    draw.line((60, 110, width - 60, 110), fill='black', width=2)
+
+    for index, label in enumerate(FIELD_LABELS):
+        y = 130 + index * 52
+        draw.text((70, y), label, font=fonts['label'], fill='black')
+        draw.line((60, y + 44, width - 60, y + 44), fill='#cccccc', width=1)
+
+    # 押印欄
+    for index, label in enumerate(('記入者', '承認者', '記録係')):
+        x = width - 420 + index * 120
+        draw.rectangle((x, 40, x + 110, 100), outline='black', width=1)
+        draw.text((x + 8, 44), label, font=fonts['label'], fill='black')
+
+    _worker_state['template'] = template
+
+
+def _slip_values(slip):
+    """訂正票の各欄に記入する文字列"""
+    if slip['correction_type'] == 'attendance':
+        detail = (f"{slip['attendance_date'] or ''} {slip['period_number'] or ''}限 "
+                  f"{slip['before_status'] or ''} → {slip['after_status'] or ''}")
+    else:
+        parts = []
+        if slip['before_evaluation'] is not None:
+            parts.append(f"評価 {slip['before_evaluation']} → {slip['after_evaluation']}")
+        if slip['before_observation']:
+            parts.append(f"観点 {slip['before_observation']} → {slip['after_observation']}")
+        detail = '　'.join(parts)
+
+    reason = (slip['reason'] or '').replace('\n', ' ')
+    if len(reason) > 40:
+        reason = reason[:40] + '...'
+
+    return (
+        str(slip['request_id']),
+        slip['request_date'] or '',
+        slip['approved_date'] or '',
+        slip['applicant_name'] or '',
+        slip['approver_name'] or '',
+        f"{slip['student_number']} {slip['student_name']}",
+        TYPE_LABELS.get(slip['correction_type'], slip['correction_type']),
+        f"{slip['subject'] or ''} {slip['course_name'] or ''}".strip(),
+        detail,
+        slip['periods'] or '',
+        reason,
+    )
+
+
+def _render_slip(job):
+    """1枚描画してファイルに保存（ワーカープロセスで実行）"""
+    from PIL import ImageDraw
+
+    slip, output_path, image_format = job
+    image = _worker_state['template'].copy()
+    draw = ImageDraw.Draw(image)
+    font = _worker_state['fonts']['value']
+
+    for index, value in enumerate(_slip_values(slip)):
+        draw.text((260, 128 + index * 52), value, font=font, fill='black')
+
+    if image_format == 'pdf':
+        image.save(output_path, 'PDF', resolution=SLIP_DPI)
+    else:
+        image.save(output_path, 'PNG', dpi=(SLIP_DPI, SLIP_DPI))
+    return output_path
+
+
+class SlipRenderer:
+    """承認済み訂正の訂正票をプロセスプールで一括作成"""
+
+    def __init__(self, output_dir, image_format='pdf', max_workers=None):
+        if image_format not in ('pdf', 'png'):
+            raise ValueError(f"未対応の出力形式です: {image_format}")
+        self.output_dir = Path(output_dir)
+        self.image_format = image_format
+        self.max_workers = max_workers
+
+    def render(self, slips, progress_callback=None, cancel_event=None):
+        """訂正票を作成し、出力したファイルパスのリストを返す
+
+        progress_callback(完了数, 総数) は呼び出し元スレッドで呼ばれる。
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        jobs = [
+            (slip, str(self.output_dir / self._file_name(slip)), self.image_format)
+            for slip in slips
+        ]
+        total = len(jobs)
+        if total == 0:
+            return []
+
+        workers = self.max_workers or min(os.cpu_count() or 1, 8)
+        # プロセス間通信の回数を減らすためまとめて渡す
+        chunksize = max(1, min(32, total // (workers * 4)))
+
+        written = []
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(find_font_path(),)) as executor:
+            for path in executor.map(_render_slip, jobs, chunksize=chunksize):
+                written.append(path)
+                if progress_callback:
+                    progress_callback(len(written), total)
+                if cancel_event is not None and cancel_event.is_set():
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    break
+
+        return written
+
+    def _file_name(self, slip):
+        # 複数校舎を出力する場合は申請IDが重複するため校舎名を付ける
+        shard = f"{slip['shard']}_" if slip.get('shard') else ''
+        return f"slip_{shard}{slip['request_id']:06d}_{slip['student_number']}.{self.image_format}"
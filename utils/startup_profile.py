@@ -0,0 +1,220 @@
+# utils/startup_profile.py
+import os
+import sys
+import threading
+import time
+
+# 起動プロファイルを有効にするコマンドライン引数・環境変数
+PROFILE_FLAG = '--profile-startup'
+PROFILE_ENV = 'GRADE_CORRECTION_PROFILE_STARTUP'
+
+# 結果を書き出すファイル（--windowed のビルドでは標準エラー出力がないため）
+REPORT_FILE = 'startup_profile.txt'
+
+
+def profiling_requested(argv=None):
+    """起動プロファイルが指定されているか"""
+    argv = sys.argv if argv is None else argv
+    return PROFILE_FLAG in argv or bool(os.environ.get(PROFILE_ENV))
+
+
+def process_age_seconds(pid=None):
+    """プロセスの起動からの経過秒数（取得できない環境では None）"""
+    pid = os.getpid() if pid is None else pid
+    try:
+        if sys.platform == 'win32':
+            return _windows_process_age(pid)
+        if sys.platform.startswith('linux'):
+            return _linux_process_age(pid)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _linux_process_age(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        # 2番目の項目（実行ファイル名）は空白を含みうるため ')' 以降を分割
+        fields = f.read().rsplit(')', 1)[1].split()
+    with open('/proc/uptime') as f:
+        uptime = float(f.read().split()[0])
+    return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+
+
+def _windows_process_age(pid):
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.windll.kernel32
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return None
+    try:
+        created, exited, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+        if not kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                        ctypes.byref(kernel), ctypes.byref(user)):
+            return None
+        kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+    finally:
+        kernel32.CloseHandle(handle)
+
+    def ticks(filetime):
+        return (filetime.dwHighDateTime << 32) | filetime.dwLowDateTime
+
+    # FILETIME は 100ナノ秒単位
+    return (ticks(now) - ticks(created)) / 1e7
+
+
+class _TimedLoader:
+    """モジュールの実行（exec_module）に要した時間をプロファイラに記録するローダー"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # モジュールから見えるローダーは元に戻しておく（リソース読み込みなどへの影響を避ける）
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler.measure(module.__name__, self._loader.exec_module, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder:
+    """他のファインダーが見つけたモジュールのローダーを計測用に差し替える"""
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(spec.loader, self._profiler)
+            return spec
+        return None
+
+    def invalidate_caches(self):
+        pass
+
+
+class StartupProfiler:
+    """モジュールごとの読み込み時間と、ウィンドウ表示までの時間を計測
+
+    python main.py --profile-startup（または環境変数 GRADE_CORRECTION_PROFILE_STARTUP=1）で
+    有効になり、メイン画面の表示後に結果を startup_profile.txt に書き出す。
+    onefile のビルドでは、展開処理を行う親プロセスの起動時刻から展開時間も求める。
+    """
+
+    # 結果に表示するモジュール数
+    TOP_MODULES = 30
+
+    def __init__(self):
+        self.started = time.perf_counter()
+
+        # このプロセス・onefile の親プロセスが起動してからの経過秒数
+        self.process_age = process_age_seconds()
+        self.parent_age = None
+        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+            self.parent_age = process_age_seconds(os.getppid())
+
+        # (モジュール名, 自身の時間, 下位モジュールを含む時間)
+        self.imports = []
+        # 他のモジュールの読み込み中ではない（直接 import された）読み込みの合計
+        self.import_seconds = 0.0
+        self.marks = []
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder = None
+
+    @classmethod
+    def install(cls):
+        """計測を開始（他のモジュールより先に呼び出す）"""
+        profiler = cls()
+        profiler._finder = _TimingFinder(profiler)
+        sys.meta_path.insert(0, profiler._finder)
+        return profiler
+
+    def uninstall(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def measure(self, name, exec_module, module):
+        """モジュールを実行し、下位モジュールの時間を除いた自身の時間も記録"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.imports.append((name, elapsed - children, elapsed))
+                if not stack:
+                    self.import_seconds += elapsed
+
+    def mark(self, label):
+        """計測開始からの経過時間を記録（同じ名前は最初の1回のみ）"""
+        with self._lock:
+            if all(existing != label for existing, _ in self.marks):
+                self.marks.append((label, time.perf_counter() - self.started))
+
+    def report(self):
+        """計測結果の文字列"""
+        with self._lock:
+            imports = list(self.imports)
+            import_seconds = self.import_seconds
+            marks = list(self.marks)
+
+        lines = ["起動プロファイル", "=" * 60]
+
+        if self.process_age is not None:
+            lines.append(f"プロセス起動から計測開始まで: {self.process_age:8.3f} 秒")
+        if self.parent_age is not None and self.process_age is not None:
+            lines.append(f"onefile の展開（親プロセス起動から）: {self.parent_age - self.process_age:8.3f} 秒")
+
+        lines.append(f"モジュール読み込み: {len(imports)} 件 / 計 {import_seconds:.3f} 秒")
+
+        lines.append("")
+        lines.append("経過時間（計測開始から）:")
+        for label, elapsed in marks:
+            lines.append(f"  {elapsed:8.3f} 秒  {label}")
+
+        lines.append("")
+        lines.append(f"読み込みに時間のかかったモジュール（上位{self.TOP_MODULES}件、ミリ秒）:")
+        lines.append(f"  {'自身':>8}  {'下位含む':>8}  モジュール")
+        for name, own, total in sorted(imports, key=lambda item: item[1], reverse=True)[:self.TOP_MODULES]:
+            lines.append(f"  {own * 1000:8.1f}  {total * 1000:8.1f}  {name}")
+
+        return '\n'.join(lines)
+
+    def write_report(self, path=REPORT_FILE):
+        """結果をファイルと標準エラー出力（ある場合）に書き出す"""
+        self.uninstall()
+        text = self.report()
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+        except OSError:
+            pass
+        if sys.stderr is not None:
+            print(text, file=sys.stderr)
+        return text
@@ -0,0 +1,167 @@
+# utils/thumbnails.py
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# サムネイルの最大の大きさ（幅, 高さ）
+THUMBNAIL_SIZE = (160, 160)
+
+
+def _render_thumbnail(source_path, target_path, size):
+    """元画像を縮小して PNG で保存（ワーカースレッドで実行）"""
+    # 画像処理ライブラリは最初のサムネイル作成時に読み込む
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        # JPEG は縮小して読み込めるため、大きな写真でも展開するデータが少ない
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        image.thumbnail(size)
+
+        temp_path = f'{target_path}.{threading.get_ident()}.tmp'
+        try:
+            image.save(temp_path, 'PNG')
+            os.replace(temp_path, target_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+
+class ThumbnailCache:
+    """添付画像のサムネイル（端末ローカルのフォルダに PNG で保存）
+
+    添付ファイルは内容のハッシュで識別されるため、ハッシュと大きさをキャッシュのキーにする。
+    作成はワーカースレッドで行い、呼び出し側には Future を返す（画面は完了を定期的に確認する）。
+    合計サイズが上限を超えたら最後に使われてから最も時間が経ったものから削除する。
+    使用順はファイルの更新日時に記録し、次回起動時もそこから復元する。
+    """
+
+    def __init__(self, directory, max_mb=100, size=THUMBNAIL_SIZE, max_workers=2):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.size = tuple(size)
+        self.max_workers = max_workers
+
+        # ファイル名 → バイト数（古く使われた順）
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_entries()
+
+    def _load_entries(self):
+        """既存のサムネイルを更新日時の順に登録（作成途中の一時ファイルは削除）"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith('.tmp'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _file_name(self, sha256):
+        width, height = self.size
+        return f'{sha256}-{width}x{height}.png'
+
+    def cached_path(self, sha256):
+        """作成済みのサムネイルのパス（なければ None）。使用順を更新する"""
+        name = self._file_name(sha256)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+        except OSError:
+            # 他の処理で削除された場合は作り直す
+            with self._lock:
+                self._forget(name)
+            return None
+        return path
+
+    def request(self, sha256, source_path):
+        """サムネイルのパスを返す Future（作成済みなら完了済み、作成中なら同じ Future）
+
+        画像として読めないファイルは Future が例外で完了する。
+        画面を閉じた場合などに取り消された Future は再利用せず、作り直す。
+        """
+        path = self.cached_path(sha256)
+        if path is not None:
+            future = Future()
+            future.set_result(path)
+            return future
+
+        name = self._file_name(sha256)
+        with self._lock:
+            future = self._pending.get(name)
+            if future is not None and not future.cancelled():
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='thumbnail')
+            future = self._executor.submit(self._create, name, source_path)
+            self._pending[name] = future
+        return future
+
+    def _create(self, name, source_path):
+        path = os.path.join(self.directory, name)
+        try:
+            _render_thumbnail(source_path, path, self.size)
+            size = os.path.getsize(path)
+            with self._lock:
+                self._forget(name)
+                self._entries[name] = size
+                self._total_bytes += size
+                self._evict(keep=name)
+            return path
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self, keep=None):
+        """合計サイズが上限以下になるまで古く使われたものから削除（呼び出し側でロックを保持）"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            if name == keep:
+                break
+            self._forget(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def shutdown(self):
+        """作成待ちを取り消してワーカーを終了"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)